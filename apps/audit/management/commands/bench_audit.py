@@ -0,0 +1,99 @@
+"""Benchmark: guardado de un cliente con auditoría directa vs. escritor en tandas."""
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, close_old_connections
+
+from apps.audit import writer as audit
+from apps.audit.models import AuditLog
+from apps.clients.models import Client
+
+BENCH_DETAILS = 'bench_audit'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide p50/p99 de guardar un cliente y auditarlo como en client_edit: con '
+        'AuditLog.objects.create en la request y con audit.record (el volcado corre '
+        'después de la respuesta y se mide aparte). Borra lo que escribe.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+        parser.add_argument('--client-id', type=int, help='Cliente a guardar (por defecto el primero).')
+        parser.add_argument(
+            '--writers', type=int, default=0,
+            help='Hilos que escriben auditoría en paralelo para simular contención del bloqueo de SQLite.',
+        )
+
+    def handle(self, *args, **options):
+        client = (
+            Client.objects.filter(pk=options['client_id']).first() if options['client_id'] else Client.objects.first()
+        )
+        if client is None:
+            raise CommandError('No hay clientes para guardar.')
+        iterations = max(options['iterations'], 10)
+        stop = threading.Event()
+        threads = [threading.Thread(target=self._writer_load, args=(stop,)) for _ in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        try:
+            direct, buffered, flushes = [], [], []
+            writer = audit.get_writer()
+            # Alternados, para que la caché y la carga de la máquina pesen igual en ambos.
+            for _ in range(iterations):
+                direct.append(self._measure(client, self._direct))
+                buffered.append(self._measure(client, self._buffered))
+                # Lo que hace request_finished, ya enviada la respuesta.
+                started = time.perf_counter()
+                writer.flush()
+                flushes.append(time.perf_counter() - started)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            deleted, _ = AuditLog.objects.filter(details=BENCH_DETAILS).delete()
+
+        for label, timings in (('directo', direct), ('en tandas', buffered), ('volcado (post-respuesta)', flushes)):
+            self.stdout.write(
+                f'{label:>25}: p50 {statistics.median(timings) * 1000:7.2f} ms  '
+                f'p99 {_percentile(timings, 0.99) * 1000:7.2f} ms  max {max(timings) * 1000:7.2f} ms'
+            )
+        direct_p99, buffered_p99 = _percentile(direct, 0.99), _percentile(buffered, 0.99)
+        self.stdout.write(self.style.SUCCESS(
+            f'p99 del guardado: {direct_p99 * 1000:.2f} ms directo, {buffered_p99 * 1000:.2f} ms en tandas '
+            f'({buffered_p99 / direct_p99 - 1:+.0%}). {deleted} filas de prueba borradas.'
+        ))
+
+    @staticmethod
+    def _direct(client):
+        AuditLog.objects.create(action='update_client', details=BENCH_DETAILS)
+
+    @staticmethod
+    def _buffered(client):
+        audit.record('update_client', details=BENCH_DETAILS)
+
+    @staticmethod
+    def _measure(client, audit_call):
+        started = time.perf_counter()
+        client.save()
+        audit_call(client)
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _writer_load(stop):
+        while not stop.is_set():
+            try:
+                AuditLog.objects.create(action='update_client', details=BENCH_DETAILS)
+            except DatabaseError:
+                # "database is locked": justo la contención que se quiere provocar.
+                pass
+            time.sleep(0.002)
+        close_old_connections()
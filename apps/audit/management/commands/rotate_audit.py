@@ -0,0 +1,58 @@
+"""Mueve los meses viejos de auditoría a particiones mensuales y sella las más viejas."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.audit import partitions
+from apps.audit.models import AuditLog, AuditPartition
+
+
+class Command(BaseCommand):
+    help = (
+        'Deja en la tabla activa solo los últimos AUDIT_HOT_MONTHS meses de auditoría: los anteriores '
+        'pasan por tandas a un archivo SQLite por mes en AUDIT_ARCHIVE_DIR y las particiones de más '
+        'de AUDIT_SEAL_AFTER_MONTHS meses se comprimen y quedan de solo lectura.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hot-months', type=int, help='Meses en la tabla activa, contando el actual.')
+        parser.add_argument('--seal-months', type=int, help='Meses después de los cuales se sella una partición.')
+        parser.add_argument('--chunk-size', type=int, default=partitions.CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0.05, help='Segundos de espera entre tandas.')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Compacta la base al terminar (bloquea la base mientras dura; sin esto SQLite reusa el espacio).',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta lo que se movería y sellaría.')
+
+    def handle(self, *args, **options):
+        hot = options['hot_months'] or partitions.hot_months()
+        seal_after = options['seal_months'] or partitions.seal_after_months()
+        if hot < 1:
+            raise CommandError('La tabla activa tiene que guardar al menos el mes actual.')
+        if seal_after < hot:
+            raise CommandError('Solo se sellan meses que ya salieron de la tabla activa (--seal-months >= --hot-months).')
+        start = partitions.hot_start(months=hot)
+        seal_before = partitions.seal_before(months=seal_after)
+        if options['dry_run']:
+            low, _ = partitions.month_bounds(start)
+            rows = AuditLog.objects.filter(timestamp__lt=low).count()
+            # Los meses que se muevan ahora y ya tengan edad de sellarse también se sellan.
+            seal_low, _ = partitions.month_bounds(seal_before)
+            to_seal = len(
+                set(AuditPartition.objects.filter(state='open', month__lt=seal_before).values_list('month', flat=True))
+                | set(AuditLog.objects.filter(timestamp__lt=seal_low).dates('timestamp', 'month'))
+            )
+            self.stdout.write(
+                f'{rows} filas anteriores a {start:%m/%Y} pasarían a particiones; '
+                f'{to_seal} meses anteriores a {seal_before:%m/%Y} se sellarían.'
+            )
+            return
+        moved, months, sealed = partitions.rotate(
+            hot=hot, seal_after=seal_after, size=max(options['chunk_size'], 1), pause=options['pause'],
+        )
+        if options['vacuum']:
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        self.stdout.write(self.style.SUCCESS(
+            f'{moved} filas de {months} meses movidas a {partitions.archive_dir()}; {sealed} particiones selladas.'
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_rename_apps_audit_actor_7ff847_idx_audit_audit_actor_i_dcd783_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create_user', 'Crear usuario'), ('update_profile', 'Actualizar perfil'), ('change_password', 'Cambiar contraseña'), ('set_role', 'Cambiar rol'), ('delete_user', 'Eliminar usuario'), ('reset_password', 'Resetear contraseña'), ('create_client', 'Crear cliente'), ('update_client', 'Actualizar cliente'), ('delete_client', 'Eliminar cliente'), ('import_clients', 'Importar clientes')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_alter_auditlog_action'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create_user', 'Crear usuario'), ('update_profile', 'Actualizar perfil'), ('change_password', 'Cambiar contraseña'), ('set_role', 'Cambiar rol'), ('delete_user', 'Eliminar usuario'), ('reset_password', 'Resetear contraseña'), ('create_client', 'Crear cliente'), ('update_client', 'Actualizar cliente'), ('delete_client', 'Eliminar cliente'), ('import_clients', 'Importar clientes'), ('convert_leads', 'Convertir clientes rápidos'), ('archive_leads', 'Archivar clientes rápidos')], max_length=50),
+        ),
+    ]
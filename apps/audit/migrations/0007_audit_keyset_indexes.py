@@ -0,0 +1,29 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0006_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_audit_actor_i_dcd783_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='audit_audit_action_e33994_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['actor', '-timestamp', '-id'], name='audit_audit_actor_i_bc0fe0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', '-timestamp', '-id'], name='audit_audit_action_0a570c_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0007_audit_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(unique=True)),
+                ('state', models.CharField(choices=[('open', 'Abierta'), ('sealed', 'Sellada')], default='open', max_length=10)),
+                ('rows', models.PositiveIntegerField(default=0)),
+                ('min_id', models.BigIntegerField(blank=True, null=True)),
+                ('max_id', models.BigIntegerField(blank=True, null=True)),
+                ('size_bytes', models.BigIntegerField(default=0)),
+                ('sealed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Audit Partition',
+                'verbose_name_plural': 'Audit Partitions',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('login', 'Login'), ('logout', 'Logout'), ('create_user', 'Crear usuario'), ('update_profile', 'Actualizar perfil'), ('change_password', 'Cambiar contraseña'), ('set_role', 'Cambiar rol'), ('delete_user', 'Eliminar usuario'), ('reset_password', 'Resetear contraseña'), ('create_client', 'Crear cliente'), ('update_client', 'Actualizar cliente'), ('delete_client', 'Eliminar cliente'), ('import_clients', 'Importar clientes'), ('convert_leads', 'Convertir clientes rápidos'), ('archive_leads', 'Archivar clientes rápidos'), ('rotate_audit', 'Rotar auditoría')], max_length=50),
+        ),
+    ]
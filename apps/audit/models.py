@@ -1,6 +1,7 @@
 """Models for audit app."""
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class AuditLog(models.Model):
     """Registro de auditoría."""
@@ -16,6 +17,10 @@ class AuditLog(models.Model):
         ('create_client', 'Crear cliente'),
         ('update_client', 'Actualizar cliente'),
         ('delete_client', 'Eliminar cliente'),
+        ('import_clients', 'Importar clientes'),
+        ('convert_leads', 'Convertir clientes rápidos'),
+        ('archive_leads', 'Archivar clientes rápidos'),
+        ('rotate_audit', 'Rotar auditoría'),
     ]
     
     actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='audit_logs')
@@ -24,7 +29,8 @@ class AuditLog(models.Model):
     details = models.TextField(blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Se fija al registrar la acción, no al escribir la tanda (ver ``writer.py``).
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
 
     def __str__(self):
         return f"{self.actor} - {self.action} - {self.timestamp}"
@@ -34,6 +40,34 @@ class AuditLog(models.Model):
         verbose_name_plural = "Audit Logs"
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['actor', '-timestamp']),
-            models.Index(fields=['action', '-timestamp']),
+            # ``-id`` desempata el cursor de la lista: la página sale entera del índice.
+            models.Index(fields=['actor', '-timestamp', '-id']),
+            models.Index(fields=['action', '-timestamp', '-id']),
         ]
+
+
+class AuditPartition(models.Model):
+    """Mes de auditoría sacado de la tabla activa a su propio archivo SQLite (ver ``partitions.py``)."""
+    STATE_CHOICES = [
+        ('open', 'Abierta'),
+        ('sealed', 'Sellada'),
+    ]
+
+    # Primer día del mes, en hora local.
+    month = models.DateField(unique=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default='open')
+    rows = models.PositiveIntegerField(default=0)
+    # Rango de ids: continuar una exportación busca la fila solo en las particiones que pueden tenerla.
+    min_id = models.BigIntegerField(null=True, blank=True)
+    max_id = models.BigIntegerField(null=True, blank=True)
+    size_bytes = models.BigIntegerField(default=0)
+    sealed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.get_state_display()})"
+
+    class Meta:
+        verbose_name = "Audit Partition"
+        verbose_name_plural = "Audit Partitions"
+        ordering = ['-month']
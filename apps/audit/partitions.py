@@ -0,0 +1,415 @@
+"""Auditoría particionada por mes.
+
+``AuditLog`` es la tabla activa: ahí escribe ``writer.py`` y ahí quedan los
+últimos ``AUDIT_HOT_MONTHS`` meses. ``rotate`` pasa cada mes más viejo a su
+propio archivo SQLite en ``AUDIT_ARCHIVE_DIR`` (``audit-AAAA-MM.sqlite3``, con
+los mismos índices) y lo borra de la tabla activa por tandas: la tabla activa
+(y con ella VACUUM, las copias de la base y cada consulta) no crece con los
+años. ``AuditPartition`` lleva la cuenta de cada mes.
+
+Pasados ``AUDIT_SEAL_AFTER_MONTHS`` meses la partición se sella: se compacta,
+se comprime (``.sqlite3.gz``) y queda de solo lectura. Se puede seguir
+buscando en ella: la primera consulta que la alcanza la descomprime en
+``cache/``, donde quedan las ``AUDIT_ARCHIVE_CACHE_FILES`` usadas más recientemente.
+
+``search`` rutea: recorre la tabla activa y las particiones que el rango de
+fechas y el cursor alcanzan, en el orden de la lectura, y corta apenas la
+página está completa y la siguiente fuente ya no puede aportar filas. Una fila
+que llega tarde (reinsertada desde el respaldo del writer) con fecha de un mes
+ya movido se lee desde la tabla activa hasta la próxima rotación.
+"""
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.audit import writer as audit
+from apps.core.pagination import KeysetPaginator, keyset_filter
+from .models import AuditLog, AuditPartition
+
+HOT_MONTHS = 3
+SEAL_AFTER_MONTHS = 12
+CACHE_FILES = 4
+# Filas por tanda al mover un mes (cada tanda es un ``DELETE`` corto en la tabla activa).
+CHUNK_SIZE = 500
+COPY_BUFFER = 1 << 20
+LIST_ORDERING = ['-timestamp', '-id']
+COLUMNS = ('id', 'actor_id', 'action', 'target_user_id', 'details', 'ip_address', 'user_agent', 'timestamp')
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS audit_log ('
+    'id INTEGER PRIMARY KEY, actor_id INTEGER, action TEXT NOT NULL, target_user_id INTEGER, '
+    'details TEXT NOT NULL, ip_address TEXT, user_agent TEXT NOT NULL, timestamp TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS audit_log_timestamp ON audit_log (timestamp, id)',
+    'CREATE INDEX IF NOT EXISTS audit_log_actor ON audit_log (actor_id, timestamp, id)',
+    'CREATE INDEX IF NOT EXISTS audit_log_action ON audit_log (action, timestamp, id)',
+)
+_FOREVER = datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)
+
+
+def archive_dir():
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'audit'))
+
+
+def cache_dir():
+    return archive_dir() / 'cache'
+
+
+def hot_months():
+    return getattr(settings, 'AUDIT_HOT_MONTHS', HOT_MONTHS)
+
+
+def seal_after_months():
+    return getattr(settings, 'AUDIT_SEAL_AFTER_MONTHS', SEAL_AFTER_MONTHS)
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Límites ``[desde, hasta)`` en hora local del mes que empieza en ``month``."""
+    tz = timezone.get_current_timezone()
+    low = timezone.make_aware(datetime.datetime.combine(month, datetime.time.min), tz)
+    high = timezone.make_aware(datetime.datetime.combine(add_months(month, 1), datetime.time.min), tz)
+    return low, high
+
+
+def raw_path(month):
+    return archive_dir() / f'audit-{month:%Y-%m}.sqlite3'
+
+
+def sealed_path(month):
+    return archive_dir() / f'audit-{month:%Y-%m}.sqlite3.gz'
+
+
+def _to_db(value):
+    # El mismo texto que guarda Django en SQLite: las comparaciones de texto respetan el orden.
+    return connection.ops.adapt_datetimefield_value(value)
+
+
+def _from_db(value):
+    return parse_datetime(value).replace(tzinfo=datetime.timezone.utc)
+
+
+@dataclass(frozen=True)
+class AuditQuery:
+    """Filtros ya resueltos: id del actor, acción exacta y límites ``[low, high)`` con zona horaria.
+
+    ``empty`` marca una búsqueda sin resultados posibles (un actor que no existe).
+    """
+    actor_id: int = None
+    action: str = ''
+    low: datetime.datetime = None
+    high: datetime.datetime = None
+    empty: bool = False
+
+    def touches(self, low, high):
+        return (self.low is None or self.low < high) and (self.high is None or self.high > low)
+
+
+class _HotSource:
+    """La tabla activa: suele tener los últimos meses, pero puede traer filas viejas llegadas tarde."""
+
+    def __init__(self, low):
+        self.low = low
+        self.high = _FOREVER
+
+    def fetch(self, query, cursor, reverse, limit):
+        logs = AuditLog.objects.select_related('actor', 'target_user')
+        if query.actor_id:
+            logs = logs.filter(actor_id=query.actor_id)
+        if query.action:
+            logs = logs.filter(action=query.action)
+        if query.low:
+            logs = logs.filter(timestamp__gte=query.low)
+        if query.high:
+            logs = logs.filter(timestamp__lt=query.high)
+        if cursor:
+            logs = logs.filter(keyset_filter(LIST_ORDERING, cursor, reverse=reverse))
+        return list(logs.order_by(*(['timestamp', 'id'] if reverse else LIST_ORDERING))[:limit])
+
+
+class _PartitionSource:
+    def __init__(self, partition):
+        self.partition = partition
+        self.low, self.high = month_bounds(partition.month)
+
+    def fetch(self, query, cursor, reverse, limit):
+        clauses, params = [], []
+        if query.actor_id:
+            clauses.append('actor_id = ?')
+            params.append(query.actor_id)
+        if query.action:
+            clauses.append('action = ?')
+            params.append(query.action)
+        if query.low:
+            clauses.append('timestamp >= ?')
+            params.append(_to_db(query.low))
+        if query.high:
+            clauses.append('timestamp < ?')
+            params.append(_to_db(query.high))
+        if cursor:
+            # Igual que ``keyset_filter``: el primer término deja un rango sobre el índice.
+            op = '>' if reverse else '<'
+            stamp = _to_db(cursor[0])
+            clauses.append(f'timestamp {op}= ? AND (timestamp {op} ? OR id {op} ?)')
+            params += [stamp, stamp, cursor[1]]
+        where = f'WHERE {" AND ".join(clauses)}' if clauses else ''
+        direction = 'ASC' if reverse else 'DESC'
+        sql = (
+            f'SELECT {", ".join(COLUMNS)} FROM audit_log {where} '
+            f'ORDER BY timestamp {direction}, id {direction} LIMIT ?'
+        )
+        with closing(open_partition(self.partition)) as db:
+            rows = db.execute(sql, params + [limit]).fetchall()
+        return [_log(row) for row in rows]
+
+
+def _log(row):
+    values = dict(zip(COLUMNS, row))
+    values['timestamp'] = _from_db(values['timestamp'])
+    return AuditLog(**values)
+
+
+def open_partition(partition):
+    """Conexión de solo lectura a la partición (descomprime la copia si está sellada)."""
+    if partition.state == 'sealed':
+        uri = f'{_cached_copy(partition).resolve().as_uri()}?mode=ro&immutable=1'
+    else:
+        uri = f'{raw_path(partition.month).resolve().as_uri()}?mode=ro'
+    return sqlite3.connect(uri, uri=True)
+
+
+def _cached_copy(partition):
+    source = sealed_path(partition.month)
+    target = cache_dir() / raw_path(partition.month).name
+    if target.exists() and target.stat().st_mtime >= source.stat().st_mtime:
+        os.utime(target)
+        return target
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # Nombre propio y rename: dos procesos que descomprimen a la vez no se pisan.
+    partial = target.with_name(f'{target.name}.{uuid.uuid4().hex[:8]}')
+    with gzip.open(source, 'rb') as packed, open(partial, 'wb') as out:
+        shutil.copyfileobj(packed, out, COPY_BUFFER)
+    os.replace(partial, target)
+    _trim_cache(getattr(settings, 'AUDIT_ARCHIVE_CACHE_FILES', CACHE_FILES))
+    return target
+
+
+def _trim_cache(keep):
+    copies = sorted(cache_dir().glob('audit-*.sqlite3'), key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in copies[max(keep, 1):]:
+        path.unlink(missing_ok=True)
+
+
+def _sources(query, cursor, reverse):
+    """Fuentes que pueden tener filas, en el orden en que las alcanza la lectura."""
+    sources = []
+    hot_low = AuditLog.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if hot_low is not None:
+        sources.append(_HotSource(hot_low))
+    sources += [_PartitionSource(partition) for partition in AuditPartition.objects.filter(rows__gt=0)]
+    reachable = [
+        source for source in sources
+        if query.touches(source.low, source.high)
+        and (cursor is None or (source.high > cursor[0] if reverse else source.low <= cursor[0]))
+    ]
+    if reverse:
+        return sorted(reachable, key=lambda source: source.low)
+    return sorted(reachable, key=lambda source: source.high, reverse=True)
+
+
+def _ordered(logs, reverse):
+    return sorted(logs, key=lambda log: (log.timestamp, log.pk), reverse=not reverse)
+
+
+def search(query, cursor=None, reverse=False, limit=50):
+    """Hasta ``limit`` filas después de ``cursor`` (``[timestamp, id]``), las más nuevas primero.
+
+    Con ``reverse`` lee hacia adelante en el tiempo (las más viejas primero).
+    """
+    if query.empty:
+        return []
+    found = {}
+    for source in _sources(query, cursor, reverse):
+        if len(found) >= limit:
+            edge = _ordered(found.values(), reverse)[limit - 1]
+            if (edge.timestamp < source.low) if reverse else (edge.timestamp >= source.high):
+                break
+        for log in source.fetch(query, cursor, reverse, limit):
+            # Una rotación cortada puede dejar la fila en los dos lados por un rato.
+            found.setdefault(log.pk, log)
+    logs = _ordered(found.values(), reverse)[:limit]
+    _attach_users(logs)
+    return logs
+
+
+def _attach_users(logs):
+    """Actor y objetivo de las filas leídas de particiones (las de la tabla activa ya los traen)."""
+    missing = [log for log in logs if not AuditLog.actor.is_cached(log)]
+    user_ids = {log.actor_id for log in missing} | {log.target_user_id for log in missing}
+    users = User.objects.in_bulk(user_ids - {None}) if missing else {}
+    for log in missing:
+        # Un usuario borrado después de mover el mes queda sin vínculo, como con SET_NULL.
+        log.actor = users.get(log.actor_id)
+        log.target_user = users.get(log.target_user_id)
+
+
+def resume_point(pk):
+    """``[timestamp, id]`` de la fila ``pk`` esté donde esté (``None`` si no existe)."""
+    row = AuditLog.objects.filter(pk=pk).values_list('timestamp', 'id').first()
+    if row:
+        return list(row)
+    for partition in AuditPartition.objects.filter(min_id__lte=pk, max_id__gte=pk):
+        with closing(open_partition(partition)) as db:
+            found = db.execute('SELECT timestamp, id FROM audit_log WHERE id = ?', [pk]).fetchone()
+        if found:
+            return [_from_db(found[0]), found[1]]
+    return None
+
+
+class AuditPaginator(KeysetPaginator):
+    """Pagina la auditoría completa (tabla activa y particiones) por ``(-timestamp, -id)``."""
+
+    def __init__(self, query, per_page=50):
+        super().__init__(AuditLog.objects.none(), LIST_ORDERING, per_page)
+        self.query = query
+
+    def _fetch(self, values, reverse=False):
+        return search(self.query, values, reverse=reverse, limit=self.per_page + 1)
+
+
+def _open_writable(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA synchronous = FULL')
+    for statement in SCHEMA:
+        db.execute(statement)
+    db.commit()
+    return db
+
+
+def _refresh(partition, db):
+    partition.rows, partition.min_id, partition.max_id = db.execute(
+        'SELECT COUNT(*), MIN(id), MAX(id) FROM audit_log'
+    ).fetchone()
+    partition.size_bytes = raw_path(partition.month).stat().st_size
+    partition.save()
+
+
+def move_month(month, size=CHUNK_SIZE, pause=0.0):
+    """Pasa a su partición las filas del mes que siguen en la tabla activa. Devuelve cuántas movió."""
+    low, high = month_bounds(month)
+    partition, _ = AuditPartition.objects.get_or_create(month=month)
+    if partition.state == 'sealed':
+        # Filas llegadas tarde a un mes ya sellado: se reabre y la rotación lo vuelve a sellar.
+        unseal(partition)
+    insert = f'INSERT OR IGNORE INTO audit_log ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})'
+    moved = 0
+    with closing(_open_writable(raw_path(month))) as db:
+        while True:
+            rows = list(
+                AuditLog.objects.filter(timestamp__gte=low, timestamp__lt=high)
+                .order_by('timestamp', 'id').values_list(*COLUMNS)[:size]
+            )
+            if not rows:
+                break
+            # Primero el archivo, confirmado en disco; recién después se borra de la tabla activa.
+            db.executemany(insert, [row[:-1] + (_to_db(row[-1]),) for row in rows])
+            db.commit()
+            AuditLog.objects.filter(pk__in=[row[0] for row in rows]).delete()
+            moved += len(rows)
+            if pause:
+                time.sleep(pause)
+        _refresh(partition, db)
+    return moved
+
+
+def seal(partition):
+    """Compacta la partición, la comprime y la deja de solo lectura."""
+    raw = raw_path(partition.month)
+    sealed = sealed_path(partition.month)
+    with closing(sqlite3.connect(raw)) as db:
+        db.execute('VACUUM')
+    partial = sealed.with_name(f'{sealed.name}.{uuid.uuid4().hex[:8]}')
+    with open(raw, 'rb') as source, open(partial, 'wb') as out:
+        with gzip.GzipFile(fileobj=out, mode='wb') as packed:
+            shutil.copyfileobj(source, packed, COPY_BUFFER)
+        out.flush()
+        os.fsync(out.fileno())
+    os.chmod(partial, 0o444)
+    os.replace(partial, sealed)
+    partition.state = 'sealed'
+    partition.sealed_at = timezone.now()
+    partition.size_bytes = sealed.stat().st_size
+    partition.save()
+    raw.unlink()
+
+
+def unseal(partition):
+    """Vuelve a dejar la partición como archivo SQLite común, para agregarle filas."""
+    raw = raw_path(partition.month)
+    sealed = sealed_path(partition.month)
+    partial = raw.with_name(f'{raw.name}.{uuid.uuid4().hex[:8]}')
+    with gzip.open(sealed, 'rb') as packed, open(partial, 'wb') as out:
+        shutil.copyfileobj(packed, out, COPY_BUFFER)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(partial, raw)
+    partition.state = 'open'
+    partition.sealed_at = None
+    partition.size_bytes = raw.stat().st_size
+    partition.save()
+    sealed.unlink()
+
+
+def hot_start(today=None, months=None):
+    """Primer día del mes más viejo que se queda en la tabla activa."""
+    today = today or timezone.localdate()
+    return add_months(today.replace(day=1), -((months or hot_months()) - 1))
+
+
+def seal_before(today=None, months=None):
+    """Las particiones de meses anteriores a este día se sellan."""
+    today = today or timezone.localdate()
+    return add_months(today.replace(day=1), -(months or seal_after_months()))
+
+
+def rotate(today=None, hot=None, seal_after=None, size=CHUNK_SIZE, pause=0.0, actor=None):
+    """Mueve los meses viejos de la tabla activa a sus particiones y sella las más viejas.
+
+    Devuelve ``(filas movidas, meses movidos, particiones selladas)``.
+    """
+    boundary, _ = month_bounds(hot_start(today, hot))
+    moved = months = sealed = 0
+    while True:
+        oldest = (
+            AuditLog.objects.filter(timestamp__lt=boundary)
+            .order_by('timestamp').values_list('timestamp', flat=True).first()
+        )
+        if oldest is None:
+            break
+        moved += move_month(timezone.localdate(oldest).replace(day=1), size=size, pause=pause)
+        months += 1
+    for partition in AuditPartition.objects.filter(state='open', month__lt=seal_before(today, seal_after)):
+        seal(partition)
+        sealed += 1
+    if moved or sealed:
+        audit.record(
+            'rotate_audit', actor=actor,
+            details=f'Rotación de auditoría: {moved} filas de {months} meses a particiones, {sealed} particiones selladas.',
+        )
+    return moved, months, sealed
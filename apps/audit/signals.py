@@ -2,7 +2,7 @@
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from apps.audit.models import AuditLog
+from apps.audit.writer import record
 from apps.users.models import UserProfile
 
 def get_client_ip(request):
@@ -18,17 +18,13 @@ def get_client_ip(request):
 def log_profile_update(sender, instance, created, **kwargs):
     """Registra actualizaciones de perfil."""
     if not created:
-        AuditLog.objects.create(
-            action='update_profile',
-            target_user=instance.user,
-            details=f'Perfil actualizado: {instance.user.username}'
-        )
+        # Sin cargar el usuario si no vino con el perfil.
+        user_field = sender._meta.get_field('user')
+        name = instance.user.username if user_field.is_cached(instance) else f'id {instance.user_id}'
+        record('update_profile', target_user=instance.user_id, details=f'Perfil actualizado: {name}')
 
 @receiver(post_delete, sender=User)
 def log_user_delete(sender, instance, **kwargs):
     """Registra eliminación de usuarios."""
-    AuditLog.objects.create(
-        action='delete_user',
-        target_user=instance,
-        details=f'Usuario eliminado: {instance.username}'
-    )
+    # El usuario ya no existe: queda solo su nombre en los detalles.
+    record('delete_user', details=f'Usuario eliminado: {instance.username}')
@@ -0,0 +1,296 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+import tempfile
+from contextlib import closing
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.users.models import UserProfile
+from . import export, partitions, writer
+from .models import AuditLog, AuditPartition
+
+
+def _row(action='user_updated', details=''):
+    return json.dumps({
+        'actor_id': None, 'action': action, 'target_user_id': None, 'details': details,
+        'ip_address': None, 'user_agent': '', 'timestamp': timezone.now().isoformat(),
+    }) + '\n'
+
+
+class FallbackReplayTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.writer = writer.AuditWriter(directory=self.dir)
+
+    def _pending_rows(self):
+        return sum(len(writer.read_fallback(path)) for path in self.dir.glob('audit-*.jsonl'))
+
+    def test_busy_database_keeps_every_file(self):
+        # El archivo reclamado vuelve con otro nombre: no pisa al del día donde cae la tanda nueva.
+        current = self.dir / f'audit-{timezone.localdate():%Y%m%d}-{writer.os.getpid()}.jsonl'
+        current.write_text(_row(details='viejo'))
+        self.writer._pending = [AuditLog(action='user_updated', details='nuevo', timestamp=timezone.now())]
+        with mock.patch.object(writer, '_insert', side_effect=OperationalError('database is locked')):
+            self.assertEqual(self.writer.flush(), 0)
+        self.assertEqual(self._pending_rows(), 2)
+        names = sorted(path.name for path in self.dir.glob('audit-*.jsonl'))
+        self.assertEqual(names[1], current.name)
+        self.assertRegex(names[0], r'-r0-[0-9a-f]{8}\.jsonl$')
+
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(list(AuditLog.objects.order_by('id').values_list('details', flat=True)), ['viejo', 'nuevo'])
+        self.assertEqual(list(self.dir.glob('audit-*.jsonl')), [])
+
+    def test_rejected_file_does_not_block_the_rest(self):
+        (self.dir / 'audit-20260101-1.jsonl').write_text(_row(action=None))
+        (self.dir / 'audit-20260102-1.jsonl').write_text(_row(details='bueno'))
+        self.writer._pending = [AuditLog(action='user_updated', details='nuevo', timestamp=timezone.now())]
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(set(AuditLog.objects.values_list('details', flat=True)), {'bueno', 'nuevo'})
+        [left] = self.dir.glob('audit-*.jsonl')
+        self.assertTrue(left.name.startswith('audit-20260101-1-r1-'))
+
+    def test_dead_letter_after_max_attempts(self):
+        (self.dir / 'audit-20260101-1.jsonl').write_text(_row(action=None))
+        for _ in range(self.writer.max_attempts):
+            self.writer.flush()
+        self.assertEqual(list(self.dir.glob('audit-*.jsonl')), [])
+        [dead] = (self.dir / 'dead').glob('audit-20260101-1-*.jsonl')
+        self.assertEqual(len(writer.read_fallback(dead)), 1)
+        self.assertEqual(self.writer.flush(), 0)
+
+
+def _local(*args):
+    return timezone.make_aware(datetime.datetime(*args))
+
+
+class PartitionTests(TestCase):
+    TODAY = datetime.date(2026, 5, 15)
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        archive = override_settings(AUDIT_ARCHIVE_DIR=tmp.name)
+        archive.enable()
+        self.addCleanup(archive.disable)
+        stamps = []
+        for month in range(1, 6):
+            # Empate en (timestamp) para probar el desempate por id, y una fila del último día a la noche
+            # (en UTC ya es el mes siguiente).
+            noon = _local(2026, month, 10, 12)
+            stamps += [noon, noon, _local(2026, month, 20, 9), _local(2026, month, 28 if month == 2 else 30, 23, 30)]
+        # Los ids no siguen el orden de las fechas.
+        AuditLog.objects.bulk_create([
+            AuditLog(action='update_client', details=f'fila {n}', timestamp=stamp)
+            for n, stamp in enumerate(reversed(stamps))
+        ])
+        self.expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('timestamp', 'id'))
+
+    def _rotate(self):
+        return partitions.rotate(today=self.TODAY, hot=1, seal_after=2, size=3)
+
+    def test_rotate_moves_and_seals_old_months(self):
+        self.assertEqual(self._rotate(), (16, 4, 2))
+        self.assertEqual(AuditLog.objects.count(), 4)
+        states = dict(AuditPartition.objects.values_list('month', 'state'))
+        self.assertEqual(states, {
+            datetime.date(2026, 1, 1): 'sealed', datetime.date(2026, 2, 1): 'sealed',
+            datetime.date(2026, 3, 1): 'open', datetime.date(2026, 4, 1): 'open',
+        })
+        self.assertTrue(partitions.sealed_path(datetime.date(2026, 1, 1)).exists())
+        self.assertFalse(partitions.raw_path(datetime.date(2026, 1, 1)).exists())
+
+    def _walk(self, per_page=3):
+        """Filas de recorrer todas las páginas hacia adelante y después volver hacia atrás."""
+        paginator = partitions.AuditPaginator(partitions.AuditQuery(), per_page=per_page)
+        forward, page = [], paginator.page()
+        while True:
+            forward += [(log.timestamp, log.pk) for log in page]
+            if not page.has_next:
+                break
+            page = paginator.page(after=page.next_cursor)
+        backward = [(log.timestamp, log.pk) for log in page]
+        while page.has_previous:
+            page = paginator.page(before=page.previous_cursor)
+            backward = [(log.timestamp, log.pk) for log in page] + backward
+        return forward, backward
+
+    def test_paginator_walks_both_ways_across_sources(self):
+        self._rotate()
+        forward, backward = self._walk()
+        self.assertEqual(forward, self.expected)
+        self.assertEqual(backward, self.expected)
+
+    def test_late_rows_in_hot_table_merge_in_order(self):
+        self._rotate()
+        # Filas de febrero (sellado) reinsertadas tarde: hasta la próxima rotación se leen de la tabla activa,
+        # y una página llena de la tabla activa no alcanza para cortar antes de las particiones más nuevas.
+        AuditLog.objects.bulk_create([
+            AuditLog(action='update_client', details='tarde', timestamp=_local(2026, 2, 10, 12)) for _ in range(4)
+        ])
+        expected = list(AuditLog.objects.values_list('timestamp', 'id')) + self.expected[4:]
+        expected.sort(reverse=True)
+        for per_page in (3, 5):
+            forward, backward = self._walk(per_page)
+            self.assertEqual(forward, expected)
+            self.assertEqual(backward, expected)
+
+    def test_date_range_opens_only_touched_partitions(self):
+        self._rotate()
+        query = partitions.AuditQuery(low=_local(2026, 3, 1), high=_local(2026, 4, 1))
+        with mock.patch.object(partitions, 'open_partition', wraps=partitions.open_partition) as opened:
+            logs = partitions.search(query, limit=100)
+        self.assertEqual([partition.month for (partition,), _ in opened.call_args_list], [datetime.date(2026, 3, 1)])
+        self.assertEqual([(log.timestamp, log.pk) for log in logs], [
+            row for row in self.expected if query.low <= row[0] < query.high
+        ])
+
+        # La primera página sale entera de la tabla activa: ninguna partición se abre.
+        with mock.patch.object(partitions, 'open_partition', wraps=partitions.open_partition) as opened:
+            logs = partitions.search(partitions.AuditQuery(), limit=3)
+        self.assertEqual(opened.call_count, 0)
+        self.assertEqual([(log.timestamp, log.pk) for log in logs], self.expected[:3])
+
+    def test_late_row_reopens_and_reseals_month(self):
+        self._rotate()
+        late = AuditLog.objects.create(action='update_client', details='tarde', timestamp=_local(2026, 1, 15))
+        self.assertEqual(self._rotate(), (1, 1, 1))
+        january = AuditPartition.objects.get(month=datetime.date(2026, 1, 1))
+        self.assertEqual((january.state, january.rows), ('sealed', 5))
+        self.assertFalse(AuditLog.objects.filter(pk=late.pk).exists())
+        self.assertFalse(partitions.raw_path(january.month).exists())
+        query = partitions.AuditQuery(low=_local(2026, 1, 1), high=_local(2026, 2, 1))
+        self.assertIn(late.pk, [log.pk for log in partitions.search(query, limit=100)])
+        self.assertEqual(partitions.resume_point(late.pk), [late.timestamp, late.pk])
+
+    def test_interrupted_move_reruns_without_duplicates(self):
+        march = datetime.date(2026, 3, 1)
+        # Se corta entre escribir la primera tanda en la partición y borrarla de la tabla activa.
+        with mock.patch('django.db.models.query.QuerySet.delete', side_effect=RuntimeError('corte')):
+            with self.assertRaises(RuntimeError):
+                partitions.move_month(march, size=3)
+        self.assertEqual(AuditLog.objects.count(), 20)
+        self.assertEqual(partitions.move_month(march, size=3), 4)
+        partition = AuditPartition.objects.get(month=march)
+        self.assertEqual(partition.rows, 4)
+        low, high = partitions.month_bounds(march)
+        with closing(partitions.open_partition(partition)) as db:
+            ids = [row[0] for row in db.execute('SELECT id FROM audit_log ORDER BY id')]
+        self.assertEqual(ids, sorted(pk for stamp, pk in self.expected if low <= stamp < high))
+        logs = partitions.search(partitions.AuditQuery(low=low, high=high), limit=100)
+        self.assertEqual([(log.timestamp, log.pk) for log in logs], [
+            row for row in self.expected if low <= row[0] < high
+        ])
+
+
+class AuditListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_ADMIN)
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        rows = [
+            (self.admin, 'update_client', _local(2026, 3, 9, 12)),
+            (self.vendor, 'create_client', _local(2026, 3, 10, 23, 30)),
+            (self.vendor, 'update_client', _local(2026, 3, 11, 0, 10)),
+            (self.admin, 'delete_client', _local(2026, 3, 12, 9)),
+        ]
+        self.logs = AuditLog.objects.bulk_create([
+            AuditLog(actor=actor, action=action, timestamp=stamp) for actor, action, stamp in rows
+        ])
+        self.client.force_login(self.admin)
+
+    def listed(self, **params):
+        response = self.client.get(reverse('audit_log_list'), params)
+        self.assertEqual(response.status_code, 200)
+        return [log.pk for log in response.context['logs']]
+
+    def ids(self, *positions):
+        return [self.logs[position].pk for position in positions]
+
+    def test_action_is_an_exact_match(self):
+        self.assertEqual(self.listed(action='update_client'), self.ids(2, 0))
+        # Un fragmento de acción no es una acción: se ignora.
+        self.assertEqual(self.listed(action='client'), self.ids(3, 2, 1, 0))
+
+    def test_actor_resolves_the_username(self):
+        self.assertEqual(self.listed(actor='VENDEDOR'), self.ids(2, 1))
+        self.assertEqual(self.listed(actor='vend'), [])
+
+    def test_date_to_includes_the_whole_day(self):
+        self.assertEqual(self.listed(date_from='2026-03-10', date_to='2026-03-10'), self.ids(1))
+        self.assertEqual(self.listed(date_from='2026-03-11'), self.ids(3, 2))
+
+    def test_bad_input_is_ignored(self):
+        self.assertEqual(self.listed(date_from='2026-13-45', date_to='ayer', action='x'), self.ids(3, 2, 1, 0))
+        self.assertEqual(self.listed(after='no-es-un-cursor'), self.ids(3, 2, 1, 0))
+
+    def test_only_full_admins_can_see_it(self):
+        self.client.force_login(self.vendor)
+        self.assertEqual(self.client.get(reverse('audit_log_list')).status_code, 302)
+
+
+class AuditExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_ADMIN)
+        noon = _local(2026, 3, 10, 12)
+        # Empates de fecha: el orden y la continuación se desempatan por id.
+        AuditLog.objects.bulk_create([
+            AuditLog(actor=self.admin, action='update_client', details=f'fila {n}', timestamp=noon)
+            for n in range(3)
+        ] + [
+            AuditLog(actor=self.admin, action='create_client', details=f'fila {n}', timestamp=_local(2026, 3, day))
+            for n, day in enumerate((9, 11, 12), start=3)
+        ])
+        self.ids = list(AuditLog.objects.order_by('timestamp', 'id').values_list('id', flat=True))
+        self.client.force_login(self.admin)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_audit_csv'), params)
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content)
+        return gzip.decompress(content) if params.get('gzip') else content
+
+    def exported_ids(self, text):
+        return [int(row[0]) for row in csv.reader(io.StringIO(text.lstrip('\ufeff'))) if row[0] != 'ID']
+
+    def test_export_is_chronological_with_one_header(self):
+        text = self.export().decode('utf-8')
+        self.assertTrue(text.startswith('\ufeffID,'))
+        self.assertEqual(text.count('Fecha/Hora'), 1)
+        self.assertEqual(self.exported_ids(text), self.ids)
+
+    def test_resume_continues_after_the_row_without_header(self):
+        full = self.export(action='update_client').decode('utf-8')
+        head = full.splitlines(keepends=True)[:2]
+        last = self.exported_ids(''.join(head))[-1]
+        rest = self.export(action='update_client', after_id=last).decode('utf-8')
+        self.assertNotIn('Fecha/Hora', rest)
+        self.assertEqual(''.join(head) + rest, full)
+
+    def test_resume_across_chunks_neither_repeats_nor_skips(self):
+        query = partitions.AuditQuery()
+        for position, pk in enumerate(self.ids):
+            rows = ''.join(export.iter_csv(query, export.resume_point(pk), chunk_size=2))
+            self.assertEqual(self.exported_ids(rows), self.ids[position + 1:])
+
+    def test_gzip_has_the_same_rows(self):
+        self.assertEqual(self.export(gzip=1), self.export())
+        middle = self.ids[2]
+        self.assertEqual(self.export(gzip=1, after_id=middle), self.export(after_id=middle))
+
+    def test_unknown_resume_point_is_rejected(self):
+        for after_id in ('999999', 'abc'):
+            response = self.client.get(reverse('export_audit_csv'), {'after_id': after_id})
+            self.assertEqual(response.status_code, 400)
@@ -1,87 +1,101 @@
-"""Views for audit app."""
+"""Views for audit app.
+
+Los filtros están pensados para los índices de ``AuditLog`` (y los de cada
+partición mensual): la acción es exacta (``(action, -timestamp)``), el actor
+se resuelve antes a su id (``(actor, -timestamp)``) y las fechas se convierten
+a límites con zona horaria (``timestamp``), que además descartan las
+particiones fuera del rango. La lista pagina por cursor sobre
+``(-timestamp, -id)``: cualquier página, por antigua que sea, es un rango de
+uno de esos índices.
+"""
+import datetime
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import HttpResponse
-from django.db.models import Q
-from datetime import datetime
-import csv
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from apps.audit import export, partitions
 from apps.audit.models import AuditLog
-from apps.users.models import UserProfile
+from apps.users.permissions import access_for
+
+AUDIT_PAGE_SIZE = 100
+FILTER_PARAMS = ('actor', 'action', 'date_from', 'date_to')
 
 def is_admin(user):
-    profile = getattr(user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    return user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+    return access_for(user).is_full_admin
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+def read_filters(request):
+    """Filtros del querystring, limpios: lo que no se entiende se ignora."""
+    filters = {name: request.GET.get(name, '').strip() for name in FILTER_PARAMS}
+    if filters['action'] not in dict(AuditLog.ACTION_CHOICES):
+        filters['action'] = ''
+    for name in ('date_from', 'date_to'):
+        try:
+            day = parse_date(filters[name])
+        except ValueError:
+            day = None
+        filters[name] = day.isoformat() if day else ''
+    return filters
+
+def audit_query(filters):
+    """``AuditQuery`` de los filtros de ``read_filters`` (lista y exportación)."""
+    actor_id = None
+    if filters['actor']:
+        # Una consulta chica a usuarios y después igualdad sobre ``actor_id``.
+        actor_id = User.objects.filter(username__iexact=filters['actor']).values_list('pk', flat=True).first()
+        if actor_id is None:
+            return partitions.AuditQuery(empty=True)
+    low = _day_start(parse_date(filters['date_from'])) if filters['date_from'] else None
+    # "Hasta" incluye todo ese día.
+    high = _day_start(parse_date(filters['date_to']) + datetime.timedelta(days=1)) if filters['date_to'] else None
+    return partitions.AuditQuery(actor_id=actor_id, action=filters['action'], low=low, high=high)
 
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 def audit_log_list(request):
-    """Lista de auditoría con filtros."""
-    actor_filter = request.GET.get('actor', '')
-    action_filter = request.GET.get('action', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    logs = AuditLog.objects.all()
-    
-    if actor_filter:
-        logs = logs.filter(actor__username__icontains=actor_filter)
-    if action_filter:
-        logs = logs.filter(action__icontains=action_filter)
-    if date_from:
-        logs = logs.filter(timestamp__gte=date_from)
-    if date_to:
-        logs = logs.filter(timestamp__lte=date_to)
-    
-    logs = logs.select_related('actor', 'target_user')[:500]
-    
+    """Lista de auditoría con filtros, paginada por cursor."""
+    filters = read_filters(request)
+    page = partitions.AuditPaginator(audit_query(filters), per_page=AUDIT_PAGE_SIZE).page_from_request(request)
+
     context = {
-        'logs': logs,
-        'actor_filter': actor_filter,
-        'action_filter': action_filter,
-        'date_from': date_from,
-        'date_to': date_to,
+        'logs': page.object_list,
+        'page': page,
+        'filter_query': urlencode({name: value for name, value in filters.items() if value}),
+        'actor_filter': filters['actor'],
+        'action_filter': filters['action'],
+        'date_from': filters['date_from'],
+        'date_to': filters['date_to'],
         'actions': AuditLog.ACTION_CHOICES,
+        'usernames': User.objects.order_by('username').values_list('username', flat=True),
     }
     return render(request, 'audit/audit_list.html', context)
 
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 def export_audit_csv(request):
-    """Exportar auditoría a CSV."""
-    actor_filter = request.GET.get('actor', '')
-    action_filter = request.GET.get('action', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    
-    logs = AuditLog.objects.all()
-    
-    if actor_filter:
-        logs = logs.filter(actor__username__icontains=actor_filter)
-    if action_filter:
-        logs = logs.filter(action__icontains=action_filter)
-    if date_from:
-        logs = logs.filter(timestamp__gte=date_from)
-    if date_to:
-        logs = logs.filter(timestamp__lte=date_to)
-    
-    logs = logs.select_related('actor', 'target_user')[:10000]
-    
-    response = HttpResponse(content_type='text/csv; charset=utf-8-sig')
-    response['Content-Disposition'] = 'attachment; filename="audit_log.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Fecha/Hora', 'Actor', 'Acción', 'Objetivo', 'Detalles', 'IP', 'User Agent'])
-    
-    for log in logs:
-        writer.writerow([
-            log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-            log.actor.username if log.actor else '',
-            log.get_action_display(),
-            log.target_user.username if log.target_user else '',
-            log.details,
-            log.ip_address or '',
-            log.user_agent[:50] if log.user_agent else '',
-        ])
-    
+    """Exportar auditoría a CSV (streaming, sin tope).
+
+    ``gzip=1`` la comprime; ``after_id`` continúa una descarga cortada después de esa fila.
+    """
+    after = None
+    after_id = request.GET.get('after_id', '')
+    if after_id:
+        after = export.resume_point(after_id) if after_id.isdigit() else None
+        if after is None:
+            return HttpResponseBadRequest('after_id no corresponde a ninguna fila de auditoría.')
+
+    rows = export.iter_csv(audit_query(read_filters(request)), after)
+    filename = 'audit_log.csv' if after is None else f'audit_log_after_{after_id}.csv'
+    if request.GET.get('gzip'):
+        response = StreamingHttpResponse(export.gzip_stream(rows), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(rows, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
     return response
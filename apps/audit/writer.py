@@ -0,0 +1,256 @@
+"""Escritura de auditoría en tandas, fuera del camino de la request.
+
+``record`` no escribe: arma el ``AuditLog`` (con su ``timestamp`` fijado en
+ese momento) y lo encola al confirmar la transacción en curso; si la
+transacción se revierte, la entrada no existe. La cola del proceso se vuelca
+con un solo ``bulk_create``:
+
+* al terminar la request (``request_finished``, después de mandar la respuesta);
+* cuando junta ``AUDIT_FLUSH_SIZE`` entradas o la más vieja supera ``AUDIT_FLUSH_SECONDS``;
+* al salir el proceso (comandos de ``manage.py``).
+
+Si la base está ocupada (SQLite bloqueada) o falla, la tanda se agrega a un
+archivo JSONL en ``AUDIT_FALLBACK_DIR`` sincronizado a disco, y el próximo
+volcado que funcione la reinserta *antes* que lo nuevo. Un archivo que la
+base rechaza (no por estar ocupada) se reintenta solo, sin frenar al resto,
+y tras ``AUDIT_FALLBACK_MAX_ATTEMPTS`` rechazos pasa a ``dead/`` para
+revisarlo a mano.
+
+Orden por actor: la cola es FIFO, los volcados de un proceso no se pisan y
+lo pendiente en el archivo entra primero; entre procesos manda ``timestamp``.
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import request_finished
+from django.db import DatabaseError, IntegrityError, OperationalError, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.audit.models import AuditLog
+
+FLUSH_SIZE = 100
+FLUSH_SECONDS = 2.0
+FIELDS = ('actor_id', 'action', 'target_user_id', 'details', 'ip_address', 'user_agent', 'timestamp')
+USER_AGENT_LENGTH = 255
+MAX_ATTEMPTS = 5
+# Sufijo de un archivo devuelto tras un rechazo: ``-r<rechazos>-<único>`` antes de ``.jsonl``.
+RETRY_SUFFIX = re.compile(r'-r(\d+)-[0-9a-f]{8}$')
+
+
+def fallback_dir():
+    return Path(getattr(settings, 'AUDIT_FALLBACK_DIR', settings.BASE_DIR / 'audit_fallback'))
+
+
+class AuditWriter:
+    """Cola de entradas del proceso (una por proceso, segura entre hilos)."""
+
+    def __init__(self, flush_size=None, flush_seconds=None, directory=None):
+        self.flush_size = flush_size or getattr(settings, 'AUDIT_FLUSH_SIZE', FLUSH_SIZE)
+        self.flush_seconds = flush_seconds or getattr(settings, 'AUDIT_FLUSH_SECONDS', FLUSH_SECONDS)
+        self.directory = Path(directory) if directory else None
+        self.max_attempts = getattr(settings, 'AUDIT_FALLBACK_MAX_ATTEMPTS', MAX_ATTEMPTS)
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        # Un volcado por vez: dos hilos no pueden invertir el orden de sus tandas.
+        self._flushing = threading.Lock()
+
+    @property
+    def fallback_dir(self):
+        return self.directory or fallback_dir()
+
+    def enqueue(self, entry):
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(entry)
+            due = len(self._pending) >= self.flush_size or time.monotonic() - self._oldest >= self.flush_seconds
+        if due:
+            self.flush()
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Escribe lo pendiente (y lo que quedó en el archivo). Devuelve cuántas entradas entraron a la base."""
+        with self._flushing:
+            with self._lock:
+                batch, self._pending, self._oldest = self._pending, [], None
+            replay = self._claim_fallback()
+            entries = [entry for _, entries in replay for entry in entries] + batch
+            if not entries:
+                return 0
+            try:
+                _insert(entries)
+            except OperationalError:
+                # Base ocupada: los reclamados vuelven sin contar un rechazo y la tanda se agrega al del día.
+                for path, _ in replay:
+                    self._release(path)
+                self._write_fallback(batch)
+                return 0
+            except DatabaseError:
+                # Alguna fila no entra: cada archivo y la tanda por separado, así una mala no frena al resto.
+                return self._insert_apart(replay, batch)
+            for path, _ in replay:
+                path.unlink(missing_ok=True)
+            return len(entries)
+
+    def _insert_apart(self, replay, batch):
+        inserted = 0
+        for path, entries in replay:
+            try:
+                _insert(entries)
+            except OperationalError:
+                self._release(path)
+                continue
+            except DatabaseError:
+                self._release(path, rejected=True)
+                continue
+            path.unlink(missing_ok=True)
+            inserted += len(entries)
+        try:
+            _insert(batch)
+        except DatabaseError:
+            self._write_fallback(batch)
+            return inserted
+        return inserted + len(batch)
+
+    def _release(self, path, rejected=False):
+        """Devuelve un archivo reclamado con un nombre nuevo que no pisa a ningún otro.
+
+        El nombre sigue entrando en ``audit-*.jsonl`` y ordena antes que el archivo
+        del que salió. Con ``max_attempts`` rechazos pasa a ``dead/``.
+        """
+        stem = path.with_suffix('').name[:-len('.jsonl')]
+        match = RETRY_SUFFIX.search(stem)
+        attempts = int(match.group(1)) if match else 0
+        stem = stem[:match.start()] if match else stem
+        attempts += int(rejected)
+        unique = uuid.uuid4().hex[:8]
+        if attempts >= self.max_attempts:
+            dead = path.parent / 'dead'
+            dead.mkdir(exist_ok=True)
+            path.rename(dead / f'{stem}-{unique}.jsonl')
+        else:
+            path.rename(path.with_name(f'{stem}-r{attempts}-{unique}.jsonl'))
+
+    def _write_fallback(self, entries):
+        if not entries:
+            return
+        directory = self.fallback_dir
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'audit-{timezone.localdate():%Y%m%d}-{os.getpid()}.jsonl'
+        with open(path, 'a', encoding='utf-8') as fallback:
+            for entry in entries:
+                fallback.write(json.dumps(
+                    {name: getattr(entry, name) for name in FIELDS}, cls=DjangoJSONEncoder, ensure_ascii=False,
+                ) + '\n')
+            fallback.flush()
+            os.fsync(fallback.fileno())
+
+    def _claim_fallback(self):
+        """``[(archivo reclamado, entradas)]`` de los archivos pendientes, del más viejo al más nuevo.
+
+        Se reclaman renombrándolos: otro proceso no los reinserta dos veces.
+        """
+        directory = self.fallback_dir
+        if not directory.is_dir():
+            return []
+        claimed = []
+        for path in sorted(directory.glob('audit-*.jsonl')):
+            target = path.with_name(f'{path.name}.{uuid.uuid4().hex[:8]}')
+            try:
+                path.rename(target)
+            except FileNotFoundError:
+                continue
+            claimed.append((target, read_fallback(target)))
+        return claimed
+
+
+def _insert(entries):
+    try:
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entries, batch_size=500)
+    except IntegrityError:
+        # Un actor u objetivo se borró antes del volcado: queda en ``details``, sin el vínculo.
+        _drop_missing_users(entries)
+        with transaction.atomic():
+            AuditLog.objects.bulk_create(entries, batch_size=500)
+
+
+def _drop_missing_users(entries):
+    user_ids = {entry.actor_id for entry in entries} | {entry.target_user_id for entry in entries}
+    existing = set(User.objects.filter(pk__in=user_ids - {None}).values_list('pk', flat=True))
+    for entry in entries:
+        if entry.actor_id not in existing:
+            entry.actor_id = None
+        if entry.target_user_id not in existing:
+            entry.target_user_id = None
+        entry.pk = None
+
+
+def read_fallback(path):
+    entries = []
+    with open(path, encoding='utf-8') as fallback:
+        for line in fallback:
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError:
+                # Línea cortada por una caída a mitad de escritura.
+                continue
+            data['timestamp'] = parse_datetime(data['timestamp'])
+            entries.append(AuditLog(**data))
+    return entries
+
+
+_writer = AuditWriter()
+
+
+def get_writer():
+    return _writer
+
+
+def record(action, actor=None, target_user=None, details='', request=None):
+    """Registra una acción de auditoría sin escribir en la request.
+
+    ``actor`` y ``target_user`` pueden ser usuarios o ids. Con ``request`` se
+    guardan IP y navegador.
+    """
+    entry = AuditLog(
+        actor_id=getattr(actor, 'pk', actor),
+        action=action,
+        target_user_id=getattr(target_user, 'pk', target_user),
+        details=details,
+        timestamp=timezone.now(),
+    )
+    if request is not None:
+        entry.ip_address = request.META.get('REMOTE_ADDR')
+        entry.user_agent = request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_LENGTH]
+    transaction.on_commit(lambda: _writer.enqueue(entry))
+    return entry
+
+
+@receiver(request_finished)
+def flush_after_request(sender, **kwargs):
+    if _writer.pending():
+        _writer.flush()
+
+
+@atexit.register
+def _flush_at_exit():
+    if _writer.pending():
+        _writer.flush()
@@ -4,12 +4,6 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from apps.auth_app.forms import CustomUserCreationForm, LoginForm
-from apps.users.models import UserProfile
-
-
-def _ensure_related(user):
-    """Make sure profile exists for the user."""
-    UserProfile.objects.get_or_create(user=user, defaults={'role': UserProfile.ROLE_VENDOR})
 
 
 def custom_login(request):
@@ -25,7 +19,6 @@ def custom_login(request):
             user = authenticate(request, username=username, password=password)
             if user is not None:
                 login(request, user)
-                _ensure_related(user)
                 remember = form.cleaned_data.get('remember_me')
                 if not remember:
                     request.session.set_expiry(0)
@@ -47,8 +40,7 @@ def register(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            _ensure_related(user)
+            form.save()
             messages.success(request, 'Registro exitoso. Por favor, inicia sesion.')
             return redirect('login')
     else:
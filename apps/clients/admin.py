@@ -1,6 +1,18 @@
 """Admin registration for clients."""
-from django.contrib import admin
-from .models import Client, CoHolder
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.auth.models import User
+from django.shortcuts import redirect, render
+from django.urls import path
+
+from . import importer
+from .models import ArchivedLead, CalendarFeed, Client, CoHolder, DuplicateCandidate, EventReminder, LeadLoad
+
+
+class ClientImportForm(forms.Form):
+    file = forms.FileField(label='Archivo (CSV o XLSX)')
+    owner = forms.ModelChoiceField(queryset=User.objects.order_by('username'), required=False, label='Asignar a')
+    dry_run = forms.BooleanField(required=False, label='Solo validar')
 
 
 @admin.register(Client)
@@ -8,9 +20,89 @@ class ClientAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'doc_type', 'doc_number', 'tax_condition', 'cuit', 'phone', 'email')
     search_fields = ('first_name', 'last_name', 'company_name', 'cuit', 'doc_number')
     list_filter = ('tax_condition', 'marital_status', 'nationality', 'sex')
+    change_list_template = 'admin/clients/client/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.import_view), name='clients_client_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Importación masiva de clientes desde CSV/XLSX."""
+        if not self.has_add_permission(request):
+            messages.error(request, 'No tienes permiso para importar clientes.')
+            return redirect('admin:clients_client_changelist')
+        form = ClientImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            uploaded = form.cleaned_data['file']
+            try:
+                result = importer.import_clients(
+                    uploaded.file,
+                    uploaded.name,
+                    owner=form.cleaned_data['owner'] or request.user,
+                    actor=request.user,
+                    dry_run=form.cleaned_data['dry_run'],
+                )
+            except ValueError as exc:
+                messages.error(request, str(exc))
+            else:
+                messages.success(
+                    request,
+                    f'Filas válidas: {result.valid}. Creados: {result.created}. '
+                    f'Actualizados: {result.updated}. Con errores: {len(result.errors)}.',
+                )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar clientes',
+            'form': form,
+            'result': result,
+            'errors': result.errors[:200] if result else [],
+        }
+        return render(request, 'admin/clients/client/import_clients.html', context)
 
 
 @admin.register(CoHolder)
 class CoHolderAdmin(admin.ModelAdmin):
     list_display = ('full_name', 'dni', 'client')
     search_fields = ('full_name', 'dni', 'client__cuit')
+
+
+@admin.register(DuplicateCandidate)
+class DuplicateCandidateAdmin(admin.ModelAdmin):
+    list_display = ('client_a', 'client_b', 'reasons', 'name_similarity', 'score', 'dismissed', 'created_at')
+    list_filter = ('dismissed', 'reasons')
+    raw_id_fields = ('client_a', 'client_b')
+    list_select_related = ('client_a', 'client_b')
+
+
+@admin.register(LeadLoad)
+class LeadLoadAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'open_leads', 'assigned_total')
+    list_select_related = ('owner',)
+    readonly_fields = ('open_leads', 'assigned_total')
+
+
+@admin.register(ArchivedLead)
+class ArchivedLeadAdmin(admin.ModelAdmin):
+    list_display = ('lead_id', 'name', 'phone', 'source', 'owner', 'created_at', 'segment')
+    search_fields = ('name', 'phone')
+    list_select_related = ('owner',)
+    readonly_fields = ('lead_id', 'segment', 'line', 'archived_at')
+
+
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('owner', 'version', 'changed_at')
+    list_select_related = ('owner',)
+    readonly_fields = ('version', 'changed_at')
+
+
+@admin.register(EventReminder)
+class EventReminderAdmin(admin.ModelAdmin):
+    list_display = ('title', 'kind', 'starts_at', 'owner', 'sent_at', 'attempts')
+    list_filter = ('kind',)
+    list_select_related = ('owner',)
+    readonly_fields = ('claim', 'claimed_at', 'sent_at', 'attempts')
@@ -0,0 +1,402 @@
+"""Ventanas de tiempo del calendario, superposiciones y horarios libres.
+
+Cada ventana se traduce a un rango ``[desde, hasta)`` sobre ``starts_at`` en
+hora local, que el motor resuelve con el índice ``(owner, starts_at)`` (o
+``starts_at`` para quien ve todos los eventos): el costo de la página depende
+de los eventos de la ventana, no de los años de historial.
+
+Para las superposiciones, un evento que pisa ``[inicio, fin)`` empieza antes
+de ``fin`` y, como ningún evento dura más de ``EVENT_MAX_MINUTES``, después
+de ``inicio - EVENT_MAX_MINUTES``: la consulta es un rango acotado sobre el
+mismo índice y ``ends_at`` solo filtra las pocas filas de ese rango.
+
+Una serie (evento con ``recurrence``) es una sola fila: sus repeticiones se
+calculan al vuelo solo dentro de la ventana pedida (``expand``) y nunca se
+guardan. Editar o borrar una repetición guarda un ``ClientEventOverride``.
+Leer una ventana cuesta una consulta por las series activas y otra por sus
+cambios, sin importar cuántas repeticiones tenga cada serie.
+"""
+import datetime
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.core.pagination import KeysetPaginator
+from .models import EVENT_DEFAULT_MINUTES, EVENT_MAX_MINUTES, ClientEvent, ClientEventOverride
+
+VIEW_UPCOMING = 'proximos'
+VIEW_DAY = 'dia'
+VIEW_WEEK = 'semana'
+VIEW_MONTH = 'mes'
+VIEW_HISTORY = 'historial'
+WINDOW_VIEWS = (VIEW_DAY, VIEW_WEEK, VIEW_MONTH)
+VIEWS = (VIEW_UPCOMING, *WINDOW_VIEWS, VIEW_HISTORY)
+VIEW_LABELS = {
+    VIEW_UPCOMING: 'Próximos',
+    VIEW_DAY: 'Día',
+    VIEW_WEEK: 'Semana',
+    VIEW_MONTH: 'Mes',
+    VIEW_HISTORY: 'Historial',
+}
+
+# Jornada en la que se ofrecen horarios libres (hora local, lunes a sábado).
+WORKDAY_START = datetime.time(9)
+WORKDAY_END = datetime.time(19)
+WORK_DAYS = (0, 1, 2, 3, 4, 5)
+SLOT_STEP_MINUTES = 30
+FREE_SLOT_DAYS = 14
+FREE_SLOT_LIMIT = 8
+# Al agendar una serie se revisan sus próximas repeticiones dentro de este plazo.
+CONFLICT_OCCURRENCES = 10
+CONFLICT_DAYS = 120
+# Tramo inicial que se expande para completar una página del calendario.
+PAGE_SPAN = datetime.timedelta(days=7)
+# Las series sin fin se muestran hasta este plazo desde hoy.
+SERIES_HORIZON = datetime.timedelta(days=3660)
+OCCURRENCE_KEY_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def day_bounds(start, end):
+    """Límites ``[desde, hasta)`` en hora local para los días ``start`` a ``end`` (exclusivo)."""
+    tz = timezone.get_current_timezone()
+    low = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min), tz)
+    high = timezone.make_aware(datetime.datetime.combine(end, datetime.time.min), tz)
+    return low, high
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+@dataclass(frozen=True)
+class Window:
+    view: str
+    start: datetime.date
+    end: datetime.date  # exclusivo
+
+    def bounds(self):
+        return day_bounds(self.start, self.end)
+
+    def shifted(self, step):
+        """Ventana anterior (``-1``) o siguiente (``1``) del mismo tipo."""
+        if self.view == VIEW_MONTH:
+            return window_for(self.view, _add_months(self.start, step))
+        return window_for(self.view, self.start + (self.end - self.start) * step)
+
+    @property
+    def last_day(self):
+        return self.end - datetime.timedelta(days=1)
+
+
+def window_for(view, anchor):
+    """Ventana ``view`` (día, semana o mes) que contiene la fecha ``anchor``."""
+    if view == VIEW_DAY:
+        return Window(view, anchor, anchor + datetime.timedelta(days=1))
+    if view == VIEW_WEEK:
+        start = anchor - datetime.timedelta(days=anchor.weekday())
+        return Window(view, start, start + datetime.timedelta(days=7))
+    if view == VIEW_MONTH:
+        start = anchor.replace(day=1)
+        return Window(view, start, _add_months(start, 1))
+    raise ValueError(view)
+
+
+def in_window(events, window):
+    low, high = window.bounds()
+    return events.filter(starts_at__gte=low, starts_at__lt=high)
+
+
+def occurrence_key(moment):
+    """Inicio original de una repetición como texto para la URL."""
+    return moment.astimezone(datetime.timezone.utc).strftime(OCCURRENCE_KEY_FORMAT)
+
+
+def parse_occurrence_key(value):
+    try:
+        return datetime.datetime.strptime(value or '', OCCURRENCE_KEY_FORMAT).replace(tzinfo=datetime.timezone.utc)
+    except ValueError:
+        return None
+
+
+class Occurrence:
+    """Repetición de una serie armada al vuelo (no es una fila).
+
+    Lo que no cambia por repetición (cliente, dueño, lead) se lee de la serie.
+    """
+    is_occurrence = True
+
+    def __init__(self, event, original_start, override=None):
+        source = override or event
+        self.event = event
+        self.original_start = original_start
+        self.override = override
+        self.starts_at = override.starts_at if override else original_start
+        self.duration_minutes = source.duration_minutes
+        self.ends_at = self.starts_at + datetime.timedelta(minutes=self.duration_minutes)
+        self.title = source.title
+        self.description = source.description
+
+    def __getattr__(self, name):
+        if name == 'event':
+            raise AttributeError(name)
+        return getattr(self.event, name)
+
+    @property
+    def occurrence_key(self):
+        return occurrence_key(self.original_start)
+
+
+def single_events(events):
+    return events.filter(recurrence='')
+
+
+def active_series(events, low=None, high=None):
+    """Series de ``events`` que pueden tener repeticiones en ``[low, high)``."""
+    series = events.exclude(recurrence='')
+    if high is not None:
+        series = series.filter(starts_at__lt=high)
+    if low is not None:
+        series = series.filter(Q(series_ends_at__isnull=True) | Q(series_ends_at__gt=low))
+    return series
+
+
+def overrides_for(series, low=None, high=None):
+    """``{serie: {inicio original: cambio}}``; con ventana, solo los que la tocan."""
+    overrides = ClientEventOverride.objects.filter(event_id__in=[event.id for event in series])
+    if low is not None and high is not None:
+        overrides = overrides.filter(
+            Q(original_start__gte=low, original_start__lt=high) | Q(starts_at__gte=low, starts_at__lt=high)
+        )
+    found = {}
+    for override in overrides:
+        found.setdefault(override.event_id, {})[override.original_start] = override
+    return found
+
+
+def expand(series, low, high, overrides=None):
+    """Repeticiones de las series que empiezan en ``[low, high)``, ordenadas."""
+    series = list(series)
+    if not series:
+        return []
+    if overrides is None:
+        overrides = overrides_for(series, low, high)
+    found = []
+    for event in series:
+        changed = overrides.get(event.id, {})
+        for start in event.occurrence_starts(low, high):
+            if start not in changed:
+                found.append(Occurrence(event, start))
+        for original, override in changed.items():
+            # Un cambio que ya no coincide con la regla (la serie se editó) no cuenta.
+            if not override.cancelled and low <= override.starts_at < high and event.is_occurrence(original):
+                found.append(Occurrence(event, original, override))
+    return sorted(found, key=lambda item: (item.starts_at, item.id))
+
+
+def overlapping(owner_ids, start, end):
+    """Eventos sueltos de los dueños que se superponen con ``[start, end)``."""
+    earliest = start - datetime.timedelta(minutes=EVENT_MAX_MINUTES)
+    return single_events(ClientEvent.objects.filter(
+        owner_id__in=owner_ids, starts_at__gt=earliest, starts_at__lt=end, ends_at__gt=start,
+    ))
+
+
+def busy(owner_ids, start, end, series=None, overrides=None):
+    """Eventos y repeticiones de los dueños que se superponen con ``[start, end)``."""
+    earliest = start - datetime.timedelta(minutes=EVENT_MAX_MINUTES)
+    if series is None:
+        series = active_series(ClientEvent.objects.filter(owner_id__in=owner_ids), earliest, end)
+    found = list(overlapping(owner_ids, start, end))
+    found += [item for item in expand(series, earliest, end, overrides) if item.ends_at > start]
+    return found
+
+
+def conflicts(owner_id, starts, duration_minutes=None, exclude_id=None, exclude_occurrence=None, limit=5):
+    """Eventos del dueño que pisan alguno de los inicios ``starts`` (ordenados).
+
+    ``exclude_id`` deja afuera el evento (o la serie entera) que se está
+    editando; ``exclude_occurrence`` (serie, inicio original) solo esa repetición.
+    """
+    if not starts:
+        return []
+    duration = datetime.timedelta(minutes=duration_minutes or EVENT_DEFAULT_MINUTES)
+    found = []
+    for item in busy([owner_id], starts[0], starts[-1] + duration):
+        if item.id == exclude_id:
+            continue
+        if exclude_occurrence and (item.id, getattr(item, 'original_start', None)) == exclude_occurrence:
+            continue
+        if any(start < item.ends_at and item.starts_at < start + duration for start in starts):
+            found.append(item)
+    return sorted(found, key=lambda item: (item.starts_at, item.id))[:limit]
+
+
+def upcoming_starts(event, start):
+    """Inicios a revisar al agendar ``event``: el propio o las próximas repeticiones."""
+    if not event.recurrence:
+        return [event.starts_at]
+    starts = []
+    for moment in event.occurrence_starts(start, start + datetime.timedelta(days=CONFLICT_DAYS)):
+        starts.append(moment)
+        if len(starts) >= CONFLICT_OCCURRENCES:
+            break
+    return starts
+
+
+class CalendarPaginator(KeysetPaginator):
+    """Pagina eventos sueltos y repeticiones juntos por ``(starts_at, id)``.
+
+    Los eventos sueltos salen del índice como siempre; las repeticiones se
+    expanden desde el cursor en tramos crecientes hasta completar la página
+    (o llegar al último evento suelto leído), así que una página cuesta lo
+    mismo en el primer año que en el décimo. Una repetición usa el id de su
+    serie, que junto con el inicio sigue siendo único.
+    """
+
+    def __init__(self, events, ordering, per_page=50, low=None, high=None):
+        singles = single_events(events)
+        if low is not None:
+            singles = singles.filter(starts_at__gte=low)
+        if high is not None:
+            singles = singles.filter(starts_at__lt=high)
+        super().__init__(singles, ordering, per_page)
+        self.events = events
+        self.low = low
+        self.high = high
+
+    def _fetch(self, values, reverse=False):
+        rows = super()._fetch(values, reverse)
+        descending = self.ordering[0].startswith('-') != reverse
+        cursor = tuple(values) if values is not None else None
+        origin = cursor[0] if cursor else (self.high if descending else self.low) or timezone.now()
+        bound = self.low if descending else (self.high or timezone.now() + SERIES_HORIZON)
+        edge = rows[self.per_page].starts_at if len(rows) > self.per_page else None
+        # Con cursor, otra repetición puede compartir su inicio (con otro id).
+        upper = origin + datetime.timedelta(microseconds=1) if cursor else origin
+
+        if descending:
+            series = list(active_series(self.events, low=self.low, high=upper))
+        else:
+            series = list(active_series(self.events, low=origin, high=bound))
+        if not series:
+            return rows
+        overrides = overrides_for(series)
+
+        span = PAGE_SPAN
+        while True:
+            # ``complete``: todo lo que queda más allá de ``far`` ya está en ``rows``.
+            if descending:
+                far = origin - span if bound is None else max(origin - span, bound)
+                complete = bool(
+                    (bound is not None and far <= bound) or (edge is not None and far <= edge)
+                    or all(event.starts_at >= far for event in series)
+                )
+                items = expand(series, far, upper, overrides)
+            else:
+                far = origin + span if bound is None else min(origin + span, bound)
+                complete = bool(
+                    (bound is not None and far >= bound) or (edge is not None and far > edge)
+                    or all(event.series_ends_at is not None and event.series_ends_at <= far for event in series)
+                )
+                if edge is not None and far > edge:
+                    far = edge + datetime.timedelta(microseconds=1)
+                items = expand(series, origin, far, overrides)
+            if cursor and descending:
+                items = [item for item in items if (item.starts_at, item.id) < cursor]
+            elif cursor:
+                items = [item for item in items if (item.starts_at, item.id) > cursor]
+            merged = sorted(rows + items, key=lambda item: (item.starts_at, item.id), reverse=descending)
+            if not complete:
+                merged = [item for item in merged if (item.starts_at >= far) == descending]
+            if complete or len(merged) > self.per_page or span >= SERIES_HORIZON:
+                return merged[:self.per_page + 1]
+            span *= 4
+
+
+@dataclass(frozen=True, order=True)
+class Slot:
+    starts_at: datetime.datetime
+    owner_id: int
+    ends_at: datetime.datetime
+
+
+def _merged(intervals):
+    """Intervalos ordenados y sin solapes (los fines quedan crecientes)."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _day_slots(day, owner_ids, duration, not_before, step, series, overrides):
+    tz = timezone.get_current_timezone()
+    opens = timezone.make_aware(datetime.datetime.combine(day, WORKDAY_START), tz)
+    closes = timezone.make_aware(datetime.datetime.combine(day, WORKDAY_END), tz)
+    taken = {owner_id: [] for owner_id in owner_ids}
+    for item in busy(owner_ids, opens, closes, series, overrides):
+        taken[item.owner_id].append((item.starts_at, item.ends_at))
+    taken = {owner_id: _merged(intervals) for owner_id, intervals in taken.items()}
+    position = dict.fromkeys(owner_ids, 0)
+
+    moment = opens
+    while moment + duration <= closes:
+        if moment >= not_before:
+            for owner_id in owner_ids:
+                intervals, index = taken[owner_id], position[owner_id]
+                # El horario avanza: los intervalos que ya terminaron no vuelven a mirarse.
+                while index < len(intervals) and intervals[index][1] <= moment:
+                    index += 1
+                position[owner_id] = index
+                if index == len(intervals) or intervals[index][0] >= moment + duration:
+                    yield Slot(moment, owner_id, moment + duration)
+        moment += step
+
+
+def free_slots(owner_ids, start=None, duration_minutes=None, limit=FREE_SLOT_LIMIT, days=FREE_SLOT_DAYS):
+    """Primeros horarios libres de cualquiera de los vendedores a partir de ``start``.
+
+    Recorre los días en orden con una consulta por día para todos los
+    vendedores juntos y corta apenas junta ``limit`` horarios, así que el
+    costo depende de cuántos días hay que mirar y no del historial. Las
+    series y sus cambios se leen una vez para todo el plazo.
+    """
+    owner_ids = sorted(set(owner_ids))
+    if not owner_ids:
+        return []
+    start = start or timezone.now()
+    duration = datetime.timedelta(minutes=duration_minutes or EVENT_DEFAULT_MINUTES)
+    step = datetime.timedelta(minutes=SLOT_STEP_MINUTES)
+    first_day = timezone.localdate(start)
+    earliest = start - datetime.timedelta(minutes=EVENT_MAX_MINUTES)
+    latest = start + datetime.timedelta(days=days + 1)
+    series = list(active_series(ClientEvent.objects.filter(owner_id__in=owner_ids), earliest, latest))
+    overrides = overrides_for(series, earliest, latest)
+    slots = []
+    for offset in range(days):
+        day = first_day + datetime.timedelta(days=offset)
+        if day.weekday() not in WORK_DAYS:
+            continue
+        for slot in _day_slots(day, owner_ids, duration, start, step, series, overrides):
+            slots.append(slot)
+            if len(slots) >= limit:
+                return slots
+    return slots
+
+
+def overlap_message(found, suggestions=()):
+    """Mensaje de error del formulario ante una superposición."""
+    tz = timezone.get_current_timezone()
+    busy = ', '.join(
+        f'{event.title} ({event.starts_at.astimezone(tz):%d/%m %H:%M}-{event.ends_at.astimezone(tz):%H:%M})'
+        for event in found
+    )
+    message = f'Se superpone con: {busy}.'
+    if suggestions:
+        free = ', '.join(f'{slot.starts_at.astimezone(tz):%d/%m %H:%M}' for slot in suggestions)
+        message += f' Horarios libres: {free}.'
+    return message + ' Elige otro horario o marca "agendar igual".'
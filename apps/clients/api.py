@@ -0,0 +1,133 @@
+"""API REST de clientes (ingesta de leads y sincronización del calendario)."""
+import datetime
+
+from django.utils.dateparse import parse_date
+from rest_framework import serializers, status
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.throttling import UserRateThrottle
+
+from apps.users.permissions import access_for
+from . import agenda, ingest, sync
+from .models import ClientEvent
+
+
+class CanUseClients(IsAuthenticated):
+    """Mismo control de acceso que las vistas del módulo de clientes."""
+
+    def has_permission(self, request, view):
+        return super().has_permission(request, view) and access_for(request.user).can_use_clients
+
+
+class LeadIngestThrottle(UserRateThrottle):
+    """Límite por token/usuario (``LEAD_INGEST_RATE``) para que una campaña no sature el sitio."""
+    scope = 'lead_ingest'
+
+
+@api_view(['POST'])
+@permission_classes([CanUseClients])
+@throttle_classes([LeadIngestThrottle])
+def lead_ingest(request):
+    """Recibe un lote de leads (lista JSON o ``{"leads": [...]}``) y devuelve un resultado por ítem."""
+    payload = request.data.get('leads') if isinstance(request.data, dict) else request.data
+    if not isinstance(payload, list):
+        return Response({'detail': 'Se espera una lista de leads.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(payload) > ingest.MAX_BATCH_SIZE:
+        return Response(
+            {'detail': f'Máximo {ingest.MAX_BATCH_SIZE} leads por lote.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    outcome = ingest.ingest_payload(payload, request.user)
+    return Response({'summary': outcome.summary(), 'results': outcome.items})
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    original_start = serializers.DateTimeField()
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+    title = serializers.CharField()
+    description = serializers.CharField()
+    changed = serializers.SerializerMethodField()
+
+    def get_changed(self, item):
+        return item.override is not None
+
+
+class CalendarEventSerializer(serializers.ModelSerializer):
+    """Evento suelto o serie; las series traen su regla y las repeticiones de la ventana."""
+    recurrence = serializers.SerializerMethodField()
+    occurrences = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClientEvent
+        fields = [
+            'id', 'owner', 'client', 'lead', 'lead_name', 'lead_phone', 'title', 'description',
+            'starts_at', 'ends_at', 'duration_minutes', 'recurrence', 'occurrences', 'updated_at',
+        ]
+
+    def get_recurrence(self, event):
+        if not event.is_recurring:
+            return None
+        return {
+            'frequency': event.recurrence,
+            'interval': event.recurrence_interval,
+            'count': event.recurrence_count,
+            'until': event.recurrence_until,
+        }
+
+    def get_occurrences(self, event):
+        if not event.is_recurring:
+            return None
+        return OccurrenceSerializer(self.context['occurrences'].get(event.id, []), many=True).data
+
+
+def _sync_window(request):
+    """``start``/``end`` (fechas, ``end`` exclusiva) o la ventana por defecto; ``None`` si no es válida."""
+    start, end = request.query_params.get('start'), request.query_params.get('end')
+    if not start and not end:
+        return sync.default_window()
+    try:
+        start, end = parse_date(start or ''), parse_date(end or '')
+    except ValueError:
+        return None
+    if not start or not end or not start < end <= start + datetime.timedelta(days=sync.MAX_WINDOW_DAYS):
+        return None
+    return agenda.day_bounds(start, end)
+
+
+@api_view(['GET'])
+@permission_classes([CanUseClients])
+def calendar_sync(request):
+    """Eventos de una ventana y un ``sync_token``; con ``?sync_token=`` solo los cambios desde entonces.
+
+    Un token vencido o ajeno responde 410: la app descarta lo que tiene y pide sin token.
+    """
+    # Mismo alcance que el calendario: los administradores ven todos los eventos.
+    owner_id = None if access_for(request.user).is_admin else request.user.pk
+    token = request.query_params.get('sync_token')
+    low = high = None
+    if not token:
+        window = _sync_window(request)
+        if window is None:
+            return Response(
+                {'detail': f'Indica start y end (AAAA-MM-DD), con hasta {sync.MAX_WINDOW_DAYS} días.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        low, high = window
+    try:
+        result = sync.synchronize(request.user, owner_id, low, high, token)
+    except sync.InvalidToken:
+        return Response(
+            {'detail': 'Token de sincronización vencido o inválido. Sincroniza de nuevo sin token.'},
+            status=status.HTTP_410_GONE,
+        )
+    events = CalendarEventSerializer(result.events, many=True, context={'occurrences': result.occurrences}).data
+    return Response({
+        'full': result.full,
+        'start': result.state.low,
+        'end': result.state.high,
+        'events': events,
+        'deleted': result.deleted,
+        'sync_token': result.state.dumps(),
+    })
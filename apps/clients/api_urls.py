@@ -0,0 +1,8 @@
+"""URL patterns for the clients API."""
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path('leads/', api.lead_ingest, name='api_lead_ingest'),
+    path('calendario/', api.calendar_sync, name='api_calendar_sync'),
+]
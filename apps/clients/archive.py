@@ -0,0 +1,209 @@
+"""Archivo de clientes rápidos viejos en segmentos JSONL comprimidos.
+
+Un lead sin convertir, creado antes del corte y sin notas ni entrevistas
+posteriores, pasa a un segmento ``leads-*.jsonl.gz`` en ``LEAD_ARCHIVE_DIR``
+(una línea por lead con sus notas y entrevistas) y se borra de las tablas
+activas por tandas. Cada tanda escribe el segmento *antes* de tocar la base
+y luego borra en una transacción corta, así que el bloqueo de escritura dura
+lo que unos pocos ``DELETE`` por id, no lo que tarda comprimir.
+
+``ArchivedLead`` guarda dónde quedó cada lead y su teléfono pasa al índice
+con ``kind='archived'``: el identificador de llamadas lo sigue encontrando y
+la ficha se lee del segmento solo al abrirla. ``ArchivedInterview`` guarda
+día y dueño de sus entrevistas, para que la reconciliación de resúmenes las
+siga contando.
+"""
+from collections import Counter, defaultdict
+import datetime
+import gzip
+import json
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.audit import writer as audit
+from . import assignment, phones
+from .models import (
+    ArchivedInterview, ArchivedLead, ClientEvent, ClientLead, ClientLeadNote, LeadInterview, PhoneIndexEntry,
+)
+
+ARCHIVE_AFTER_DAYS = 180
+# Por debajo de esto se archivarían leads que todavía se están trabajando.
+MIN_ARCHIVE_DAYS = 30
+CHUNK_SIZE = 250
+# Leads por archivo: leer un lead archivado descomprime como mucho un segmento.
+SEGMENT_LEADS = 10000
+LEAD_FIELDS = ('id', 'name', 'phone', 'source', 'owner_id', 'idempotency_key', 'created_at')
+NOTE_FIELDS = ('lead_id', 'author_id', 'content', 'created_at')
+INTERVIEW_FIELDS = ('lead_id', 'owner_id', 'title', 'scheduled_at', 'notes', 'created_at')
+
+
+def archive_dir():
+    return Path(getattr(settings, 'LEAD_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'leads'))
+
+
+def archive_after_days():
+    return getattr(settings, 'LEAD_ARCHIVE_AFTER_DAYS', ARCHIVE_AFTER_DAYS)
+
+
+def cutoff_for(days=None):
+    return timezone.now() - datetime.timedelta(days=archive_after_days() if days is None else days)
+
+
+def stale_leads(cutoff):
+    """Leads sin convertir creados antes de ``cutoff`` y sin actividad desde entonces."""
+    recent_notes = ClientLeadNote.objects.filter(lead=OuterRef('pk'), created_at__gte=cutoff)
+    recent_interviews = LeadInterview.objects.filter(lead=OuterRef('pk'), scheduled_at__gte=cutoff)
+    return (
+        ClientLead.objects.filter(converted_at__isnull=True, created_at__lt=cutoff)
+        .exclude(Exists(recent_notes))
+        .exclude(Exists(recent_interviews))
+    )
+
+
+def _records(leads):
+    lead_ids = [lead['id'] for lead in leads]
+    notes, interviews = defaultdict(list), defaultdict(list)
+    for note in ClientLeadNote.objects.filter(lead_id__in=lead_ids).order_by('created_at', 'id').values(*NOTE_FIELDS):
+        notes[note.pop('lead_id')].append(note)
+    for interview in (
+        LeadInterview.objects.filter(lead_id__in=lead_ids).order_by('scheduled_at', 'id').values(*INTERVIEW_FIELDS)
+    ):
+        interviews[interview.pop('lead_id')].append(interview)
+    return [{**lead, 'notes': notes[lead['id']], 'interviews': interviews[lead['id']]} for lead in leads]
+
+
+class SegmentWriter:
+    """Agrega tandas de registros a segmentos ``.jsonl.gz`` que rotan cada ``max_leads``.
+
+    Cada tanda es un miembro gzip completo y se sincroniza a disco antes de
+    volver: si el proceso muere después, el segmento sigue siendo legible.
+    """
+
+    def __init__(self, directory=None, max_leads=SEGMENT_LEADS):
+        self.directory = Path(directory or archive_dir())
+        self.max_leads = max_leads
+        self.name = None
+        self.lines = 0
+
+    def _open_segment(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = timezone.now().strftime('%Y%m%d-%H%M%S')
+        sequence = 1
+        while (self.directory / f'leads-{stamp}-{sequence:03d}.jsonl.gz').exists():
+            sequence += 1
+        self.name = f'leads-{stamp}-{sequence:03d}.jsonl.gz'
+        self.lines = 0
+
+    def write(self, records):
+        """Escribe los registros y devuelve ``(segmento, línea)`` de cada uno."""
+        if self.name is None or self.lines >= self.max_leads:
+            self._open_segment()
+        positions = []
+        with open(self.directory / self.name, 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb') as out:
+                for record in records:
+                    out.write(json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False).encode('utf-8') + b'\n')
+                    positions.append((self.name, self.lines))
+                    self.lines += 1
+            raw.flush()
+            os.fsync(raw.fileno())
+        return positions
+
+
+def _delete_rows(model, column, ids):
+    """``DELETE`` directo por ids: sin cargar instancias ni disparar señales."""
+    qn = connection.ops.quote_name
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {qn(model._meta.db_table)} WHERE {qn(column)} IN ({placeholders})', list(ids))
+        return cursor.rowcount
+
+
+def archive_chunk(cutoff, writer, size=CHUNK_SIZE):
+    """Archiva la próxima tanda de leads viejos. Devuelve ``(leads, segundos con bloqueo)``."""
+    with transaction.atomic():
+        leads = list(stale_leads(cutoff).order_by('created_at', 'id').values(*LEAD_FIELDS)[:size])
+        if not leads:
+            return 0, 0.0
+        # Primero el disco: la base solo se modifica si el segmento ya quedó escrito.
+        records = _records(leads)
+        positions = writer.write(records)
+        lead_ids = [lead['id'] for lead in leads]
+        archived = [
+            ArchivedLead(
+                lead_id=lead['id'], name=lead['name'], phone=lead['phone'], source=lead['source'],
+                owner_id=lead['owner_id'], idempotency_key=lead['idempotency_key'], created_at=lead['created_at'],
+                segment=segment, line=line,
+            )
+            for lead, (segment, line) in zip(leads, positions)
+        ]
+        interviews = [
+            ArchivedInterview(
+                lead_id=record['id'], owner_id=interview['owner_id'], scheduled_at=interview['scheduled_at'],
+            )
+            for record in records for interview in record['interviews']
+        ]
+        entries = [entry for entry in (phones.build_entry('archived', row) for row in archived) if entry is not None]
+
+        locked_at = time.monotonic()
+        ArchivedLead.objects.bulk_create(archived)
+        ArchivedInterview.objects.bulk_create(interviews)
+        # El teléfono del lead queda en el índice como archivado; los eventos
+        # del calendario conservan nombre y teléfono copiados y pierden el vínculo.
+        PhoneIndexEntry.objects.filter(kind='lead', object_id__in=lead_ids).delete()
+        PhoneIndexEntry.objects.bulk_create(entries)
+        PhoneIndexEntry.objects.filter(kind='event', lead_id__in=lead_ids).update(lead=None)
+        ClientEvent.objects.filter(lead_id__in=lead_ids).update(lead=None, updated_at=timezone.now())
+        # Los resúmenes diarios siguen contando notas y entrevistas archivadas: no hay señales.
+        _delete_rows(ClientLeadNote, 'lead_id', lead_ids)
+        _delete_rows(LeadInterview, 'lead_id', lead_ids)
+        _delete_rows(ClientLead, 'id', lead_ids)
+        for owner_id, total in Counter(lead['owner_id'] for lead in leads).items():
+            assignment.adjust(owner_id, -total)
+    return len(leads), time.monotonic() - locked_at
+
+
+def archive_leads(cutoff, size=CHUNK_SIZE, pause=0.0, limit=None, actor=None, writer=None):
+    """Archiva por tandas hasta agotar los leads viejos (o llegar a ``limit``).
+
+    ``pause`` deja un respiro entre tandas para que entren otras escrituras.
+    Devuelve ``(leads archivados, tandas, máximo de segundos con bloqueo)``.
+    """
+    writer = writer or SegmentWriter()
+    archived = chunks = 0
+    longest = 0.0
+    while limit is None or archived < limit:
+        count, locked = archive_chunk(cutoff, writer, size if limit is None else min(size, limit - archived))
+        if not count:
+            break
+        archived += count
+        chunks += 1
+        longest = max(longest, locked)
+        if pause:
+            time.sleep(pause)
+    if archived:
+        audit.record(
+            'archive_leads', actor=actor,
+            details=f'Archivo de clientes rápidos anteriores a {cutoff:%Y-%m-%d}: {archived} leads en {chunks} tandas.',
+        )
+    return archived, chunks, longest
+
+
+def read_record(archived):
+    """Registro completo (lead, notas y entrevistas) de un ``ArchivedLead``."""
+    path = archive_dir() / archived.segment
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as segment:
+            for number, line in enumerate(segment):
+                if number == archived.line:
+                    return json.loads(line)
+    except OSError:
+        return None
+    return None
@@ -0,0 +1,158 @@
+"""Asignación automática de leads a vendedores.
+
+Estrategias:
+
+- ``round_robin``: turno rotativo (el que menos leads recibió en total).
+- ``least_open``: el que tiene menos leads abiertos (sin convertir).
+- ``weighted``: rotativo ponderado por rol (``LEAD_ASSIGNMENT_ROLE_WEIGHTS``).
+
+Los candidatos salen del directorio en memoria y la carga de cada uno de
+``LeadLoad``, así que elegir dueño cuesta lo mismo con cien o con un millón
+de leads. El vendedor se reserva con un UPDATE condicional sobre su contador:
+si otro worker lo tomó entre la lectura y la escritura, el UPDATE no afecta
+filas y se vuelve a elegir con los contadores nuevos.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+
+from apps.users import directory
+from apps.users.models import UserProfile
+from .models import ClientLead, LeadLoad
+
+STRATEGY_ROUND_ROBIN = 'round_robin'
+STRATEGY_LEAST_OPEN = 'least_open'
+STRATEGY_WEIGHTED = 'weighted'
+STRATEGIES = (STRATEGY_ROUND_ROBIN, STRATEGY_LEAST_OPEN, STRATEGY_WEIGHTED)
+
+ASSIGNEE_ROLES = (UserProfile.ROLE_VENDOR, UserProfile.ROLE_NEGOTIATOR)
+DEFAULT_ROLE_WEIGHTS = {UserProfile.ROLE_VENDOR: 2, UserProfile.ROLE_NEGOTIATOR: 1}
+MAX_ATTEMPTS = 5
+
+
+def get_strategy():
+    strategy = getattr(settings, 'LEAD_ASSIGNMENT_STRATEGY', STRATEGY_LEAST_OPEN)
+    return strategy if strategy in STRATEGIES else STRATEGY_LEAST_OPEN
+
+
+def role_weights():
+    return {**DEFAULT_ROLE_WEIGHTS, **getattr(settings, 'LEAD_ASSIGNMENT_ROLE_WEIGHTS', {})}
+
+
+def candidates():
+    """``{id: rol}`` de vendedores/negociadores activos (sin consultar la base)."""
+    return {
+        entry.id: entry.role
+        for entry in directory.entries()
+        if entry.is_active and entry.role in ASSIGNEE_ROLES
+    }
+
+
+def _read_loads(owner_ids):
+    rows = LeadLoad.objects.filter(owner_id__in=owner_ids).values_list('owner_id', 'open_leads', 'assigned_total')
+    return {owner_id: (open_leads, assigned_total) for owner_id, open_leads, assigned_total in rows}
+
+
+def _loads(owner_ids):
+    """``{owner_id: (abiertos, asignados)}``; crea los contadores que falten."""
+    loads = _read_loads(owner_ids)
+    missing = [owner_id for owner_id in owner_ids if owner_id not in loads]
+    if missing:
+        # Un vendedor nuevo entra a la rotación al nivel del resto, no en cero.
+        start = min((total for _, total in loads.values()), default=0)
+        LeadLoad.objects.bulk_create(
+            [LeadLoad(owner_id=owner_id, assigned_total=start) for owner_id in missing],
+            ignore_conflicts=True,
+        )
+        loads.update(_read_loads(missing))
+    return loads
+
+
+def _sort_key(strategy, roles, weights):
+    if strategy == STRATEGY_ROUND_ROBIN:
+        return lambda item: (item[1][1], item[0])
+    if strategy == STRATEGY_WEIGHTED:
+        return lambda item: ((item[1][1] + 1) / max(weights.get(roles[item[0]], 1), 1), item[0])
+    return lambda item: (item[1][0], item[1][1], item[0])
+
+
+def pick_owner(strategy=None):
+    """Elige y reserva un vendedor. Devuelve su id (o ``None`` si no hay candidatos).
+
+    La reserva suma uno a sus leads abiertos y asignados; el lead debe
+    guardarse en la misma transacción.
+    """
+    roles = candidates()
+    if not roles:
+        return None
+    key = _sort_key(strategy or get_strategy(), roles, role_weights())
+    for _ in range(MAX_ATTEMPTS):
+        owner_id, (open_leads, assigned_total) = min(_loads(list(roles)).items(), key=key)
+        claimed = LeadLoad.objects.filter(owner_id=owner_id, assigned_total=assigned_total).update(
+            open_leads=F('open_leads') + 1,
+            assigned_total=F('assigned_total') + 1,
+        )
+        if claimed:
+            return owner_id
+    # Mucha contención: se asigna igual al último elegido.
+    adjust(owner_id, 1, assigned=1)
+    return owner_id
+
+
+def adjust(owner_id, delta, assigned=0):
+    """Suma ``delta`` a los leads abiertos del vendedor (y ``assigned`` al total)."""
+    if not owner_id or not (delta or assigned):
+        return
+    changes = {'open_leads': F('open_leads') + delta}
+    if assigned:
+        changes['assigned_total'] = F('assigned_total') + assigned
+    if not LeadLoad.objects.filter(owner_id=owner_id).update(**changes):
+        _loads([owner_id])
+        LeadLoad.objects.filter(owner_id=owner_id).update(**changes)
+
+
+def assign(lead, strategy=None, fallback_id=None):
+    """Asigna dueño a un lead nuevo sin dueño (antes de guardarlo).
+
+    Sin vendedores activos el lead queda a nombre de ``fallback_id`` (quien lo carga).
+    """
+    lead.owner_id = pick_owner(strategy)
+    if lead.owner_id is None and fallback_id:
+        lead.owner_id = fallback_id
+        adjust(fallback_id, 1, assigned=1)
+    # La reserva ya contó este lead: la señal de alta no debe volver a sumarlo.
+    lead._load_counted = True
+    return lead.owner_id
+
+
+@transaction.atomic
+def assign_new_leads(leads, strategy=None, fallback_id=None):
+    """Asigna y cuenta leads nuevos que se guardarán con ``bulk_create`` (sin señales)."""
+    counts = Counter()
+    for lead in leads:
+        if lead.owner_id is None:
+            assign(lead, strategy, fallback_id)
+        else:
+            counts[lead.owner_id] += 1
+            lead._load_counted = True
+    for owner_id, total in counts.items():
+        adjust(owner_id, total, assigned=total)
+
+
+@transaction.atomic
+def rebuild_loads():
+    """Recalcula los leads abiertos por vendedor (única operación que cuenta la tabla)."""
+    open_by_owner = dict(
+        ClientLead.objects.filter(owner__isnull=False, converted_at__isnull=True)
+        .order_by()
+        .values_list('owner')
+        .annotate(total=Count('id'))
+    )
+    owner_ids = set(open_by_owner) | set(candidates())
+    _loads(list(owner_ids))
+    LeadLoad.objects.exclude(owner_id__in=owner_ids).update(open_leads=0)
+    for owner_id in owner_ids:
+        LeadLoad.objects.filter(owner_id=owner_id).update(open_leads=open_by_owner.get(owner_id, 0))
+    return open_by_owner
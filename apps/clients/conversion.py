@@ -0,0 +1,103 @@
+"""Conversión de clientes rápidos (leads) en clientes.
+
+Todo el lote se resuelve en una transacción corta con operaciones por
+conjunto: un ``bulk_create`` de clientes, ``UPDATE`` con subconsulta para
+repuntar eventos e índice de teléfonos, y un ``INSERT ... SELECT`` que copia
+las notas del lead a ``ClientNote``. El costo no depende de cuántas notas o
+eventos tenga cada lead.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from apps.audit import writer as audit
+from . import assignment, feeds, phones, realtime, rollups, search
+from .forms import split_full_name
+from .models import Client, ClientEvent, ClientLead, ClientLeadNote, ClientNote, PhoneIndexEntry
+
+MAX_CONVERT = 1000
+
+
+def _lead_client():
+    """Subconsulta: cliente del lead referenciado por la fila externa."""
+    return Subquery(ClientLead.objects.filter(pk=OuterRef('lead_id')).values('client_id')[:1])
+
+
+def _copy_notes(lead_ids):
+    """Copia las notas de los leads al cliente convertido en una sola sentencia."""
+    qn = connection.ops.quote_name
+    note = ClientNote._meta
+    lead_note = ClientLeadNote._meta
+    lead = ClientLead._meta
+    placeholders = ', '.join(['%s'] * len(lead_ids))
+    sql = (
+        f'INSERT INTO {qn(note.db_table)} (client_id, author_id, content, created_at) '
+        f'SELECT l.client_id, n.author_id, n.content, n.created_at '
+        f'FROM {qn(lead_note.db_table)} n JOIN {qn(lead.db_table)} l ON l.id = n.lead_id '
+        f'WHERE n.lead_id IN ({placeholders}) ORDER BY n.created_at, n.id'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, list(lead_ids))
+        return cursor.rowcount
+
+
+def convert_leads(leads, actor=None):
+    """Convierte los leads (queryset) que aún no fueron convertidos.
+
+    Devuelve ``{lead_id: cliente}``. Los clientes quedan con los datos del
+    lead (nombre y teléfono) y el resto se completa luego en el formulario.
+    """
+    with transaction.atomic():
+        leads = list(
+            leads.filter(converted_at__isnull=True)
+            .select_for_update()
+            .only('id', 'name', 'phone', 'source', 'owner_id', 'created_at')
+            .order_by('id')[:MAX_CONVERT]
+        )
+        if not leads:
+            return {}
+        clients = []
+        for lead in leads:
+            first_name, last_name, company_name = split_full_name(lead.name or f'Lead {lead.id}')
+            clients.append(Client(
+                owner_id=lead.owner_id,
+                first_name=first_name,
+                last_name=last_name,
+                company_name=company_name,
+                phone=lead.phone,
+                birth_date=None,
+            ))
+        Client.objects.bulk_create(clients)
+        lead_ids = [lead.id for lead in leads]
+        converted = dict(zip(lead_ids, clients))
+
+        # Lead -> cliente en un UPDATE (CASE por id) y el resto por subconsulta.
+        now = timezone.now()
+        for lead, client in zip(leads, clients):
+            lead.client_id = client.pk
+            lead.converted_at = now
+        ClientLead.objects.bulk_update(leads, ['client', 'converted_at'])
+        # Los eventos pasan al cliente; las copias de nombre/teléfono del lead ya no hacen falta.
+        feeds.touch(set(ClientEvent.objects.filter(lead_id__in=lead_ids).values_list('owner_id', flat=True)))
+        ClientEvent.objects.filter(lead_id__in=lead_ids, client__isnull=True).update(
+            client_id=_lead_client(), lead_name='', lead_phone='', updated_at=now,
+        )
+        PhoneIndexEntry.objects.filter(kind='event', lead_id__in=lead_ids).delete()
+        PhoneIndexEntry.objects.filter(kind='lead', object_id__in=lead_ids).update(client_id=_lead_client())
+        notes = _copy_notes(lead_ids)
+        ClientLeadNote.objects.filter(lead_id__in=lead_ids).delete()
+
+        # bulk_create no dispara señales: índices y contadores a mano.
+        search.index_clients([client.pk for client in clients])
+        phones.index_objects('client', clients)
+        for owner_id, total in Counter(lead.owner_id for lead in leads).items():
+            assignment.adjust(owner_id, -total)
+        rollups.leads_converted(leads)
+        realtime.leads_removed(leads)
+        audit.record(
+            'convert_leads', actor=actor,
+            details=f'Conversión de clientes rápidos: {len(clients)} clientes, {notes} notas copiadas.',
+        )
+    return converted
@@ -0,0 +1,221 @@
+"""Detección de clientes duplicados.
+
+Los candidatos se agrupan por claves de bloqueo (CUIT normalizado, tipo y
+número de documento y los últimos dígitos del teléfono). La similitud de
+nombres solo se calcula entre clientes del mismo bloque, así el costo crece
+con la cantidad de clientes y no con la cantidad de pares posibles.
+"""
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import phones
+from .models import Client, DuplicateCandidate, PhoneIndexEntry, normalize_cuit
+from .search import fold
+
+# Peso de cada clave de bloqueo en el puntaje final (el resto es similitud de nombre).
+REASON_WEIGHTS = {
+    DuplicateCandidate.REASON_CUIT: 0.6,
+    DuplicateCandidate.REASON_DOC: 0.5,
+    DuplicateCandidate.REASON_PHONE: 0.3,
+}
+# Bloques más grandes suelen ser datos basura (p. ej. teléfono 00000000).
+MAX_BLOCK_SIZE = 50
+DEFAULT_MIN_SCORE = 0.5
+NAME_FIELDS = ('id', 'first_name', 'last_name', 'company_name')
+
+
+def client_name(client):
+    return fold(client.company_name or f'{client.first_name} {client.last_name}').strip()
+
+
+def name_similarity(a, b):
+    if not a or not b:
+        return 0.0
+    # Ignora el orden de las palabras ("Pérez Juan" == "Juan Pérez").
+    a = ' '.join(sorted(a.split()))
+    b = ' '.join(sorted(b.split()))
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def score(reasons, similarity):
+    base = max(REASON_WEIGHTS[reason] for reason in reasons)
+    # Más de una clave en común suma confianza.
+    bonus = 0.1 * (len(reasons) - 1)
+    return min(1.0, base + bonus + 0.4 * similarity)
+
+
+def _sorted_blocks(rows, key):
+    """Agrupa filas contiguas con la misma clave.
+
+    ``rows`` llega ordenado por la clave (recorriendo el índice), así que
+    cada bloque se arma en una sola pasada sin mantener toda la tabla en memoria.
+    """
+    for block_key, group in groupby(rows, key=key):
+        if not block_key:
+            continue
+        ids = [row[-1] for row in group]
+        if 1 < len(ids) <= MAX_BLOCK_SIZE:
+            yield ids
+
+
+def _cuit_blocks():
+    rows = Client.objects.exclude(cuit='').order_by('cuit').values_list('cuit', 'id')
+    return _sorted_blocks(rows.iterator(chunk_size=5000), key=lambda row: row[0])
+
+
+def _doc_blocks():
+    rows = (
+        Client.objects.exclude(doc_number='')
+        .order_by('doc_type', 'doc_number')
+        .values_list('doc_type', 'doc_number', 'id')
+    )
+    return _sorted_blocks(rows.iterator(chunk_size=5000), key=lambda row: (row[0], row[1]))
+
+
+def _phone_blocks():
+    # En dígitos invertidos, los teléfonos con el mismo final quedan contiguos.
+    rows = (
+        PhoneIndexEntry.objects.filter(kind='client')
+        .order_by('digits_reversed')
+        .values_list('digits_reversed', 'client_id')
+    )
+
+    def suffix(row):
+        key = row[0][:phones.SUFFIX_DIGITS]
+        return key if len(key) == phones.SUFFIX_DIGITS else None
+
+    return _sorted_blocks(rows.iterator(chunk_size=5000), key=suffix)
+
+
+BLOCKERS = {
+    DuplicateCandidate.REASON_CUIT: _cuit_blocks,
+    DuplicateCandidate.REASON_DOC: _doc_blocks,
+    DuplicateCandidate.REASON_PHONE: _phone_blocks,
+}
+
+
+def find_candidates(min_score=DEFAULT_MIN_SCORE):
+    """Pares ``(id_a, id_b) -> (motivos, similitud, puntaje)`` con puntaje >= ``min_score``."""
+    pairs = {}
+    for reason, blocks in BLOCKERS.items():
+        for ids in blocks():
+            for a, b in combinations(sorted(set(ids)), 2):
+                pairs.setdefault((a, b), set()).add(reason)
+    names = {}
+    ids = sorted({client_id for pair in pairs for client_id in pair})
+    for start in range(0, len(ids), 2000):
+        chunk = ids[start:start + 2000]
+        for client in Client.objects.filter(id__in=chunk).only(*NAME_FIELDS):
+            names[client.id] = client_name(client)
+    results = {}
+    for (a, b), reasons in pairs.items():
+        similarity = name_similarity(names.get(a, ''), names.get(b, ''))
+        value = score(reasons, similarity)
+        if value >= min_score:
+            results[(a, b)] = (sorted(reasons), similarity, value)
+    return results
+
+
+@transaction.atomic
+def rebuild_candidates(min_score=DEFAULT_MIN_SCORE):
+    """Recalcula la tabla de candidatos a fusión. Devuelve la cantidad de pares."""
+    results = find_candidates(min_score=min_score)
+    # Los pares descartados a mano se conservan y no se vuelven a proponer.
+    dismissed = set(DuplicateCandidate.objects.filter(dismissed=True).values_list('client_a_id', 'client_b_id'))
+    results = {pair: value for pair, value in results.items() if pair not in dismissed}
+    DuplicateCandidate.objects.filter(dismissed=False).delete()
+    DuplicateCandidate.objects.bulk_create(
+        [
+            DuplicateCandidate(
+                client_a_id=a,
+                client_b_id=b,
+                reasons=','.join(reasons),
+                name_similarity=round(similarity, 3),
+                score=round(value, 3),
+            )
+            for (a, b), (reasons, similarity, value) in results.items()
+        ],
+        batch_size=1000,
+    )
+    return len(results)
+
+
+def possible_duplicates(cuit='', doc_type='', doc_number='', phone='', exclude_id=None, limit=5):
+    """Clientes que comparten CUIT, documento o teléfono (para avisar en el alta).
+
+    Usa los índices de ``cuit``, ``(doc_type, doc_number)`` y de teléfonos.
+    """
+    condition = Q()
+    cuit = normalize_cuit(cuit)
+    if cuit:
+        condition |= Q(cuit=cuit)
+    if doc_type and doc_number:
+        condition |= Q(doc_type=doc_type, doc_number=doc_number)
+    suffix = phones.phone_suffix(phone)
+    if len(suffix) == phones.SUFFIX_DIGITS:
+        low, high = phones.suffix_range(suffix)
+        # Usa el índice (kind, digits_reversed): igualdad en ``kind`` y rango en los dígitos.
+        client_ids = list(
+            PhoneIndexEntry.objects.filter(kind='client', digits_reversed__gte=low, digits_reversed__lt=high)
+            .values_list('client_id', flat=True)[:MAX_BLOCK_SIZE]
+        )
+        if client_ids:
+            condition |= Q(id__in=client_ids)
+    if not condition:
+        return []
+    qs = Client.objects.filter(condition).only(*NAME_FIELDS, 'cuit', 'doc_type', 'doc_number', 'phone')
+    if exclude_id:
+        qs = qs.exclude(id=exclude_id)
+    return list(qs[:limit])
+
+
+def known_pairs(client_id, others):
+    """Ids de ``others`` que ya forman un par registrado (pendiente o descartado) con ``client_id``."""
+    ids = [other.pk for other in others]
+    pairs = DuplicateCandidate.objects.filter(
+        Q(client_a_id=client_id, client_b_id__in=ids) | Q(client_b_id=client_id, client_a_id__in=ids)
+    ).values_list('client_a_id', 'client_b_id')
+    return {b if a == client_id else a for a, b in pairs}
+
+
+def _shared_reasons(client, other):
+    reasons = []
+    if client.cuit and normalize_cuit(client.cuit) == normalize_cuit(other.cuit):
+        reasons.append(DuplicateCandidate.REASON_CUIT)
+    if client.doc_number and (client.doc_type, client.doc_number) == (other.doc_type, other.doc_number):
+        reasons.append(DuplicateCandidate.REASON_DOC)
+    suffix = phones.phone_suffix(client.phone)
+    if len(suffix) == phones.SUFFIX_DIGITS and suffix == phones.phone_suffix(other.phone):
+        reasons.append(DuplicateCandidate.REASON_PHONE)
+    return reasons
+
+
+def record_pairs(client, others, dismissed=False):
+    """Registra los pares ``client``/``others`` para que el aviso no se repita.
+
+    Con ``dismissed`` el usuario confirmó que son clientes distintos; si no,
+    quedan pendientes de revisión junto a los que arma ``find_duplicate_clients``.
+    """
+    rows = []
+    for other in others:
+        reasons = _shared_reasons(client, other) or [DuplicateCandidate.REASON_PHONE]
+        similarity = name_similarity(client_name(client), client_name(other))
+        a, b = sorted([client.pk, other.pk])
+        rows.append(DuplicateCandidate(
+            client_a_id=a,
+            client_b_id=b,
+            reasons=','.join(reasons),
+            name_similarity=round(similarity, 3),
+            score=round(score(reasons, similarity), 3),
+            dismissed=dismissed,
+        ))
+    if dismissed:
+        # Un par ya pendiente pasa a descartado.
+        DuplicateCandidate.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['client_a', 'client_b'], update_fields=['dismissed'],
+        )
+    else:
+        DuplicateCandidate.objects.bulk_create(rows, ignore_conflicts=True)
@@ -0,0 +1,79 @@
+"""Exportación de clientes (con cotitular) en CSV o NDJSON.
+
+Las filas se generan de a una sobre ``iterator(chunk_size=...)`` con el
+cotitular unido, así que la memoria no depende del tamaño de la cartera.
+"""
+import csv
+import datetime
+import json
+
+from .models import Client
+
+CHUNK_SIZE = 2000
+
+CLIENT_FIELDS = [
+    'id', 'owner_id', 'first_name', 'last_name', 'company_name', 'doc_type', 'doc_number',
+    'birth_date', 'sex', 'marital_status', 'nationality', 'tax_condition', 'cuit',
+    'street', 'street_number', 'floor', 'apartment', 'postal_code', 'city', 'province',
+    'phone', 'email', 'employment', 'created_at', 'updated_at',
+]
+COHOLDER_FIELDS = [
+    'full_name', 'doc_type', 'sex', 'dni', 'birth_date', 'nationality', 'phone', 'email', 'employment',
+]
+HEADER = CLIENT_FIELDS + [f'coholder_{name}' for name in COHOLDER_FIELDS]
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def export_queryset(owner=None):
+    qs = Client.objects.select_related('coholder').order_by('id')
+    if owner is not None:
+        qs = qs.filter(owner=owner)
+    return qs
+
+
+def _value(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def iter_records(queryset, chunk_size=CHUNK_SIZE):
+    """Tuplas en el orden de ``HEADER``."""
+    empty = [None] * len(COHOLDER_FIELDS)
+    for client in queryset.iterator(chunk_size=chunk_size):
+        row = [_value(getattr(client, name)) for name in CLIENT_FIELDS]
+        coholder = getattr(client, 'coholder', None)
+        if coholder is None:
+            row.extend(empty)
+        else:
+            row.extend(_value(getattr(coholder, name)) for name in COHOLDER_FIELDS)
+        yield row
+
+
+class _Echo:
+    """Buffer de una línea para ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(HEADER)  # BOM para Excel
+    for row in iter_records(queryset, chunk_size):
+        yield writer.writerow(['' if value is None else value for value in row])
+
+
+def iter_ndjson(queryset, chunk_size=CHUNK_SIZE):
+    for row in iter_records(queryset, chunk_size):
+        yield json.dumps(dict(zip(HEADER, row)), ensure_ascii=False) + '\n'
+
+
+def iter_export(queryset, fmt, chunk_size=CHUNK_SIZE):
+    if fmt == 'ndjson':
+        return iter_ndjson(queryset, chunk_size)
+    return iter_csv(queryset, chunk_size)
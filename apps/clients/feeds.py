@@ -0,0 +1,276 @@
+"""Feed iCalendar por vendedor (eventos y entrevistas de lead).
+
+Las apps de calendario del teléfono piden el feed cada pocos minutos. Cada
+pedido lee solo la fila de ``CalendarFeed`` del token: si el ETag (dueño,
+versión y día) coincide con el del cliente se responde 304 sin tocar la
+tabla de eventos. Si no, el ``.ics`` sale de la caché con clave por versión,
+y solo cuando la versión cambió se vuelve a armar desde la base con una
+ventana acotada de fechas.
+
+Las series van como un solo VEVENT con ``RRULE``: el teléfono expande las
+repeticiones, las canceladas van en ``EXDATE`` y las cambiadas como VEVENT
+con ``RECURRENCE-ID``. El tamaño del feed depende de las series, no de sus
+repeticiones. Como la agenda repite en hora local, las series van con
+``TZID`` y un ``VTIMEZONE`` de la zona del sitio: así el día del mes y la
+hora no se corren con el horario de verano ni cerca de medianoche en UTC.
+
+Las señales de ``ClientEvent``, ``ClientEventOverride`` y ``LeadInterview``
+suben la versión del dueño (``touch``), y las de ``ClientLead`` la de quienes
+tienen entrevistas con ese lead si cambia su nombre o teléfono; las
+operaciones en lote la suben a mano.
+"""
+import datetime
+import functools
+import secrets
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from . import agenda
+from .models import RECURRENCE_DAILY, RECURRENCE_MONTHLY, RECURRENCE_WEEKLY, CalendarFeed, ClientEvent, LeadInterview
+
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 180
+# Las entrevistas sin evento no tienen fin: ocupan una hora en el calendario.
+INTERVIEW_DURATION = 'PT1H'
+CACHE_TIMEOUT = 60 * 60 * 24
+PRODID = '-//Concesionario//Agenda de clientes//ES'
+FREQUENCIES = {RECURRENCE_DAILY: 'DAILY', RECURRENCE_WEEKLY: 'WEEKLY', RECURRENCE_MONTHLY: 'MONTHLY'}
+
+
+def _cache_key(owner_id, version, day):
+    return f'clients:ics:{owner_id}:{version}:{day:%Y%m%d}'
+
+
+def feed_for(user):
+    """Feed del usuario (lo crea con un token nuevo la primera vez)."""
+    feed, _ = CalendarFeed.objects.get_or_create(owner=user, defaults={'token': secrets.token_urlsafe(32)})
+    return feed
+
+
+def rotate_token(user):
+    """Invalida la URL anterior del feed."""
+    feed = feed_for(user)
+    feed.token = secrets.token_urlsafe(32)
+    feed.save(update_fields=['token'])
+    return feed
+
+
+def touch(owner_ids):
+    """Sube la versión del feed de los dueños indicados (si tienen feed)."""
+    owner_ids = {owner_id for owner_id in owner_ids if owner_id}
+    if owner_ids:
+        CalendarFeed.objects.filter(owner_id__in=owner_ids).update(version=F('version') + 1, changed_at=timezone.now())
+
+
+def touch_lead(lead_id):
+    """El nombre o teléfono del lead sale en sus entrevistas: sube el feed de sus dueños."""
+    touch(LeadInterview.objects.filter(lead_id=lead_id).order_by().values_list('owner_id', flat=True).distinct())
+
+
+def validators(feed, day=None):
+    """``(etag, last_modified)`` del feed.
+
+    La ventana se corre un día por vez, así que el día también entra en el
+    ETag aunque no haya cambios.
+    """
+    day = day or timezone.localdate()
+    midnight = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    etag = f'"{feed.owner_id}-{feed.version}-{day:%Y%m%d}"'
+    return etag, max(feed.changed_at, midnight)
+
+
+def _escape(value):
+    return (
+        (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Corta líneas de más de 75 octetos (RFC 5545 §3.1)."""
+    raw = line.encode('utf-8')
+    if len(raw) <= 75:
+        return line
+    parts, current = [], b''
+    for char in line:
+        encoded = char.encode('utf-8')
+        if len(current) + len(encoded) > (75 if not parts else 74):
+            parts.append(current.decode('utf-8'))
+            current = b''
+        current += encoded
+    parts.append(current.decode('utf-8'))
+    return '\r\n '.join(parts)
+
+
+def _stamp(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local_stamp(value):
+    return timezone.localtime(value).strftime('%Y%m%dT%H%M%S')
+
+
+def _offset(value):
+    minutes = int(value.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+@functools.lru_cache(maxsize=16)
+def _transitions(tz, first_year, last_year):
+    """Cambios de hora de ``tz`` entre esos años: ``[(instante UTC, offset anterior, offset nuevo)]``.
+
+    Recorre día por día y busca el minuto exacto del cambio por bisección.
+    """
+    moment = datetime.datetime(first_year, 1, 1, tzinfo=datetime.timezone.utc)
+    end = datetime.datetime(last_year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+    offset = moment.astimezone(tz).utcoffset()
+    found = []
+    while moment < end:
+        following = moment + datetime.timedelta(days=1)
+        changed = following.astimezone(tz).utcoffset()
+        if changed != offset:
+            low, high = 0, 24 * 60
+            while high - low > 1:
+                middle = (low + high) // 2
+                if (moment + datetime.timedelta(minutes=middle)).astimezone(tz).utcoffset() == offset:
+                    low = middle
+                else:
+                    high = middle
+            found.append((moment + datetime.timedelta(minutes=high), offset, changed))
+            offset = changed
+        moment = following
+    return tuple(found)
+
+
+def _vtimezone(tzid, first_year, last_year):
+    """``VTIMEZONE`` de la zona del sitio con sus cambios de hora entre esos años."""
+    tz = timezone.get_current_timezone()
+    start = datetime.datetime(first_year, 1, 1, tzinfo=datetime.timezone.utc).astimezone(tz)
+    observances = [(start.replace(tzinfo=None), start.utcoffset(), start.utcoffset(), start)]
+    for instant, before, after in _transitions(tz, first_year, last_year):
+        # DTSTART de cada observancia: la hora local todavía con el offset anterior.
+        observances.append(((instant + before).replace(tzinfo=None), before, after, instant.astimezone(tz)))
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{tzid}']
+    for local_start, before, after, moment in observances:
+        kind = 'DAYLIGHT' if moment.dst() else 'STANDARD'
+        lines += [
+            f'BEGIN:{kind}',
+            f'DTSTART:{local_start:%Y%m%dT%H%M%S}',
+            f'TZOFFSETFROM:{_offset(before)}',
+            f'TZOFFSETTO:{_offset(after)}',
+            f'TZNAME:{moment.tzname()}',
+            f'END:{kind}',
+        ]
+    lines.append('END:VTIMEZONE')
+    return lines
+
+
+def _rrule(event):
+    """Regla RFC 5545 equivalente a la de la serie (en hora local, salvo ``UNTIL`` en UTC)."""
+    parts = [f'FREQ={FREQUENCIES[event.recurrence]}']
+    if event.recurrence_interval > 1:
+        parts.append(f'INTERVAL={event.recurrence_interval}')
+    day = timezone.localtime(event.starts_at).day
+    if event.recurrence == RECURRENCE_MONTHLY and day > 28:
+        # Mismo criterio que la agenda: en meses más cortos cae el último día.
+        parts.append(f'BYMONTHDAY={",".join(str(value) for value in range(28, day + 1))};BYSETPOS=-1')
+    if event.recurrence_until:
+        parts.append(f'UNTIL={_stamp(event.last_occurrence_start())}')
+    elif event.recurrence_count:
+        parts.append(f'COUNT={event.recurrence_count}')
+    return 'RRULE:' + ';'.join(parts)
+
+
+def _moment(name, value, tzid=None):
+    return f'{name};TZID={tzid}:{_local_stamp(value)}' if tzid else f'{name}:{_stamp(value)}'
+
+
+def _vevent(uid, starts_at, summary, description, stamp, ends_at=None, extra=(), tzid=None):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{_stamp(stamp)}',
+        _moment('DTSTART', starts_at, tzid),
+        _moment('DTEND', ends_at, tzid) if ends_at else f'DURATION:{INTERVIEW_DURATION}',
+        f'SUMMARY:{_escape(summary)}',
+        *extra,
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _contact(name, phone):
+    return ' - '.join(part for part in (name, phone) if part)
+
+
+def render(feed, day=None):
+    """Texto ``.ics`` de los eventos y entrevistas del dueño en la ventana del día."""
+    day = day or timezone.localdate()
+    low = timezone.make_aware(datetime.datetime.combine(day - datetime.timedelta(days=FEED_PAST_DAYS), datetime.time.min))
+    high = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=FEED_FUTURE_DAYS), datetime.time.min))
+    owned = ClientEvent.objects.filter(owner_id=feed.owner_id)
+    events = list(
+        agenda.single_events(owned).filter(starts_at__gte=low, starts_at__lt=high)
+        .order_by('starts_at', 'id')
+        .values_list('id', 'title', 'description', 'starts_at', 'ends_at', 'lead_id', 'lead_name', 'lead_phone')
+    )
+    # Las entrevistas creadas desde la bandeja ya tienen su evento en el calendario.
+    booked = {(lead_id, starts_at) for _, _, _, starts_at, _, lead_id, _, _ in events if lead_id}
+    interviews = (
+        LeadInterview.objects.filter(owner_id=feed.owner_id, scheduled_at__gte=low, scheduled_at__lt=high)
+        .order_by('scheduled_at', 'id')
+        .values_list('id', 'title', 'notes', 'scheduled_at', 'lead_id', 'lead__name', 'lead__phone')
+    )
+    series = list(agenda.active_series(owned, low, high).order_by('starts_at', 'id'))
+    overrides = agenda.overrides_for(series)
+    tzid = str(timezone.get_current_timezone())
+
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN', 'X-WR-CALNAME:Agenda']
+    if series:
+        lines += _vtimezone(tzid, timezone.localtime(series[0].starts_at).year, high.year + 1)
+    for event_id, title, description, starts_at, ends_at, _, lead_name, lead_phone in events:
+        text = '\n'.join(part for part in (_contact(lead_name, lead_phone), description) if part)
+        lines += _vevent(f'event-{event_id}@clientes', starts_at, title, text, feed.changed_at, ends_at)
+    for event in series:
+        uid = f'event-{event.id}@clientes'
+        contact = _contact(event.lead_name, event.lead_phone)
+        text = '\n'.join(part for part in (contact, event.description) if part)
+        changed = [
+            override for original, override in sorted(overrides.get(event.id, {}).items())
+            if event.is_occurrence(original)
+        ]
+        extra = [_rrule(event)] + [
+            _moment('EXDATE', override.original_start, tzid) for override in changed if override.cancelled
+        ]
+        lines += _vevent(uid, event.starts_at, event.title, text, feed.changed_at, event.ends_at, extra, tzid)
+        for override in changed:
+            if not override.cancelled:
+                item = agenda.Occurrence(event, override.original_start, override)
+                text = '\n'.join(part for part in (contact, item.description) if part)
+                lines += _vevent(
+                    uid, item.starts_at, item.title, text, feed.changed_at, item.ends_at,
+                    [_moment('RECURRENCE-ID', override.original_start, tzid)], tzid,
+                )
+    for interview_id, title, notes, scheduled_at, lead_id, lead_name, lead_phone in interviews:
+        if (lead_id, scheduled_at) in booked:
+            continue
+        text = '\n'.join(part for part in (_contact(lead_name, lead_phone), notes) if part)
+        lines += _vevent(f'interview-{interview_id}@clientes', scheduled_at, title, text, feed.changed_at)
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_fold(line) for line in lines) + '\r\n'
+
+
+def cached_render(feed, day=None):
+    """``render`` guardado en caché por dueño, versión y día."""
+    day = day or timezone.localdate()
+    key = _cache_key(feed.owner_id, feed.version, day)
+    body = cache.get(key)
+    if body is None:
+        body = render(feed, day)
+        cache.set(key, body, CACHE_TIMEOUT)
+    return body
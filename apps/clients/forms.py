@@ -2,10 +2,26 @@
 import datetime
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
-from django.contrib.auth.models import User
-from apps.users.models import UserProfile
-from .models import Client, CoHolder, ClientEvent, ClientLead, ClientLeadNote, LeadInterview, validate_cuit
+from apps.users.fields import AssignableUserField
+from apps.users.permissions import access_for
+from . import agenda, assignment
+from .duplicates import known_pairs, possible_duplicates
+from .models import (
+    EVENT_DEFAULT_MINUTES, EVENT_MAX_MINUTES, Client, CoHolder, ClientEvent, ClientEventOverride, ClientLead,
+    ClientLeadNote, LeadInterview, validate_cuit,
+)
+
+
+def split_full_name(full_name):
+    """Divide "Nombre Apellido" en ``(first_name, last_name, company_name)``."""
+    full_name = (full_name or '').strip()
+    # Divide el nombre en nombre y apellido (o deja apellido vacío si no hay segundo término)
+    parts = full_name.split(None, 1)
+    first_name = parts[0] if parts else ''
+    last_name = parts[1] if len(parts) > 1 else ''
+    return first_name, last_name, full_name
 
 
 class ClientForm(forms.ModelForm):
@@ -16,9 +32,14 @@ class ClientForm(forms.ModelForm):
         required=False,
         max_length=200,
     )
+    confirm_duplicate = forms.BooleanField(
+        label='Es un cliente distinto, guardar igual',
+        required=False,
+    )
 
     def __init__(self, *args, **kwargs):
         self.request_user = kwargs.pop('user', None)
+        self.duplicates = []
         super().__init__(*args, **kwargs)
         instance = getattr(self, 'instance', None)
         if instance:
@@ -29,25 +50,9 @@ class ClientForm(forms.ModelForm):
                 self.fields['full_name'].initial = initial_name
 
         if self.request_user:
-            profile = getattr(self.request_user, 'profile', None)
-            role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-            is_admin = self.request_user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+            is_admin = access_for(self.request_user).is_full_admin
             if is_admin:
-                qs = User.objects.filter(profile__role__in=[
-                    UserProfile.ROLE_VENDOR,
-                    UserProfile.ROLE_NEGOTIATOR,
-                    UserProfile.ROLE_MANAGER,
-                    UserProfile.ROLE_ACCOUNTANT,
-                    UserProfile.ROLE_MARKETING,
-                    UserProfile.ROLE_SUPERVISOR,
-                    UserProfile.ROLE_ADMIN,
-                ]).distinct()
-                self.fields['owner'] = forms.ModelChoiceField(
-                    queryset=qs,
-                    required=False,
-                    label='Asignar a',
-                    widget=forms.Select(attrs={'class': 'form-select'})
-                )
+                self.fields['owner'] = AssignableUserField()
             else:
                 if 'owner' in self.fields:
                     self.fields.pop('owner')
@@ -94,23 +99,54 @@ class ClientForm(forms.ModelForm):
         full_name = cleaned.get('full_name', '').strip()
         if not full_name:
             raise forms.ValidationError('Ingresar Nombre y apellido o Razón Social.')
-        # Divide el nombre en nombre y apellido (o deja apellido vacío si no hay segundo término)
-        parts = full_name.split(None, 1)
-        cleaned['first_name'] = parts[0]
-        cleaned['last_name'] = parts[1] if len(parts) > 1 else ''
-        cleaned['company_name'] = full_name
+        cleaned['first_name'], cleaned['last_name'], cleaned['company_name'] = split_full_name(full_name)
+        self._check_duplicates(cleaned)
         return cleaned
 
+    def _check_duplicates(self, cleaned):
+        """Avisa si ya existe un cliente con el mismo CUIT, documento o teléfono.
+
+        Solo el alta se frena hasta marcar "guardar igual"; al editar es un aviso que
+        muestra la vista. Los pares ya registrados (pendientes o descartados) no se repiten,
+        salvo al marcar "guardar igual": así un par pendiente pasa a descartado.
+        """
+        found = possible_duplicates(
+            cuit=cleaned.get('cuit', ''),
+            doc_type=cleaned.get('doc_type', ''),
+            doc_number=cleaned.get('doc_number', ''),
+            phone=cleaned.get('phone', ''),
+            exclude_id=self.instance.pk,
+        )
+        if found and self.instance.pk and not cleaned.get('confirm_duplicate'):
+            known = known_pairs(self.instance.pk, found)
+            found = [client for client in found if client.pk not in known]
+        self.duplicates = found
+        if not found or self.instance.pk or cleaned.get('confirm_duplicate'):
+            return
+        raise forms.ValidationError(
+            f'Posible duplicado: {self.duplicates_text()} con el mismo CUIT, documento o teléfono. '
+            'Revisa los datos o marca "guardar igual".'
+        )
+
+    def duplicates_text(self):
+        access = access_for(self.request_user) if self.request_user else None
+        if access and access.is_full_admin:
+            return ', '.join(str(client) for client in self.duplicates)
+        # Un vendedor no debe ver los clientes de otros vendedores.
+        return f'{len(self.duplicates)} cliente(s) existente(s)'
+
     def clean_cuit(self):
         value = self.cleaned_data.get('cuit', '')
         validate_cuit(value)
         return value
 
 
-class ClientEventForm(forms.ModelForm):
-    """Formulario para agendar eventos con clientes."""
+def _confirm_overlap_field():
+    return forms.BooleanField(label='Agendar igual (acepto la superposición)', required=False)
+
 
-    start_date = forms.DateField(
+def _start_date_field():
+    return forms.DateField(
         label='Fecha',
         input_formats=['%d/%m/%Y'],
         widget=forms.TextInput(attrs={
@@ -122,7 +158,10 @@ class ClientEventForm(forms.ModelForm):
             'maxlength': '10',
         }),
     )
-    start_time = forms.TimeField(
+
+
+def _start_time_field():
+    return forms.TimeField(
         label='Hora',
         input_formats=['%H:%M'],
         widget=forms.TextInput(attrs={
@@ -135,39 +174,73 @@ class ClientEventForm(forms.ModelForm):
         })
     )
 
+
+def _combine_start(cleaned):
+    """Fecha + hora del formulario como datetime con zona (o error si falta alguna)."""
+    date = cleaned.get('start_date')
+    time = cleaned.get('start_time')
+    if not (date and time):
+        raise ValidationError('Completa fecha y hora.')
+    combined = datetime.datetime.combine(date, time)
+    if timezone.is_naive(combined):
+        combined = timezone.make_aware(combined, timezone.get_current_timezone())
+    return combined
+
+
+def _check_overlap(form, cleaned, starts, duration_minutes, owner=None, exclude_id=None, exclude_occurrence=None):
+    """Avisa si el dueño ya tiene un evento que pisa alguno de los inicios elegidos."""
+    owner = owner or cleaned.get('owner') or form.request_user
+    if owner is None or cleaned.get('confirm_overlap') or not starts:
+        return
+    form.conflicts = agenda.conflicts(
+        owner.pk, starts, duration_minutes, exclude_id=exclude_id, exclude_occurrence=exclude_occurrence,
+    )
+    if form.conflicts:
+        suggestions = agenda.free_slots([owner.pk], max(starts[0], timezone.now()), duration_minutes, limit=4)
+        raise ValidationError(agenda.overlap_message(form.conflicts, suggestions))
+
+
+EVENT_WIDGETS = {
+    'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: Reunión de seguimiento'}),
+    'duration_minutes': forms.NumberInput(attrs={'class': 'form-control', 'min': 5, 'max': EVENT_MAX_MINUTES, 'step': 5}),
+    'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Notas, lugar, agenda'}),
+}
+# Cambiar cualquiera de estos campos de una serie invalida los cambios puntuales de sus repeticiones.
+SCHEDULE_FIELDS = {'start_date', 'start_time', 'recurrence', 'recurrence_interval'}
+
+
+class ClientEventForm(forms.ModelForm):
+    """Formulario para agendar eventos con clientes."""
+
+    start_date = _start_date_field()
+    start_time = _start_time_field()
+    recurrence_until = forms.DateField(
+        label='Repetir hasta',
+        required=False,
+        input_formats=['%d/%m/%Y'],
+        widget=forms.DateInput(format='%d/%m/%Y', attrs={'class': 'form-control', 'placeholder': 'dd/mm/aaaa'}),
+    )
+    confirm_overlap = _confirm_overlap_field()
+
     def __init__(self, *args, **kwargs):
         self.request_user = kwargs.pop('user', None)
+        self.conflicts = []
         super().__init__(*args, **kwargs)
         if self.request_user:
-            profile = getattr(self.request_user, 'profile', None)
-            role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-            is_admin = self.request_user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+            is_admin = access_for(self.request_user).is_full_admin
             if not is_admin:
                 self.fields['client'].queryset = Client.objects.filter(owner=self.request_user)
             self.fields['client'].required = False
             self.fields['client'].empty_label = '(Sin cliente)'
             if is_admin:
-                qs_users = User.objects.filter(profile__role__in=[
-                    UserProfile.ROLE_VENDOR,
-                    UserProfile.ROLE_NEGOTIATOR,
-                    UserProfile.ROLE_MANAGER,
-                    UserProfile.ROLE_ACCOUNTANT,
-                    UserProfile.ROLE_MARKETING,
-                    UserProfile.ROLE_SUPERVISOR,
-                    UserProfile.ROLE_ADMIN,
-                ]).distinct()
-                self.fields['owner'] = forms.ModelChoiceField(
-                    queryset=qs_users,
-                    required=False,
-                    label='Asignar a',
-                    widget=forms.Select(attrs={'class': 'form-select'})
-                )
+                self.fields['owner'] = AssignableUserField()
             else:
                 if 'owner' in self.fields:
                     self.fields.pop('owner')
         # Campo starts_at queda oculto y se rellena combinando fecha + hora.
         self.fields['starts_at'].widget = forms.HiddenInput()
         self.fields['starts_at'].required = False
+        self.fields['recurrence_interval'].required = False
 
         # Si hay instancia, precarga fecha y hora.
         starts_at = getattr(self.instance, 'starts_at', None)
@@ -177,27 +250,46 @@ class ClientEventForm(forms.ModelForm):
 
     class Meta:
         model = ClientEvent
-        fields = ['title', 'client', 'starts_at', 'description', 'start_date', 'start_time', 'owner']
+        fields = [
+            'title', 'client', 'starts_at', 'duration_minutes', 'description', 'start_date', 'start_time', 'owner',
+            'recurrence', 'recurrence_interval', 'recurrence_count', 'recurrence_until',
+        ]
         widgets = {
-            'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ej: Reunión de seguimiento'}),
+            **EVENT_WIDGETS,
             'client': forms.Select(attrs={'class': 'form-select'}),
-            'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Notas, lugar, agenda'}),
+            'recurrence': forms.Select(attrs={'class': 'form-select'}),
+            'recurrence_interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'max': 99}),
+            'recurrence_count': forms.NumberInput(attrs={'class': 'form-control', 'min': 1, 'placeholder': 'Sin límite'}),
         }
 
     def clean(self):
         cleaned = super().clean()
-        date = cleaned.get('start_date')
-        time = cleaned.get('start_time')
-        if date and time:
-            combined = datetime.datetime.combine(date, time)
-            if timezone.is_naive(combined):
-                combined = timezone.make_aware(combined, timezone.get_current_timezone())
-            cleaned['starts_at'] = combined
-        else:
-            raise ValidationError('Completa fecha y hora.')
+        combined = _combine_start(cleaned)
+        cleaned['starts_at'] = combined
+        cleaned['recurrence_interval'] = cleaned.get('recurrence_interval') or 1
+        if not cleaned.get('recurrence'):
+            cleaned['recurrence_count'] = None
+            cleaned['recurrence_until'] = None
+            cleaned['recurrence_interval'] = 1
+        elif cleaned.get('recurrence_count') and cleaned.get('recurrence_until'):
+            raise ValidationError('Indica la cantidad de repeticiones o la fecha límite, no ambas.')
+        elif cleaned.get('recurrence_until') and cleaned['recurrence_until'] < combined.date():
+            raise ValidationError('La fecha límite de la serie es anterior al primer evento.')
+        schedule = ClientEvent(
+            starts_at=combined,
+            recurrence=cleaned.get('recurrence') or '',
+            recurrence_interval=cleaned['recurrence_interval'],
+            recurrence_count=cleaned.get('recurrence_count'),
+            recurrence_until=cleaned.get('recurrence_until'),
+        )
+        # Una serie se revisa en sus próximas repeticiones, no en todas.
+        starts = agenda.upcoming_starts(schedule, max(combined, timezone.now()))
+        _check_overlap(self, cleaned, starts, cleaned.get('duration_minutes'), exclude_id=self.instance.pk)
         return cleaned
 
     def save(self, commit=True):
+        if self.instance.pk and self.instance.recurrence and SCHEDULE_FIELDS & set(self.changed_data):
+            self.instance.overrides.all().delete()
         self.instance.starts_at = self.cleaned_data.get('starts_at')
         if 'owner' in self.cleaned_data and self.cleaned_data.get('owner'):
             self.instance.owner = self.cleaned_data.get('owner')
@@ -206,6 +298,45 @@ class ClientEventForm(forms.ModelForm):
         return super().save(commit=commit)
 
 
+class ClientEventOccurrenceForm(forms.ModelForm):
+    """Cambio de una sola repetición de una serie (el resto no se toca)."""
+
+    start_date = _start_date_field()
+    start_time = _start_time_field()
+    confirm_overlap = _confirm_overlap_field()
+
+    def __init__(self, *args, event=None, original_start=None, user=None, **kwargs):
+        self.request_user = user
+        self.event = event
+        self.original_start = original_start
+        self.conflicts = []
+        super().__init__(*args, **kwargs)
+        starts_at = timezone.localtime(self.instance.starts_at)
+        self.fields['start_date'].initial = starts_at.date()
+        self.fields['start_time'].initial = starts_at.time().replace(second=0, microsecond=0)
+
+    class Meta:
+        model = ClientEventOverride
+        fields = ['title', 'duration_minutes', 'description']
+        widgets = EVENT_WIDGETS
+
+    def clean(self):
+        cleaned = super().clean()
+        cleaned['starts_at'] = _combine_start(cleaned)
+        _check_overlap(
+            self, cleaned, [cleaned['starts_at']], cleaned.get('duration_minutes'),
+            owner=self.event.owner, exclude_occurrence=(self.event.id, self.original_start),
+        )
+        return cleaned
+
+    def save(self, commit=True):
+        self.instance.event = self.event
+        self.instance.original_start = self.original_start
+        self.instance.starts_at = self.cleaned_data['starts_at']
+        self.instance.cancelled = False
+        return super().save(commit=commit)
+
+
 class ClientLeadForm(forms.ModelForm):
     """Formulario para leads rápidos (nombre/teléfono opcionales)."""
 
@@ -213,25 +344,9 @@ class ClientLeadForm(forms.ModelForm):
         self.request_user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if self.request_user:
-            profile = getattr(self.request_user, 'profile', None)
-            role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-            is_admin = self.request_user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+            is_admin = access_for(self.request_user).is_full_admin
             if is_admin:
-                qs_users = User.objects.filter(profile__role__in=[
-                    UserProfile.ROLE_VENDOR,
-                    UserProfile.ROLE_NEGOTIATOR,
-                    UserProfile.ROLE_MANAGER,
-                    UserProfile.ROLE_ACCOUNTANT,
-                    UserProfile.ROLE_MARKETING,
-                    UserProfile.ROLE_SUPERVISOR,
-                    UserProfile.ROLE_ADMIN,
-                ]).distinct()
-                self.fields['owner'] = forms.ModelChoiceField(
-                    queryset=qs_users,
-                    required=False,
-                    label='Asignar a',
-                    widget=forms.Select(attrs={'class': 'form-select'})
-                )
+                self.fields['owner'] = AssignableUserField(help_text='Vacío: asignación automática.')
             else:
                 if 'owner' in self.fields:
                     self.fields.pop('owner')
@@ -246,11 +361,17 @@ class ClientLeadForm(forms.ModelForm):
         }
 
     def save(self, commit=True):
-        if 'owner' in self.cleaned_data and self.cleaned_data.get('owner'):
-            self.instance.owner = self.cleaned_data.get('owner')
-        elif self.request_user:
-            self.instance.owner = self.request_user
-        return super().save(commit=commit)
+        # La reserva del vendedor y el alta del lead van en la misma transacción:
+        # si el guardado falla, el contador de carga vuelve atrás.
+        with transaction.atomic():
+            if 'owner' in self.cleaned_data and self.cleaned_data.get('owner'):
+                self.instance.owner = self.cleaned_data.get('owner')
+            elif 'owner' in self.fields and self.instance.pk is None:
+                # Un admin que no elige dueño deja el lead al motor de asignación.
+                assignment.assign(self.instance, fallback_id=getattr(self.request_user, 'pk', None))
+            elif self.request_user:
+                self.instance.owner = self.request_user
+            return super().save(commit=commit)
 
 
 class ClientLeadNoteForm(forms.ModelForm):
@@ -267,29 +388,24 @@ class ClientLeadNoteForm(forms.ModelForm):
 class LeadInterviewForm(forms.ModelForm):
     """Formulario de entrevista para lead."""
 
+    # Duración del evento que se crea en el calendario junto con la entrevista.
+    duration_minutes = forms.IntegerField(
+        label='Duración (min)',
+        min_value=5,
+        max_value=EVENT_MAX_MINUTES,
+        initial=EVENT_DEFAULT_MINUTES,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 5}),
+    )
+    confirm_overlap = _confirm_overlap_field()
+
     def __init__(self, *args, **kwargs):
         self.request_user = kwargs.pop('user', None)
+        self.conflicts = []
         super().__init__(*args, **kwargs)
         if self.request_user:
-            profile = getattr(self.request_user, 'profile', None)
-            role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-            is_admin = self.request_user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+            is_admin = access_for(self.request_user).is_full_admin
             if is_admin:
-                qs_users = User.objects.filter(profile__role__in=[
-                    UserProfile.ROLE_VENDOR,
-                    UserProfile.ROLE_NEGOTIATOR,
-                    UserProfile.ROLE_MANAGER,
-                    UserProfile.ROLE_ACCOUNTANT,
-                    UserProfile.ROLE_MARKETING,
-                    UserProfile.ROLE_SUPERVISOR,
-                    UserProfile.ROLE_ADMIN,
-                ]).distinct()
-                self.fields['owner'] = forms.ModelChoiceField(
-                    queryset=qs_users,
-                    required=False,
-                    label='Asignar a',
-                    widget=forms.Select(attrs={'class': 'form-select'})
-                )
+                self.fields['owner'] = AssignableUserField()
             else:
                 if 'owner' in self.fields:
                     self.fields.pop('owner')
@@ -308,6 +424,12 @@ class LeadInterviewForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'Notas'}),
         }
 
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get('scheduled_at'):
+            _check_overlap(self, cleaned, [cleaned['scheduled_at']], cleaned.get('duration_minutes'))
+        return cleaned
+
     def save(self, commit=True):
         if 'owner' in self.cleaned_data and self.cleaned_data.get('owner'):
             self.instance.owner = self.cleaned_data.get('owner')
@@ -0,0 +1,181 @@
+"""Ingesta en lote de leads de plataformas de anuncios.
+
+Cada lote se deduplica contra la base con dos consultas (claves de
+idempotencia y últimos dígitos del teléfono) y se inserta con un solo
+``bulk_create`` dentro de una transacción, así que el costo por lead es
+constante y la petición no retiene al worker más que unos milisegundos.
+
+Un lead archivado (``archive.py``) sigue frenando los reenvíos con su clave
+de idempotencia, pero no su teléfono: si la misma persona vuelve a consultar
+meses después, es un lead nuevo.
+"""
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from rest_framework import serializers
+
+from apps.users.permissions import access_for
+from . import assignment, phones, realtime, rollups
+from .models import ArchivedLead, ClientLead, PhoneIndexEntry
+
+MAX_BATCH_SIZE = 1000
+# Cantidad de rangos de teléfono por consulta (evita sentencias enormes).
+PHONE_CHUNK = 200
+
+STATUS_CREATED = 'created'
+STATUS_DUPLICATE = 'duplicate'
+STATUS_INVALID = 'invalid'
+
+
+class LeadIngestSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=150, required=False, allow_blank=True, default='')
+    phone = serializers.CharField(max_length=30, required=False, allow_blank=True, default='')
+    source = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    idempotency_key = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if not attrs['name'].strip() and not attrs['phone'].strip():
+            raise serializers.ValidationError('Se requiere nombre o teléfono.')
+        return attrs
+
+
+@dataclass
+class IngestResult:
+    items: list = field(default_factory=list)
+
+    def count(self, status):
+        return sum(1 for item in self.items if item['status'] == status)
+
+    def summary(self):
+        return {
+            STATUS_CREATED: self.count(STATUS_CREATED),
+            STATUS_DUPLICATE: self.count(STATUS_DUPLICATE),
+            STATUS_INVALID: self.count(STATUS_INVALID),
+        }
+
+
+def _existing_keys(keys):
+    if not keys:
+        return {}
+    found = dict(ArchivedLead.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', 'lead_id'))
+    found.update(ClientLead.objects.filter(idempotency_key__in=keys).values_list('idempotency_key', 'id'))
+    return found
+
+
+def _existing_phones(suffixes):
+    """``{sufijo: lead_id}`` para leads ya cargados con esos últimos dígitos."""
+    found = {}
+    suffixes = sorted(suffixes)
+    for start in range(0, len(suffixes), PHONE_CHUNK):
+        condition = Q()
+        for suffix in suffixes[start:start + PHONE_CHUNK]:
+            low, high = phones.suffix_range(suffix)
+            condition |= Q(digits_reversed__gte=low, digits_reversed__lt=high)
+        # Sin filtrar por ``kind`` en SQL: con un OR de rangos SQLite solo usa el índice de
+        # dígitos invertidos (un rango por teléfono) si no hay otra condición; con ``kind``
+        # recorre todos los leads.
+        rows = PhoneIndexEntry.objects.filter(condition).values_list('kind', 'digits', 'object_id')
+        for kind, digits, lead_id in rows:
+            if kind == 'lead':
+                found.setdefault(phones.phone_suffix(digits), lead_id)
+    return found
+
+
+def _dedupe_keys(item):
+    """Claves del ítem: la de idempotencia y los últimos dígitos del teléfono."""
+    keys = []
+    if item.get('idempotency_key'):
+        keys.append(('key', item['idempotency_key']))
+    suffix = phones.phone_suffix(item.get('phone', ''))
+    if len(suffix) == phones.SUFFIX_DIGITS:
+        keys.append(('phone', suffix))
+    return keys
+
+
+def _ingest(items, owner, fallback_id):
+    item_keys = [_dedupe_keys(item) for item in items]
+    wanted = {key for keys in item_keys for key in keys}
+    # Lead existente (id) o lead nuevo de este mismo lote (instancia) por clave.
+    known = {('key', key): lead_id for key, lead_id in _existing_keys(
+        [value for kind, value in wanted if kind == 'key']
+    ).items()}
+    known.update({('phone', suffix): lead_id for suffix, lead_id in _existing_phones(
+        [value for kind, value in wanted if kind == 'phone']
+    ).items()})
+
+    results, to_create = [], []
+    for index, (item, keys) in enumerate(zip(items, item_keys)):
+        match = next((known[key] for key in keys if key in known), None)
+        if match is not None:
+            results.append({'index': index, 'status': STATUS_DUPLICATE, 'lead': match})
+            continue
+        lead = ClientLead(
+            name=item.get('name', ''),
+            phone=item.get('phone', ''),
+            source=item.get('source', ''),
+            owner=owner,
+            idempotency_key=item.get('idempotency_key') or None,
+        )
+        to_create.append(lead)
+        results.append({'index': index, 'status': STATUS_CREATED, 'lead': lead})
+        for key in keys:
+            known[key] = lead
+
+    with transaction.atomic():
+        # Los leads sin dueño se reparten entre los vendedores y se cuentan.
+        assignment.assign_new_leads(to_create, fallback_id=fallback_id)
+        ClientLead.objects.bulk_create(to_create)
+        # bulk_create no dispara señales: índice de teléfonos, resumen diario y avisos a mano.
+        phones.index_objects('lead', to_create)
+        rollups.count_leads([(rollups.local_day(lead.created_at), lead.source, lead.owner_id) for lead in to_create])
+        realtime.leads_created(to_create)
+    for result in results:
+        lead = result.pop('lead')
+        result['id'] = lead.pk if isinstance(lead, ClientLead) else lead
+    return results
+
+
+def ingest_leads(items, owner=None, fallback_id=None):
+    """Crea los leads válidos de ``items`` (dicts ya validados).
+
+    Sin ``owner`` se reparten entre los vendedores (o quedan a nombre de
+    ``fallback_id`` si no hay ninguno activo). Devuelve un resultado por ítem en
+    el mismo orden. Si otro lote insertó la misma clave al mismo tiempo, se
+    reintenta una vez: la segunda pasada la ve como duplicada.
+    """
+    try:
+        return IngestResult(items=_ingest(items, owner, fallback_id))
+    except IntegrityError:
+        return IngestResult(items=_ingest(items, owner, fallback_id))
+
+
+def owner_for(user):
+    """Los leads de un vendedor quedan a su nombre; los de una integración (admin), sin asignar."""
+    return None if access_for(user).is_full_admin else user
+
+
+def ingest_payload(payload, user):
+    """Valida cada ítem de ``payload`` (lista de dicts) y crea los válidos a nombre de ``user``.
+
+    Lo usan la API y ``replay_leads`` en modo local: los inválidos quedan en su
+    posición con los errores y el resto pasa por ``ingest_leads``.
+    """
+    results = [None] * len(payload)
+    valid, positions = [], []
+    # Un solo serializer para todo el lote: armar los campos por ítem cuesta más que validar.
+    serializer = LeadIngestSerializer()
+    for index, raw in enumerate(payload):
+        try:
+            valid.append(serializer.run_validation(raw if isinstance(raw, dict) else {}))
+        except serializers.ValidationError as exc:
+            results[index] = {'index': index, 'status': STATUS_INVALID, 'errors': exc.detail}
+            continue
+        positions.append(index)
+
+    outcome = ingest_leads(valid, owner=owner_for(user), fallback_id=user.pk)
+    for position, item in zip(positions, outcome.items):
+        item['index'] = position
+        results[position] = item
+    outcome.items = results
+    return outcome
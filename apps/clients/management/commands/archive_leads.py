@@ -0,0 +1,38 @@
+"""Archiva clientes rápidos viejos en segmentos JSONL comprimidos."""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clients import archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve a LEAD_ARCHIVE_DIR los leads sin convertir y sin actividad desde hace más de '
+        'LEAD_ARCHIVE_AFTER_DAYS días, borrándolos por tandas cortas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Antigüedad mínima en días (por defecto LEAD_ARCHIVE_AFTER_DAYS).')
+        parser.add_argument('--chunk-size', type=int, default=archive.CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0.05, help='Segundos de espera entre tandas.')
+        parser.add_argument('--limit', type=int, help='Máximo de leads a archivar en esta corrida.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo cuenta los leads a archivar.')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else archive.archive_after_days()
+        if days < archive.MIN_ARCHIVE_DAYS:
+            raise CommandError(f'La antigüedad mínima es {archive.MIN_ARCHIVE_DAYS} días.')
+        cutoff = archive.cutoff_for(days)
+        if options['dry_run']:
+            total = archive.stale_leads(cutoff).count()
+            self.stdout.write(f'{total} leads anteriores a {cutoff:%d/%m/%Y} se archivarían.')
+            return
+        archived, chunks, longest = archive.archive_leads(
+            cutoff,
+            size=max(options['chunk_size'], 1),
+            pause=options['pause'],
+            limit=options['limit'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{archived} leads archivados en {chunks} tandas en {archive.archive_dir()} '
+            f'(tanda más larga con bloqueo: {longest * 1000:.0f} ms).'
+        ))
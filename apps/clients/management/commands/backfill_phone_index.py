@@ -0,0 +1,49 @@
+"""Carga el índice de teléfonos con los datos existentes."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.clients import phones
+from apps.clients.models import ArchivedLead, Client, ClientEvent, ClientLead, CoHolder, PhoneIndexEntry
+
+SOURCES = [
+    ('client', lambda: Client.objects.only('id', 'first_name', 'last_name', 'company_name', 'phone', 'owner_id')),
+    ('coholder', lambda: CoHolder.objects.select_related('client').only(
+        'id', 'full_name', 'phone', 'client__id', 'client__first_name', 'client__last_name',
+        'client__company_name', 'client__owner_id',
+    )),
+    ('lead', lambda: ClientLead.objects.only('id', 'name', 'phone', 'owner_id')),
+    ('event', lambda: ClientEvent.objects.exclude(lead_phone='').only(
+        'id', 'title', 'lead_name', 'lead_phone', 'client_id', 'lead_id', 'owner_id', 'starts_at',
+    )),
+    ('archived', lambda: ArchivedLead.objects.only('lead_id', 'name', 'phone', 'owner_id')),
+]
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de teléfonos en lotes (clientes, cotitulares, leads, eventos y leads archivados).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        for kind, queryset in SOURCES:
+            total = 0
+            last_id = 0
+            # Lotes por id: cada lote reemplaza sus entradas en una transacción corta, así
+            # que las búsquedas siguen encontrando todo mientras corre la reconstrucción.
+            while True:
+                batch = list(queryset().filter(pk__gt=last_id).order_by('pk')[:chunk_size])
+                if not batch:
+                    break
+                with transaction.atomic():
+                    phones.index_objects(kind, batch)
+                    # Entradas de objetos que ya no existen dentro del tramo del lote.
+                    PhoneIndexEntry.objects.filter(
+                        kind=kind, object_id__gt=last_id, object_id__lte=batch[-1].pk,
+                    ).exclude(object_id__in=[obj.pk for obj in batch]).delete()
+                total += len(batch)
+                last_id = batch[-1].pk
+            PhoneIndexEntry.objects.filter(kind=kind, object_id__gt=last_id).delete()
+            self.stdout.write(f'{kind}: {total} registros procesados.')
+        self.stdout.write(self.style.SUCCESS('Índice de teléfonos actualizado.'))
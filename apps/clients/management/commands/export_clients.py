@@ -0,0 +1,30 @@
+"""Exporta la cartera de clientes a disco (comprimida)."""
+import gzip
+
+from django.core.management.base import BaseCommand
+
+from apps.clients import export
+
+
+class Command(BaseCommand):
+    help = 'Exporta clientes y cotitulares a CSV o NDJSON comprimido con gzip.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo de salida (se agrega .gz si falta y no se usa --no-gzip).')
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='csv')
+        parser.add_argument('--no-gzip', action='store_true')
+        parser.add_argument('--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        compress = not options['no_gzip']
+        if compress and not path.endswith('.gz'):
+            path += '.gz'
+        opener = gzip.open if compress else open
+        rows = 0
+        with opener(path, 'wt', encoding='utf-8', newline='') as out:
+            for chunk in export.iter_export(export.export_queryset(), options['format'], options['chunk_size']):
+                out.write(chunk)
+                rows += 1
+        header_lines = 1 if options['format'] == 'csv' else 0
+        self.stdout.write(self.style.SUCCESS(f'{rows - header_lines} clientes exportados en {path}.'))
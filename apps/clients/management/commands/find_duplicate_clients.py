@@ -0,0 +1,15 @@
+"""Genera la tabla de posibles clientes duplicados."""
+from django.core.management.base import BaseCommand
+
+from apps.clients import duplicates
+
+
+class Command(BaseCommand):
+    help = 'Busca clientes duplicados por CUIT, documento y teléfono y guarda los candidatos a fusión.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-score', type=float, default=duplicates.DEFAULT_MIN_SCORE)
+
+    def handle(self, *args, **options):
+        total = duplicates.rebuild_candidates(min_score=options['min_score'])
+        self.stdout.write(self.style.SUCCESS(f'{total} pares de posibles duplicados.'))
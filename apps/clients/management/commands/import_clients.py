@@ -0,0 +1,57 @@
+"""Importa clientes desde un archivo CSV o XLSX."""
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clients import importer
+
+
+class Command(BaseCommand):
+    help = 'Importa clientes (upsert por CUIT) desde CSV o XLSX, en lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--owner', help='Usuario asignado a los clientes nuevos.')
+        parser.add_argument('--actor', help='Usuario registrado en auditoría.')
+        parser.add_argument('--batch-size', type=int, default=importer.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--errors', help='Archivo CSV donde guardar las filas rechazadas.')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida, no guarda.')
+
+    def _user(self, username):
+        if not username:
+            return None
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {username}.')
+
+    def handle(self, *args, **options):
+        owner = self._user(options['owner'])
+        actor = self._user(options['actor']) or owner
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = importer.import_clients(
+                    fileobj,
+                    options['path'],
+                    owner=owner,
+                    actor=actor,
+                    batch_size=options['batch_size'],
+                    dry_run=options['dry_run'],
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        if options['errors'] and result.errors:
+            with open(options['errors'], 'w', newline='', encoding='utf-8') as out:
+                writer = csv.writer(out)
+                writer.writerow(['fila', 'errores'])
+                for line, errors in result.errors:
+                    writer.writerow([line, '; '.join(errors)])
+
+        self.stdout.write(
+            f'Filas válidas: {result.valid} | Creados: {result.created} | '
+            f'Actualizados: {result.updated} | Lotes: {result.batches} | Con errores: {len(result.errors)}'
+        )
+        for line, errors in result.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'Fila {line}: {"; ".join(errors)}'))
@@ -0,0 +1,20 @@
+"""Reconstruye el índice de búsqueda de clientes."""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.clients import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de clientes (FTS5 / trigram).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            self.stdout.write(self.style.WARNING('El motor de base de datos no tiene índice de búsqueda.'))
+            return
+        with transaction.atomic():
+            total = search.rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} clientes indexados.'))
@@ -0,0 +1,12 @@
+"""Recalcula los contadores de carga de leads por vendedor."""
+from django.core.management.base import BaseCommand
+
+from apps.clients import assignment
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los leads abiertos por vendedor (después de cargas o cambios masivos por SQL).'
+
+    def handle(self, *args, **options):
+        loads = assignment.rebuild_loads()
+        self.stdout.write(self.style.SUCCESS(f'Contadores actualizados para {len(loads)} vendedores con leads.'))
@@ -0,0 +1,35 @@
+"""Reconciliación nocturna de las tablas de resumen de leads y entrevistas."""
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.clients import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula los resúmenes diarios de leads y entrevistas de los últimos días '
+        'desde las tablas originales (programar una vez por noche).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=rollups.RECONCILE_DAYS, help='Días hacia atrás (incluye hoy).')
+        parser.add_argument('--since', help='Fecha inicial AAAA-MM-DD (reemplaza --days; útil para la carga inicial).')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        if options['since']:
+            start = parse_date(options['since'])
+            if start is None:
+                raise CommandError('Fecha inválida, usa AAAA-MM-DD.')
+        else:
+            start = today - datetime.timedelta(days=max(options['days'], 1) - 1)
+        lead_rows = rollups.reconcile_leads(start, today)
+        interview_rows = rollups.reconcile_interviews(
+            start, today + datetime.timedelta(days=rollups.INTERVIEW_HORIZON_DAYS),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Resúmenes desde {start:%d/%m/%Y}: {lead_rows} filas de leads, {interview_rows} de entrevistas.'
+        ))
@@ -0,0 +1,98 @@
+"""Reenvía un volcado JSONL de leads a la ingesta (en proceso o a un endpoint remoto)."""
+import json
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.clients import ingest
+
+
+class Command(BaseCommand):
+    help = (
+        'Reenvía leads de un archivo JSONL (un lead por línea) a /api/clientes/leads/ en lotes. '
+        'Sin --url valida e inserta en proceso contra la base local, igual que el endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--user', help='Usuario con el que se autentica en modo local.')
+        parser.add_argument('--url', help='URL completa del endpoint remoto.')
+        parser.add_argument('--token', help='Token de API para el endpoint remoto.')
+
+    def _batches(self, path, size):
+        batch = []
+        with open(path, encoding='utf-8') as fileobj:
+            for line_number, line in enumerate(fileobj, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    self.stderr.write(f'Línea {line_number}: JSON inválido, se omite.')
+                    continue
+                if len(batch) >= size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def _local_sender(self, username):
+        if not username:
+            raise CommandError('Indica --user para el modo local o --url para un servidor remoto.')
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'No existe el usuario {username}.')
+
+        def send(batch):
+            outcome = ingest.ingest_payload(batch, user)
+            return 200, {'summary': outcome.summary(), 'results': outcome.items}
+
+        return send
+
+    def _remote_sender(self, url, token):
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+
+        def send(batch):
+            request = urllib.request.Request(url, data=json.dumps(batch).encode(), headers=headers, method='POST')
+            try:
+                with urllib.request.urlopen(request) as response:
+                    return response.status, json.loads(response.read())
+            except urllib.error.HTTPError as exc:
+                return exc.code, {'detail': exc.read().decode(errors='replace')}
+
+        return send
+
+    def handle(self, *args, **options):
+        size = min(options['batch_size'], ingest.MAX_BATCH_SIZE)
+        if options['url']:
+            send = self._remote_sender(options['url'], options['token'])
+        else:
+            send = self._local_sender(options['user'])
+
+        totals = Counter()
+        started = time.monotonic()
+        try:
+            for batch in self._batches(options['path'], size):
+                status_code, body = send(batch)
+                if status_code != 200:
+                    raise CommandError(f'El endpoint respondió {status_code}: {body}')
+                totals.update(body['summary'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.monotonic() - started
+        total = sum(totals.values())
+        rate = total / elapsed * 60 if elapsed else 0
+        self.stdout.write(
+            f'Leads: {total} | Creados: {totals[ingest.STATUS_CREATED]} | '
+            f'Duplicados: {totals[ingest.STATUS_DUPLICATE]} | Inválidos: {totals[ingest.STATUS_INVALID]} | '
+            f'{elapsed:.1f}s ({rate:.0f} leads/min)'
+        )
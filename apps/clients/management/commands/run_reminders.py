@@ -0,0 +1,39 @@
+"""Worker de recordatorios de eventos y entrevistas."""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from apps.clients import reminders
+
+
+class Command(BaseCommand):
+    help = (
+        'Manda a cada vendedor un resumen de sus eventos y entrevistas que empiezan dentro de '
+        'REMINDER_LEAD_MINUTES. Corre hasta recibir SIGTERM o Ctrl+C.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=reminders.POLL_SECONDS, help='Segundos entre vueltas.')
+        parser.add_argument('--batch-size', type=int, default=reminders.BATCH_SIZE)
+        parser.add_argument('--once', action='store_true', help='Una sola vuelta (para cron o pruebas).')
+
+    def handle(self, *args, **options):
+        backend = reminders.get_backend()
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.stdout.write(f'Recordatorios con {type(backend).__name__}, cada {options["interval"]:g} s.')
+        try:
+            while not stop.is_set():
+                result = reminders.run_once(backend, batch_size=max(options['batch_size'], 1))
+                if result.sent or result.failed:
+                    self.stdout.write(
+                        f'{result.sent} enviados, {result.failed} con error '
+                        f'(ventana hasta {result.high:%d/%m %H:%M}).'
+                    )
+                if options['once']:
+                    break
+                stop.wait(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Recordatorios detenidos.')
@@ -0,0 +1,83 @@
+import unicodedata
+
+from django.db import migrations
+
+# Copia fija del esquema y del documento de ``apps.clients.search`` al momento
+# de esta migración: cambios posteriores de ese módulo no la alteran.
+SEARCH_TABLE = 'clients_client_search'
+CREATE_INDEX = {
+    'sqlite': [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+        "document, owner_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    'postgresql': [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+        'client_id bigint PRIMARY KEY, owner_id integer NULL, document text NOT NULL)',
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)',
+        f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_owner ON {SEARCH_TABLE} (owner_id)',
+    ],
+}
+INSERT_ROW = {
+    'sqlite': f'INSERT INTO {SEARCH_TABLE} (rowid, owner_id, document) VALUES (%s, %s, %s)',
+    'postgresql': f'INSERT INTO {SEARCH_TABLE} (client_id, owner_id, document) VALUES (%s, %s, %s)',
+}
+
+
+def _fold(value):
+    normalized = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+
+
+def _digits(value):
+    return ''.join(ch for ch in (value or '') if ch.isdigit())
+
+
+def _document(client, coholder):
+    parts = [
+        client.first_name, client.last_name, client.company_name, client.cuit, client.doc_number,
+        client.phone, _digits(client.phone),
+    ]
+    if coholder is not None:
+        parts.extend([coholder.full_name, coholder.dni, coholder.phone, _digits(coholder.phone)])
+    return ' '.join(_fold(part) for part in parts if part)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in CREATE_INDEX:
+        return
+    for statement in CREATE_INDEX[vendor]:
+        schema_editor.execute(statement)
+    # Carga inicial del índice con los clientes existentes.
+    Client = apps.get_model('clients', 'Client')
+    CoHolder = apps.get_model('clients', 'CoHolder')
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        # Por id y no por OFFSET: cada tanda es un rango de la clave primaria.
+        while True:
+            chunk = list(Client.objects.filter(id__gt=last_id).order_by('id')[:2000])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            coholders = {row.client_id: row for row in CoHolder.objects.filter(client_id__in=[c.id for c in chunk])}
+            cursor.executemany(
+                INSERT_ROW[vendor],
+                [(client.id, client.owner_id, _document(client, coholders.get(client.id))) for client in chunk],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0013_alter_clientlead_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
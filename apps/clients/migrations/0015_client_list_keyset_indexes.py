@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0014_client_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['last_name', 'company_name', 'id'], name='client_list_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['owner', 'last_name', 'company_name', 'id'], name='client_owner_order_idx'),
+        ),
+    ]
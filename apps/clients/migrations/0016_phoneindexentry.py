@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0015_client_list_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PhoneIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('client', 'Cliente'), ('coholder', 'Cotitular'), ('lead', 'Cliente rápido'), ('event', 'Evento')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('digits', models.CharField(max_length=30)),
+                ('digits_reversed', models.CharField(max_length=30)),
+                ('label', models.CharField(blank=True, max_length=255)),
+                ('starts_at', models.DateTimeField(blank=True, null=True)),
+                ('client', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='clients.client')),
+                ('lead', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='clients.clientlead')),
+                ('owner', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Teléfono indexado',
+                'verbose_name_plural': 'Teléfonos indexados',
+                'indexes': [models.Index(fields=['digits'], name='clients_pho_digits_47e88d_idx'), models.Index(fields=['digits_reversed'], name='clients_pho_digits__8d34b9_idx'), models.Index(fields=['owner', 'digits_reversed'], name='clients_pho_owner_i_6a9b8e_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='phoneindexentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='phone_index_unique_object'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0016_phoneindexentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reasons', models.CharField(max_length=30, verbose_name='Coincidencias')),
+                ('name_similarity', models.FloatField(verbose_name='Similitud de nombre')),
+                ('score', models.FloatField(verbose_name='Puntaje')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Posible duplicado',
+                'verbose_name_plural': 'Posibles duplicados',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(fields=['doc_type', 'doc_number'], name='clients_cli_doc_typ_642211_idx'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='client_a',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clients.client'),
+        ),
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='client_b',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clients.client'),
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('client_a', 'client_b'), name='duplicate_candidate_unique_pair'),
+        ),
+    ]
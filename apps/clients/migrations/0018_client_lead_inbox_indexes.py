@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0017_duplicatecandidate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientlead',
+            index=models.Index(fields=['owner', '-created_at', '-id'], name='client_lead_owner_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientlead',
+            index=models.Index(fields=['-created_at', '-id'], name='client_lead_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0018_client_lead_inbox_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientlead',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=100, null=True, unique=True, verbose_name='Clave de idempotencia'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clients', '0019_clientlead_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadLoad',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='lead_load', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('open_leads', models.IntegerField(default=0, verbose_name='Leads abiertos')),
+                ('assigned_total', models.BigIntegerField(default=0, verbose_name='Leads asignados')),
+            ],
+            options={
+                'verbose_name': 'Carga de leads',
+                'verbose_name_plural': 'Cargas de leads',
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0020_leadload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientlead',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='source_leads', to='clients.client'),
+        ),
+        migrations.AddField(
+            model_name='clientlead',
+            name='converted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Convertido'),
+        ),
+        migrations.AlterField(
+            model_name='client',
+            name='birth_date',
+            field=models.DateField(null=True, verbose_name='Fecha de Nacimiento'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:14
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_rollups(apps, schema_editor):
+    """Carga inicial de los resúmenes con todo el historial."""
+    ClientLead = apps.get_model('clients', 'ClientLead')
+    LeadInterview = apps.get_model('clients', 'LeadInterview')
+    LeadDailyStat = apps.get_model('clients', 'LeadDailyStat')
+    InterviewDailyStat = apps.get_model('clients', 'InterviewDailyStat')
+    tz = timezone.get_current_timezone()
+    leads = (
+        ClientLead.objects.annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values('day', 'source', 'owner_id')
+        .annotate(leads=Count('id'), converted=Count('id', filter=Q(converted_at__isnull=False)))
+        .order_by()
+    )
+    LeadDailyStat.objects.bulk_create([LeadDailyStat(**row) for row in leads], batch_size=1000)
+    interviews = (
+        LeadInterview.objects.annotate(day=TruncDate('scheduled_at', tzinfo=tz))
+        .values('day', 'owner_id')
+        .annotate(interviews=Count('id'))
+        .order_by()
+    )
+    InterviewDailyStat.objects.bulk_create([InterviewDailyStat(**row) for row in interviews], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0021_lead_conversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InterviewDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('interviews', models.IntegerField(default=0, verbose_name='Entrevistas')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de entrevistas',
+                'verbose_name_plural': 'Resumen diario de entrevistas',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('source', models.CharField(blank=True, max_length=100, verbose_name='Fuente')),
+                ('leads', models.IntegerField(default=0, verbose_name='Leads')),
+                ('converted', models.IntegerField(default=0, verbose_name='Convertidos')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de leads',
+                'verbose_name_plural': 'Resumen diario de leads',
+                'ordering': ['-day', 'source'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='leadinterview',
+            index=models.Index(fields=['scheduled_at'], name='clients_lea_schedul_444914_idx'),
+        ),
+        migrations.AddField(
+            model_name='leaddailystat',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='interviewdailystat',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='leaddailystat',
+            constraint=models.UniqueConstraint(fields=('day', 'source', 'owner'), name='lead_daily_stat_unique_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='interviewdailystat',
+            constraint=models.UniqueConstraint(fields=('day', 'owner'), name='interview_daily_stat_unique_key'),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:16
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0022_lead_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='phoneindexentry',
+            name='kind',
+            field=models.CharField(choices=[('client', 'Cliente'), ('coholder', 'Cotitular'), ('lead', 'Cliente rápido'), ('event', 'Evento'), ('archived', 'Lead archivado')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ArchivedLead',
+            fields=[
+                ('lead_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Lead')),
+                ('name', models.CharField(blank=True, max_length=150, verbose_name='Nombre')),
+                ('phone', models.CharField(blank=True, max_length=30, verbose_name='Teléfono')),
+                ('source', models.CharField(blank=True, max_length=100, verbose_name='Fuente (publicidad)')),
+                ('created_at', models.DateTimeField(verbose_name='Creado')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Archivado')),
+                ('segment', models.CharField(max_length=100, verbose_name='Segmento')),
+                ('line', models.PositiveIntegerField(verbose_name='Línea')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lead archivado',
+                'verbose_name_plural': 'Leads archivados',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
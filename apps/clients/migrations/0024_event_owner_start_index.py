@@ -0,0 +1,17 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0023_lead_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientevent',
+            index=models.Index(fields=['owner', 'starts_at'], name='client_event_owner_start_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('clients', '0024_event_owner_start_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar_feed', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('token', models.CharField(max_length=64, unique=True, verbose_name='Token')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Versión')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Último cambio')),
+            ],
+            options={
+                'verbose_name': 'Feed de calendario',
+                'verbose_name_plural': 'Feeds de calendario',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:40
+
+import datetime
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_ends_at(apps, schema_editor):
+    """Los eventos existentes duran la hora por defecto."""
+    ClientEvent = apps.get_model('clients', 'ClientEvent')
+    ClientEvent.objects.update(ends_at=F('starts_at') + datetime.timedelta(minutes=60))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0025_calendar_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientevent',
+            name='duration_minutes',
+            field=models.PositiveSmallIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)], verbose_name='Duración (min)'),
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='Fin'),
+        ),
+        migrations.RunPython(fill_ends_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='clientevent',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, verbose_name='Fin'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:33
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0026_event_duration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientEventOverride',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_start', models.DateTimeField(verbose_name='Inicio original')),
+                ('cancelled', models.BooleanField(default=False, verbose_name='Cancelada')),
+                ('title', models.CharField(max_length=150, verbose_name='Título')),
+                ('description', models.TextField(blank=True, verbose_name='Notas')),
+                ('starts_at', models.DateTimeField(verbose_name='Fecha y hora')),
+                ('duration_minutes', models.PositiveSmallIntegerField(default=60, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)], verbose_name='Duración (min)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Cambio de repetición',
+                'verbose_name_plural': 'Cambios de repetición',
+            },
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='recurrence',
+            field=models.CharField(blank=True, choices=[('', 'No se repite'), ('daily', 'Diario'), ('weekly', 'Semanal'), ('monthly', 'Mensual')], default='', max_length=10, verbose_name='Repetir'),
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='recurrence_count',
+            field=models.PositiveIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Cantidad de repeticiones'),
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(99)], verbose_name='Cada'),
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='recurrence_until',
+            field=models.DateField(blank=True, null=True, verbose_name='Repetir hasta'),
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='series_ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fin de la serie'),
+        ),
+        migrations.AddIndex(
+            model_name='clientevent',
+            index=models.Index(condition=models.Q(('recurrence', ''), _negated=True), fields=['owner', 'starts_at'], name='client_event_series_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientevent',
+            index=models.Index(condition=models.Q(('recurrence', ''), _negated=True), fields=['starts_at'], name='client_event_all_series_idx'),
+        ),
+        migrations.AddField(
+            model_name='clienteventoverride',
+            name='event',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='overrides', to='clients.clientevent'),
+        ),
+        migrations.AddIndex(
+            model_name='clienteventoverride',
+            index=models.Index(fields=['event', 'starts_at'], name='client_override_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='clienteventoverride',
+            constraint=models.UniqueConstraint(fields=('event', 'original_start'), name='client_override_unique'),
+        ),
+    ]
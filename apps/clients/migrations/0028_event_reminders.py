@@ -0,0 +1,51 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0027_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('position', models.DateTimeField(verbose_name='Posición')),
+            ],
+            options={
+                'verbose_name': 'Marca de recordatorios',
+                'verbose_name_plural': 'Marcas de recordatorios',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('event', 'Evento'), ('interview', 'Entrevista')], max_length=10, verbose_name='Tipo')),
+                ('object_id', models.BigIntegerField(verbose_name='Objeto')),
+                ('starts_at', models.DateTimeField(verbose_name='Inicio')),
+                ('title', models.CharField(max_length=150, verbose_name='Título')),
+                ('claim', models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Tanda')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='Reservado')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Enviado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Recordatorio',
+                'verbose_name_plural': 'Recordatorios',
+                'indexes': [models.Index(fields=['sent_at', 'claimed_at'], name='event_reminder_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='eventreminder',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id', 'starts_at'), name='event_reminder_unique'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0028_event_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientEventTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.BigIntegerField(verbose_name='Evento')),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Borrado')),
+            ],
+            options={
+                'verbose_name': 'Evento borrado',
+                'verbose_name_plural': 'Eventos borrados',
+            },
+        ),
+        migrations.AddField(
+            model_name='clientevent',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='clientevent',
+            index=models.Index(fields=['owner', 'updated_at'], name='client_event_owner_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientevent',
+            index=models.Index(fields=['updated_at'], name='client_event_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='clienteventtombstone',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='clienteventtombstone',
+            index=models.Index(fields=['owner', 'deleted_at'], name='client_tombstone_owner_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clienteventtombstone',
+            index=models.Index(fields=['deleted_at'], name='client_tombstone_idx'),
+        ),
+    ]
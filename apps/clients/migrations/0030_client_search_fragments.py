@@ -0,0 +1,73 @@
+import unicodedata
+
+from django.db import migrations
+
+# Reindexa con los sufijos numéricos (fragmentos del medio de CUIT, documento
+# y teléfonos). Copia fija del documento de ``apps.clients.search`` a esta fecha.
+SEARCH_TABLE = 'clients_client_search'
+MIN_FRAGMENT = 3
+UPSERT_ROWS = {
+    'sqlite': [
+        f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+        f'INSERT INTO {SEARCH_TABLE} (rowid, owner_id, document) VALUES (%s, %s, %s)',
+    ],
+    'postgresql': [
+        f'INSERT INTO {SEARCH_TABLE} (client_id, owner_id, document) VALUES (%s, %s, %s) '
+        'ON CONFLICT (client_id) DO UPDATE SET owner_id = EXCLUDED.owner_id, document = EXCLUDED.document',
+    ],
+}
+
+
+def _fold(value):
+    normalized = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+
+
+def _fragments(value):
+    digits = ''.join(ch for ch in (value or '') if ch.isdigit())
+    return [digits[start:] for start in range(len(digits) - MIN_FRAGMENT + 1)]
+
+
+def _document(client, coholder):
+    parts = [client.first_name, client.last_name, client.company_name, client.cuit, client.doc_number, client.phone]
+    numbers = [client.cuit, client.doc_number, client.phone]
+    if coholder is not None:
+        parts.extend([coholder.full_name, coholder.dni, coholder.phone])
+        numbers.extend([coholder.dni, coholder.phone])
+    for number in numbers:
+        parts.extend(_fragments(number))
+    return ' '.join(_fold(part) for part in parts if part)
+
+
+def reindex_clients(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor not in UPSERT_ROWS:
+        return
+    Client = apps.get_model('clients', 'Client')
+    CoHolder = apps.get_model('clients', 'CoHolder')
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        # Por id y no por OFFSET: cada tanda es un rango de la clave primaria.
+        while True:
+            chunk = list(Client.objects.filter(id__gt=last_id).order_by('id')[:2000])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            coholders = {row.client_id: row for row in CoHolder.objects.filter(client_id__in=[c.id for c in chunk])}
+            rows = [(client.id, client.owner_id, _document(client, coholders.get(client.id))) for client in chunk]
+            if vendor == 'sqlite':
+                cursor.executemany(UPSERT_ROWS[vendor][0], [(row[0],) for row in rows])
+                cursor.executemany(UPSERT_ROWS[vendor][1], rows)
+            else:
+                cursor.executemany(UPSERT_ROWS[vendor][0], rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0029_event_sync'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_clients, migrations.RunPython.noop),
+    ]
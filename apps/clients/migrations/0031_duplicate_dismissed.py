@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 19:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0030_client_search_fragments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='duplicatecandidate',
+            name='dismissed',
+            field=models.BooleanField(default=False, verbose_name='Descartado'),
+        ),
+        migrations.AddIndex(
+            model_name='phoneindexentry',
+            index=models.Index(fields=['kind', 'digits_reversed'], name='clients_pho_kind_dfaf5c_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.8 on 2026-10-18 19:28
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_unowned_rows(apps, schema_editor):
+    """Suma en una sola fila los resúmenes sin dueño repetidos antes de crear las restricciones."""
+    for name, key, counters in (
+        ('LeadDailyStat', ('day', 'source'), ('leads', 'converted')),
+        ('InterviewDailyStat', ('day',), ('interviews',)),
+    ):
+        model = apps.get_model('clients', name)
+        unowned = model.objects.filter(owner__isnull=True)
+        repeated = (
+            unowned.order_by().values(*key)
+            .annotate(rows=Count('id'), **{f'total_{field}': Sum(field) for field in counters})
+            .filter(rows__gt=1)
+        )
+        for group in repeated:
+            rows = unowned.filter(**{field: group[field] for field in key}).order_by('id')
+            keep = rows.first()
+            rows.exclude(pk=keep.pk).delete()
+            model.objects.filter(pk=keep.pk).update(**{field: group[f'total_{field}'] for field in counters})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0031_duplicate_dismissed'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_unowned_rows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='archivedlead',
+            index=models.Index(fields=['created_at'], name='archived_lead_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='interviewdailystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('day',), name='interview_daily_stat_unique_unowned'),
+        ),
+        migrations.AddConstraint(
+            model_name='leaddailystat',
+            constraint=models.UniqueConstraint(condition=models.Q(('owner__isnull', True)), fields=('day', 'source'), name='lead_daily_stat_unique_unowned'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.8 on 2026-10-18 19:47
+
+import gzip
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.dateparse import parse_datetime
+
+
+def backfill_archived_interviews(apps, schema_editor):
+    """Día y dueño de las entrevistas de los leads ya archivados, leídos de sus segmentos."""
+    ArchivedLead = apps.get_model('clients', 'ArchivedLead')
+    ArchivedInterview = apps.get_model('clients', 'ArchivedInterview')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    directory = Path(getattr(settings, 'LEAD_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'leads'))
+    user_ids = set(User.objects.values_list('pk', flat=True))
+    for segment in ArchivedLead.objects.order_by().values_list('segment', flat=True).distinct():
+        lead_ids = set(ArchivedLead.objects.filter(segment=segment).values_list('lead_id', flat=True))
+        try:
+            with gzip.open(directory / segment, 'rt', encoding='utf-8') as lines:
+                records = [json.loads(line) for line in lines if line.strip()]
+        except OSError:
+            continue
+        ArchivedInterview.objects.bulk_create([
+            ArchivedInterview(
+                lead_id=record['id'],
+                owner_id=interview['owner_id'] if interview['owner_id'] in user_ids else None,
+                scheduled_at=parse_datetime(interview['scheduled_at']),
+            )
+            for record in records if record['id'] in lead_ids
+            for interview in record['interviews']
+        ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('clients', '0032_rollup_unowned_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedInterview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scheduled_at', models.DateTimeField(verbose_name='Fecha y hora')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='interviews', to='clients.archivedlead')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Entrevista archivada',
+                'verbose_name_plural': 'Entrevistas archivadas',
+                'indexes': [models.Index(fields=['scheduled_at'], name='archived_interview_sched_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_archived_interviews, migrations.RunPython.noop),
+    ]
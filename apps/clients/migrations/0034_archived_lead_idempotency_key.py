@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-18 19:48
+
+import gzip
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_keys(apps, schema_editor):
+    """Claves de idempotencia de los leads ya archivados, leídas de sus segmentos."""
+    ArchivedLead = apps.get_model('clients', 'ArchivedLead')
+    directory = Path(getattr(settings, 'LEAD_ARCHIVE_DIR', settings.BASE_DIR / 'archive' / 'leads'))
+    for segment in ArchivedLead.objects.order_by().values_list('segment', flat=True).distinct():
+        try:
+            with gzip.open(directory / segment, 'rt', encoding='utf-8') as lines:
+                records = [json.loads(line) for line in lines if line.strip()]
+        except OSError:
+            continue
+        keys = {record['id']: record.get('idempotency_key') for record in records if record.get('idempotency_key')}
+        archived = list(ArchivedLead.objects.filter(segment=segment, lead_id__in=list(keys)))
+        for lead in archived:
+            lead.idempotency_key = keys[lead.lead_id]
+        ArchivedLead.objects.bulk_update(archived, ['idempotency_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0033_archived_interview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedlead',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True, verbose_name='Clave de idempotencia'),
+        ),
+        migrations.RunPython(backfill_keys, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,9 @@
 """Models for clients app."""
+import calendar
+import datetime
+
 from django.core.exceptions import ValidationError
-from django.core.validators import RegexValidator, EmailValidator
+from django.core.validators import EmailValidator, MaxValueValidator, MinValueValidator, RegexValidator
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -39,9 +42,17 @@ TAX_CONDITION_CHOICES = [
 ]
 
 
+DOC_NUMBER_VALIDATOR = RegexValidator(r'^\d+$', 'Solo se permiten números.')
+
+
+def normalize_cuit(value: str):
+    """Solo los dígitos del CUIT/CUIL (sin guiones ni espacios), como se guarda."""
+    return ''.join(filter(str.isdigit, str(value or '')))
+
+
 def validate_cuit(value: str):
     """Validate CUIT/CUIL check digit."""
-    digits = ''.join(filter(str.isdigit, value or ''))
+    digits = normalize_cuit(value)
     if len(digits) != 11:
         raise ValidationError('El CUIT/CUIL debe tener 11 dígitos.')
 
@@ -68,9 +79,10 @@ class Client(models.Model):
     doc_number = models.CharField(
         'Número de Documento',
         max_length=15,
-        validators=[RegexValidator(r'^\d+$', 'Solo se permiten números.')],
+        validators=[DOC_NUMBER_VALIDATOR],
     )
-    birth_date = models.DateField('Fecha de Nacimiento')
+    # Admite NULL para clientes convertidos desde un lead; el formulario la sigue exigiendo.
+    birth_date = models.DateField('Fecha de Nacimiento', null=True)
     sex = models.CharField('Sexo', max_length=1, choices=SEX_CHOICES)
     marital_status = models.CharField('Estado Civil', max_length=10, choices=MARITAL_STATUS_CHOICES)
     nationality = models.CharField('Nacionalidad', max_length=50)
@@ -108,6 +120,10 @@ class Client(models.Model):
             models.Index(fields=['last_name']),
             models.Index(fields=['company_name']),
             models.Index(fields=['cuit']),
+            models.Index(fields=['doc_type', 'doc_number']),
+            # Paginación por cursor del listado (orden del modelo + id).
+            models.Index(fields=['last_name', 'company_name', 'id'], name='client_list_order_idx'),
+            models.Index(fields=['owner', 'last_name', 'company_name', 'id'], name='client_owner_order_idx'),
         ]
 
 
@@ -135,6 +151,21 @@ class CoHolder(models.Model):
         verbose_name_plural = 'Cotitulares'
 
 
+EVENT_DEFAULT_MINUTES = 60
+# Tope de duración: acota hacia atrás el rango de ``starts_at`` al buscar superposiciones.
+EVENT_MAX_MINUTES = 8 * 60
+
+RECURRENCE_DAILY = 'daily'
+RECURRENCE_WEEKLY = 'weekly'
+RECURRENCE_MONTHLY = 'monthly'
+RECURRENCE_CHOICES = [
+    ('', 'No se repite'),
+    (RECURRENCE_DAILY, 'Diario'),
+    (RECURRENCE_WEEKLY, 'Semanal'),
+    (RECURRENCE_MONTHLY, 'Mensual'),
+]
+
+
 class ClientEvent(models.Model):
     """Evento agendado con un cliente (opcional si es solo lead)."""
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='events', null=True, blank=True)
@@ -143,9 +174,28 @@ class ClientEvent(models.Model):
     title = models.CharField('Título', max_length=150)
     description = models.TextField('Notas', blank=True)
     starts_at = models.DateTimeField('Fecha y hora')
+    duration_minutes = models.PositiveSmallIntegerField(
+        'Duración (min)', default=EVENT_DEFAULT_MINUTES,
+        validators=[MinValueValidator(5), MaxValueValidator(EVENT_MAX_MINUTES)],
+    )
+    # Derivado de inicio + duración (se calcula al guardar).
+    ends_at = models.DateTimeField('Fin', editable=False)
+    # Serie: una sola fila; las repeticiones se calculan al pedir una ventana.
+    recurrence = models.CharField('Repetir', max_length=10, choices=RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(
+        'Cada', default=1, validators=[MinValueValidator(1), MaxValueValidator(99)],
+    )
+    recurrence_count = models.PositiveIntegerField(
+        'Cantidad de repeticiones', null=True, blank=True, validators=[MinValueValidator(1)],
+    )
+    recurrence_until = models.DateField('Repetir hasta', null=True, blank=True)
+    # Fin de la última repetición (vacío si la serie no termina); se calcula al guardar.
+    series_ends_at = models.DateTimeField('Fin de la serie', null=True, blank=True, editable=False)
     lead_name = models.CharField('Nombre lead', max_length=150, blank=True)
     lead_phone = models.CharField('Teléfono lead', max_length=30, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Base de la sincronización por API (``sync.py``): los UPDATE en lote lo ponen a mano.
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = 'Evento de cliente'
@@ -153,11 +203,104 @@ class ClientEvent(models.Model):
         ordering = ['starts_at']
         indexes = [
             models.Index(fields=['starts_at']),
+            # Calendario por vendedor: rango de fechas dentro de sus eventos.
+            models.Index(fields=['owner', 'starts_at'], name='client_event_owner_start_idx'),
+            # Solo las series: son pocas y se leen todas las que siguen activas.
+            models.Index(
+                fields=['owner', 'starts_at'], name='client_event_series_idx', condition=~models.Q(recurrence=''),
+            ),
+            models.Index(fields=['starts_at'], name='client_event_all_series_idx', condition=~models.Q(recurrence='')),
+            # Cambios desde el último token de sincronización.
+            models.Index(fields=['owner', 'updated_at'], name='client_event_owner_sync_idx'),
+            models.Index(fields=['updated_at'], name='client_event_sync_idx'),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.client} ({self.starts_at:%Y-%m-%d %H:%M})"
 
+    def save(self, *args, **kwargs):
+        if self.starts_at:
+            self.ends_at = self.starts_at + datetime.timedelta(minutes=self.duration_minutes or EVENT_DEFAULT_MINUTES)
+            self.series_ends_at = None
+            if self.recurrence:
+                last = self.last_occurrence_start()
+                if last is not None:
+                    self.series_ends_at = last + (self.ends_at - self.starts_at)
+        super().save(*args, **kwargs)
+
+    @property
+    def is_recurring(self):
+        return bool(self.recurrence)
+
+    def _occurrence(self, index):
+        """Inicio de la repetición ``index`` (0 es ``starts_at``), a la misma hora local."""
+        base = timezone.localtime(self.starts_at).replace(tzinfo=None)
+        step = index * self.recurrence_interval
+        if self.recurrence == RECURRENCE_MONTHLY:
+            month_index = base.year * 12 + base.month - 1 + step
+            year, month = divmod(month_index, 12)
+            # El día 31 cae el último día de los meses más cortos.
+            day = min(base.day, calendar.monthrange(year, month + 1)[1])
+            naive = base.replace(year=year, month=month + 1, day=day)
+        else:
+            naive = base + datetime.timedelta(days=step * (7 if self.recurrence == RECURRENCE_WEEKLY else 1))
+        return timezone.make_aware(naive)
+
+    def _index_near(self, moment):
+        """Índice de una repetición que empieza antes de ``moment`` (o 0): salta sin recorrer la serie."""
+        base = timezone.localtime(self.starts_at).replace(tzinfo=None)
+        local = timezone.localtime(moment).replace(tzinfo=None)
+        if self.recurrence == RECURRENCE_MONTHLY:
+            steps = ((local.year - base.year) * 12 + local.month - base.month) // self.recurrence_interval
+        else:
+            period = self.recurrence_interval * (7 if self.recurrence == RECURRENCE_WEEKLY else 1)
+            steps = (local - base).days // period
+        return max(0, steps - 1)
+
+    def _last_index(self):
+        """Índice de la última repetición (``None`` si la serie no termina)."""
+        last = None if self.recurrence_count is None else self.recurrence_count - 1
+        if self.recurrence_until:
+            limit = timezone.make_aware(
+                datetime.datetime.combine(self.recurrence_until + datetime.timedelta(days=1), datetime.time.min)
+            )
+            index = self._index_near(limit)
+            while self._occurrence(index + 1) < limit:
+                index += 1
+            last = index if last is None else min(last, index)
+        return last
+
+    def last_occurrence_start(self):
+        """Inicio de la última repetición (``None`` si la serie no termina)."""
+        if not self.recurrence:
+            return self.starts_at
+        last = self._last_index()
+        return None if last is None else self._occurrence(last)
+
+    def occurrence_starts(self, low, high):
+        """Inicios originales de las repeticiones en ``[low, high)``.
+
+        Salta directo a la primera repetición de la ventana, así que el costo
+        depende de la ventana y no de cuánto hace que empezó la serie.
+        """
+        if not self.recurrence:
+            if low <= self.starts_at < high:
+                yield self.starts_at
+            return
+        last = self._last_index()
+        index = self._index_near(low)
+        while last is None or index <= last:
+            start = self._occurrence(index)
+            if start >= high:
+                return
+            if start >= low:
+                yield start
+            index += 1
+
+    def is_occurrence(self, moment):
+        """``True`` si ``moment`` es el inicio original de una repetición de la serie."""
+        return any(True for _ in self.occurrence_starts(moment, moment + datetime.timedelta(microseconds=1)))
+
 
 class ClientLead(models.Model):
     """Cliente rápido de publicidad (datos opcionales)."""
@@ -165,12 +308,24 @@ class ClientLead(models.Model):
     phone = models.CharField('Teléfono', max_length=30, blank=True)
     source = models.CharField('Fuente (publicidad)', max_length=100, blank=True)
     owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='client_leads')
+    # Clave que manda la plataforma de anuncios (p. ej. el leadgen_id); evita duplicar reenvíos.
+    idempotency_key = models.CharField('Clave de idempotencia', max_length=100, null=True, blank=True, unique=True)
+    # Cliente creado al convertir el lead (el lead queda como registro de origen).
+    client = models.ForeignKey(
+        Client, on_delete=models.SET_NULL, null=True, blank=True, related_name='source_leads',
+    )
+    converted_at = models.DateTimeField('Convertido', null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = 'Cliente rápido'
         verbose_name_plural = 'Clientes rápidos'
         ordering = ['-created_at']
+        indexes = [
+            # Bandeja de leads: rango por vendedor en orden de llegada.
+            models.Index(fields=['owner', '-created_at', '-id'], name='client_lead_owner_inbox_idx'),
+            models.Index(fields=['-created_at', '-id'], name='client_lead_inbox_idx'),
+        ]
 
     def __str__(self):
         return self.name or f"Lead {self.id}"
@@ -203,6 +358,9 @@ class LeadInterview(models.Model):
 
     class Meta:
         ordering = ['scheduled_at']
+        indexes = [
+            models.Index(fields=['scheduled_at']),
+        ]
         verbose_name = 'Entrevista de lead'
         verbose_name_plural = 'Entrevistas de lead'
 
@@ -225,3 +383,307 @@ class ClientNote(models.Model):
     def __str__(self):
         author_name = self.author.username if self.author else 'Sistema'
         return f"Nota de {author_name} en {self.client} - {self.created_at:%Y-%m-%d}"
+
+
+class PhoneIndexEntry(models.Model):
+    """Teléfono normalizado de clientes, cotitulares, leads y eventos (ver ``phones.py``)."""
+    KIND_CHOICES = [
+        ('client', 'Cliente'),
+        ('coholder', 'Cotitular'),
+        ('lead', 'Cliente rápido'),
+        ('event', 'Evento'),
+        ('archived', 'Lead archivado'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    digits = models.CharField(max_length=30)
+    digits_reversed = models.CharField(max_length=30)
+    label = models.CharField(max_length=255, blank=True)
+    # Referencias sin restricción: el índice se mantiene por señales.
+    client = models.ForeignKey(Client, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    lead = models.ForeignKey(ClientLead, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+')
+    starts_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Teléfono indexado'
+        verbose_name_plural = 'Teléfonos indexados'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='phone_index_unique_object'),
+        ]
+        indexes = [
+            models.Index(fields=['digits']),
+            models.Index(fields=['digits_reversed']),
+            models.Index(fields=['owner', 'digits_reversed']),
+            models.Index(fields=['kind', 'digits_reversed']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.label} ({self.digits})"
+
+
+class DuplicateCandidate(models.Model):
+    """Par de clientes posiblemente duplicados (lo genera ``find_duplicate_clients``)."""
+    REASON_CUIT = 'cuit'
+    REASON_DOC = 'doc'
+    REASON_PHONE = 'phone'
+
+    client_a = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='+')
+    client_b = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='+')
+    reasons = models.CharField('Coincidencias', max_length=30)
+    name_similarity = models.FloatField('Similitud de nombre')
+    score = models.FloatField('Puntaje')
+    # Un usuario confirmó que son clientes distintos: no se vuelve a avisar ni se borra al recalcular.
+    dismissed = models.BooleanField('Descartado', default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Posible duplicado'
+        verbose_name_plural = 'Posibles duplicados'
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['client_a', 'client_b'], name='duplicate_candidate_unique_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_a_id} / {self.client_b_id} ({self.score:.2f})"
+
+
+class LeadLoad(models.Model):
+    """Contadores de carga por vendedor para la asignación automática de leads.
+
+    Se actualizan con ``F()`` al crear, reasignar, convertir o borrar leads,
+    así que asignar nunca necesita contar la tabla de leads.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='lead_load')
+    open_leads = models.IntegerField('Leads abiertos', default=0)
+    assigned_total = models.BigIntegerField('Leads asignados', default=0)
+
+    class Meta:
+        verbose_name = 'Carga de leads'
+        verbose_name_plural = 'Cargas de leads'
+
+    def __str__(self):
+        return f"{self.owner_id}: {self.open_leads} abiertos"
+
+
+class LeadDailyStat(models.Model):
+    """Resumen diario de leads por fuente y vendedor (lo mantiene ``rollups``)."""
+    day = models.DateField('Día')
+    source = models.CharField('Fuente', max_length=100, blank=True)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    leads = models.IntegerField('Leads', default=0)
+    converted = models.IntegerField('Convertidos', default=0)
+
+    class Meta:
+        verbose_name = 'Resumen diario de leads'
+        verbose_name_plural = 'Resumen diario de leads'
+        ordering = ['-day', 'source']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'source', 'owner'], name='lead_daily_stat_unique_key'),
+            # NULL no choca con NULL en un índice único: los leads sin dueño necesitan su propia restricción.
+            models.UniqueConstraint(
+                fields=['day', 'source'], condition=models.Q(owner__isnull=True), name='lead_daily_stat_unique_unowned',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.source or '-'} {self.owner_id}: {self.leads}"
+
+
+class InterviewDailyStat(models.Model):
+    """Entrevistas agendadas por día y vendedor (lo mantiene ``rollups``)."""
+    day = models.DateField('Día')
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    interviews = models.IntegerField('Entrevistas', default=0)
+
+    class Meta:
+        verbose_name = 'Resumen diario de entrevistas'
+        verbose_name_plural = 'Resumen diario de entrevistas'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'owner'], name='interview_daily_stat_unique_key'),
+            models.UniqueConstraint(
+                fields=['day'], condition=models.Q(owner__isnull=True), name='interview_daily_stat_unique_unowned',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.owner_id}: {self.interviews}"
+
+
+class ArchivedLead(models.Model):
+    """Lead movido a un segmento comprimido por ``archive_leads`` (ver ``archive.py``).
+
+    Guarda los datos de cabecera y la posición del registro completo (lead,
+    notas y entrevistas) dentro del segmento.
+    """
+    lead_id = models.BigIntegerField('Lead', primary_key=True)
+    name = models.CharField('Nombre', max_length=150, blank=True)
+    phone = models.CharField('Teléfono', max_length=30, blank=True)
+    source = models.CharField('Fuente (publicidad)', max_length=100, blank=True)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Un reenvío de la plataforma con la misma clave sigue siendo duplicado (``ingest._existing_keys``).
+    idempotency_key = models.CharField('Clave de idempotencia', max_length=100, null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField('Creado')
+    archived_at = models.DateTimeField('Archivado', auto_now_add=True)
+    segment = models.CharField('Segmento', max_length=100)
+    line = models.PositiveIntegerField('Línea')
+
+    class Meta:
+        verbose_name = 'Lead archivado'
+        verbose_name_plural = 'Leads archivados'
+        ordering = ['-created_at']
+        indexes = [
+            # La reconciliación de resúmenes cuenta los archivados por rango de días.
+            models.Index(fields=['created_at'], name='archived_lead_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.name or f"Lead {self.lead_id}"
+
+
+class ArchivedInterview(models.Model):
+    """Entrevista de un lead archivado, con lo que cuenta el resumen diario (``rollups.reconcile_interviews``).
+
+    El detalle completo sigue en el segmento del lead.
+    """
+    lead = models.ForeignKey(ArchivedLead, on_delete=models.CASCADE, related_name='interviews')
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    scheduled_at = models.DateTimeField('Fecha y hora')
+
+    class Meta:
+        verbose_name = 'Entrevista archivada'
+        verbose_name_plural = 'Entrevistas archivadas'
+        indexes = [
+            models.Index(fields=['scheduled_at'], name='archived_interview_sched_idx'),
+        ]
+
+    def __str__(self):
+        return f"Entrevista de lead {self.lead_id} ({self.scheduled_at:%d/%m/%Y %H:%M})"
+
+
+class ClientEventOverride(models.Model):
+    """Cambio puntual de una repetición de una serie (o su cancelación).
+
+    Se identifica por el inicio original de la repetición; el resto de la
+    serie sigue calculándose de la regla.
+    """
+    event = models.ForeignKey(ClientEvent, on_delete=models.CASCADE, related_name='overrides')
+    original_start = models.DateTimeField('Inicio original')
+    cancelled = models.BooleanField('Cancelada', default=False)
+    title = models.CharField('Título', max_length=150)
+    description = models.TextField('Notas', blank=True)
+    starts_at = models.DateTimeField('Fecha y hora')
+    duration_minutes = models.PositiveSmallIntegerField(
+        'Duración (min)', default=EVENT_DEFAULT_MINUTES,
+        validators=[MinValueValidator(5), MaxValueValidator(EVENT_MAX_MINUTES)],
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Cambio de repetición'
+        verbose_name_plural = 'Cambios de repetición'
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'original_start'], name='client_override_unique'),
+        ]
+        indexes = [
+            # Repeticiones movidas hacia una ventana.
+            models.Index(fields=['event', 'starts_at'], name='client_override_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} @ {self.original_start:%Y-%m-%d %H:%M}"
+
+
+class ClientEventTombstone(models.Model):
+    """Evento borrado (o reasignado a otro dueño), para la sincronización por API.
+
+    Sin clave foránea: el evento ya no existe y el dueño puede borrarse
+    después. Se purgan pasados ``sync.TOMBSTONE_DAYS``.
+    """
+    event_id = models.BigIntegerField('Evento')
+    owner = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+',
+    )
+    deleted_at = models.DateTimeField('Borrado', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Evento borrado'
+        verbose_name_plural = 'Eventos borrados'
+        indexes = [
+            models.Index(fields=['owner', 'deleted_at'], name='client_tombstone_owner_idx'),
+            models.Index(fields=['deleted_at'], name='client_tombstone_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
+
+
+class CalendarFeed(models.Model):
+    """Suscripción iCalendar de un vendedor (ver ``feeds.py``).
+
+    ``version`` sube cada vez que cambia un evento o entrevista del dueño:
+    es la base del ETag y de la clave de caché del feed.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='calendar_feed')
+    token = models.CharField('Token', max_length=64, unique=True)
+    version = models.BigIntegerField('Versión', default=0)
+    changed_at = models.DateTimeField('Último cambio', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Feed de calendario'
+        verbose_name_plural = 'Feeds de calendario'
+
+    def __str__(self):
+        return f"{self.owner_id} v{self.version}"
+
+
+class EventReminder(models.Model):
+    """Recordatorio de un evento, repetición o entrevista (ver ``reminders.py``).
+
+    La fila única por tipo, objeto e inicio es la reserva: un recordatorio se
+    manda una sola vez aunque haya varios workers o reinicios.
+    """
+    KIND_CHOICES = [
+        ('event', 'Evento'),
+        ('interview', 'Entrevista'),
+    ]
+    kind = models.CharField('Tipo', max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField('Objeto')
+    starts_at = models.DateTimeField('Inicio')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField('Título', max_length=150)
+    # Tanda que lo reservó; sin reserva (o vencida) lo toma la próxima vuelta.
+    claim = models.CharField('Tanda', max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField('Reservado', null=True, blank=True)
+    sent_at = models.DateTimeField('Enviado', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Intentos', default=0)
+
+    class Meta:
+        verbose_name = 'Recordatorio'
+        verbose_name_plural = 'Recordatorios'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id', 'starts_at'], name='event_reminder_unique'),
+        ]
+        indexes = [
+            # Pendientes (sent_at vacío) y purga de enviados viejos.
+            models.Index(fields=['sent_at', 'claimed_at'], name='event_reminder_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.starts_at:%Y-%m-%d %H:%M})"
+
+
+class ReminderWatermark(models.Model):
+    """Hasta dónde (``starts_at``) ya se reservaron recordatorios."""
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.DateTimeField('Posición')
+
+    class Meta:
+        verbose_name = 'Marca de recordatorios'
+        verbose_name_plural = 'Marcas de recordatorios'
+
+    def __str__(self):
+        return f"{self.name}: {self.position:%Y-%m-%d %H:%M}"
@@ -0,0 +1,126 @@
+"""Indice normalizado de teléfonos.
+
+Los teléfonos se guardan como texto libre en ``Client``, ``CoHolder``,
+``ClientLead``, ``ClientEvent`` y ``ArchivedLead``. ``PhoneIndexEntry`` guarda una fila por
+teléfono con los dígitos normalizados y los dígitos invertidos, para poder
+buscar por los últimos N dígitos con un rango sobre un índice B-tree.
+"""
+from django.db import transaction
+
+# Con los últimos 8 dígitos alcanza para identificar un número argentino sin
+# importar si se cargó con 0, 54, 9 o 15.
+SUFFIX_DIGITS = 8
+
+
+def normalize_phone(value):
+    """Solo los dígitos del teléfono."""
+    return ''.join(ch for ch in (value or '') if ch.isdigit())
+
+
+def phone_suffix(value, length=SUFFIX_DIGITS):
+    digits = normalize_phone(value)
+    return digits[-length:] if digits else ''
+
+
+def reversed_digits(digits):
+    return digits[::-1]
+
+
+def suffix_range(digits, length=SUFFIX_DIGITS):
+    """Rango ``[desde, hasta)`` sobre ``digits_reversed`` para los últimos dígitos."""
+    prefix = reversed_digits(digits[-length:])
+    # ':' es el carácter siguiente a '9' en ASCII.
+    return prefix, prefix + ':'
+
+
+def _entry_kwargs(kind, obj):
+    """Datos de la entrada del índice para un objeto (o ``None`` si no aplica)."""
+    if kind == 'client':
+        label = str(obj)
+        return {'phone': obj.phone, 'label': label, 'client_id': obj.pk, 'owner_id': obj.owner_id}
+    if kind == 'coholder':
+        client = obj.client
+        return {
+            'phone': obj.phone,
+            'label': f'{obj.full_name} (cotitular de {client})',
+            'client_id': obj.client_id,
+            'owner_id': client.owner_id,
+        }
+    if kind == 'lead':
+        return {'phone': obj.phone, 'label': str(obj), 'lead_id': obj.pk, 'owner_id': obj.owner_id}
+    if kind == 'archived':
+        # El lead ya no existe: la entrada apunta al ``ArchivedLead`` (misma clave).
+        return {'phone': obj.phone, 'label': str(obj), 'owner_id': obj.owner_id}
+    if kind == 'event':
+        return {
+            'phone': obj.lead_phone,
+            'label': obj.lead_name or obj.title,
+            'client_id': obj.client_id,
+            'lead_id': obj.lead_id,
+            'owner_id': obj.owner_id,
+            'starts_at': obj.starts_at,
+        }
+    raise ValueError(kind)
+
+
+def build_entry(kind, obj):
+    from .models import PhoneIndexEntry
+
+    data = _entry_kwargs(kind, obj)
+    digits = normalize_phone(data.pop('phone'))
+    if not digits:
+        return None
+    return PhoneIndexEntry(
+        kind=kind,
+        object_id=obj.pk,
+        digits=digits,
+        digits_reversed=reversed_digits(digits),
+        **data,
+    )
+
+
+def index_object(kind, obj):
+    """Reemplaza la entrada del objeto en el índice."""
+    from .models import PhoneIndexEntry
+
+    entry = build_entry(kind, obj)
+    with transaction.atomic():
+        PhoneIndexEntry.objects.filter(kind=kind, object_id=obj.pk).delete()
+        if entry is not None:
+            entry.save()
+
+
+def index_objects(kind, objects):
+    """Versión en lote de ``index_object`` (para cargas masivas)."""
+    from .models import PhoneIndexEntry
+
+    objects = list(objects)
+    if not objects:
+        return
+    entries = [entry for entry in (build_entry(kind, obj) for obj in objects) if entry is not None]
+    with transaction.atomic():
+        PhoneIndexEntry.objects.filter(kind=kind, object_id__in=[obj.pk for obj in objects]).delete()
+        PhoneIndexEntry.objects.bulk_create(entries)
+
+
+def unindex_object(kind, object_id):
+    from .models import PhoneIndexEntry
+
+    PhoneIndexEntry.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def lookup(number, owner=None, limit=50):
+    """Entradas que coinciden con ``number`` (exacto o por últimos dígitos).
+
+    Una sola consulta sobre el índice de dígitos invertidos.
+    """
+    from .models import PhoneIndexEntry
+
+    digits = normalize_phone(number)
+    if len(digits) < 4:
+        return []
+    low, high = suffix_range(digits)
+    qs = PhoneIndexEntry.objects.filter(digits_reversed__gte=low, digits_reversed__lt=high)
+    if owner is not None:
+        qs = qs.filter(owner=owner)
+    return list(qs.order_by('kind', '-starts_at', 'label')[:limit])
@@ -0,0 +1,233 @@
+"""Avisos en vivo del módulo de clientes (WebSocket ``/ws/clientes/``).
+
+En vez de recargar ``client_list``, la bandeja o el calendario (y repetir sus
+consultas), la página abre un WebSocket y recibe diferencias chicas: leads
+nuevos o reasignados, notas nuevas y eventos guardados o borrados. La página
+aplica lo que puede en su lugar y muestra un aviso para lo demás.
+
+Canales (ver ``apps.core.realtime``):
+
+* ``user:<id>``: lo del dueño (leads, notas de sus leads y clientes, sus eventos).
+* ``supervisors``: administradores y supervisores, que ven todos los leads y clientes.
+* ``calendar``: administradores, que ven todos los eventos del calendario.
+
+Las señales publican al confirmar la transacción; las operaciones en lote
+(ingesta, conversión) publican a mano.
+"""
+import asyncio
+import json
+from collections import Counter
+from http.cookies import CookieError, SimpleCookie
+from importlib import import_module
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.auth.models import User
+from django.db import close_old_connections
+from django.http import HttpRequest
+from django.http.request import split_domain_port, validate_host
+from django.utils.http import is_same_domain
+from django.utils import timezone
+
+from apps.core.realtime import get_broker, publish
+from apps.users.permissions import access_for
+
+WEBSOCKET_PATH = '/ws/clientes/'
+SUPERVISORS = 'supervisors'
+CALENDAR = 'calendar'
+NOTE_PREVIEW = 200
+# Más leads que esto en una operación van como un aviso con la cantidad.
+BULK_NOTICE = 20
+# Cierre sin sesión o sin permiso (rango 4000-4999 reservado a la aplicación).
+CLOSE_FORBIDDEN = 4403
+
+
+def user_channel(user_id):
+    return f'user:{user_id}' if user_id else None
+
+
+def channels_for(user, access):
+    channels = [user_channel(user.pk)]
+    if access.is_full_admin:
+        channels.append(SUPERVISORS)
+    if access.is_admin:
+        channels.append(CALENDAR)
+    return channels
+
+
+def _stamp(value):
+    return f'{timezone.localtime(value):%d/%m/%Y %H:%M}' if value else ''
+
+
+def _usernames(user_ids):
+    user_ids = {user_id for user_id in user_ids if user_id}
+    return dict(User.objects.filter(pk__in=user_ids).values_list('pk', 'username')) if user_ids else {}
+
+
+def _lead_message(lead, action, usernames):
+    return {
+        'type': 'lead',
+        'action': action,
+        'id': lead.pk,
+        'name': lead.name,
+        'phone': lead.phone,
+        'source': lead.source,
+        'owner': usernames.get(lead.owner_id, ''),
+        'created_at': _stamp(lead.created_at),
+    }
+
+
+def leads_created(leads):
+    """Leads nuevos (también los de ``bulk_create``): a su dueño y a los supervisores.
+
+    Un lote grande va como un solo aviso con la cantidad, no uno por lead.
+    """
+    if len(leads) > BULK_NOTICE:
+        for owner_id, total in Counter(lead.owner_id for lead in leads).items():
+            publish([user_channel(owner_id)], {'type': 'lead', 'action': 'bulk', 'count': total})
+        publish([SUPERVISORS], {'type': 'lead', 'action': 'bulk', 'count': len(leads)})
+        return
+    usernames = _usernames(lead.owner_id for lead in leads)
+    for lead in leads:
+        publish([user_channel(lead.owner_id), SUPERVISORS], _lead_message(lead, 'created', usernames))
+
+
+def lead_assigned(lead, old_owner_id):
+    usernames = _usernames([lead.owner_id])
+    publish([user_channel(lead.owner_id), SUPERVISORS], _lead_message(lead, 'assigned', usernames))
+    publish([user_channel(old_owner_id)], {'type': 'lead', 'action': 'removed', 'id': lead.pk})
+
+
+def leads_removed(leads):
+    """Leads que salen de la bandeja (convertidos o borrados)."""
+    if len(leads) > BULK_NOTICE:
+        owners = {lead.owner_id for lead in leads}
+        publish([*map(user_channel, owners), SUPERVISORS], {'type': 'lead', 'action': 'bulk', 'count': len(leads)})
+        return
+    for lead in leads:
+        publish([user_channel(lead.owner_id), SUPERVISORS], {'type': 'lead', 'action': 'removed', 'id': lead.pk})
+
+
+def note_added(note, target, owner_id, name):
+    """Nota nueva de un lead (``target='lead'``) o de un cliente (``'client'``)."""
+    publish([user_channel(owner_id), SUPERVISORS], {
+        'type': 'note',
+        'target': target,
+        'id': note.lead_id if target == 'lead' else note.client_id,
+        'name': name,
+        'author': note.author.username if note.author_id else '',
+        'content': note.content[:NOTE_PREVIEW],
+        'created_at': _stamp(note.created_at),
+    })
+
+
+def event_saved(event, old_owner_id=None):
+    message = {
+        'type': 'event',
+        'action': 'saved',
+        'id': event.pk,
+        'title': event.title,
+        'starts_at': _stamp(event.starts_at),
+        'recurring': event.is_recurring,
+    }
+    publish([user_channel(event.owner_id), CALENDAR], message)
+    if old_owner_id and old_owner_id != event.owner_id:
+        publish([user_channel(old_owner_id)], {'type': 'event', 'action': 'removed', 'id': event.pk})
+
+
+def event_removed(event_id, owner_id):
+    publish([user_channel(owner_id), CALENDAR], {'type': 'event', 'action': 'removed', 'id': event_id})
+
+
+def _scheme(scope, headers):
+    """``https`` si el handshake llegó cifrado (directo o según ``SECURE_PROXY_SSL_HEADER``)."""
+    if scope.get('scheme') in ('wss', 'https'):
+        return 'https'
+    if settings.SECURE_PROXY_SSL_HEADER:
+        header, secure_value = settings.SECURE_PROXY_SSL_HEADER
+        name = header[len('HTTP_'):] if header.startswith('HTTP_') else header
+        name = name.lower().replace('_', '-').encode('latin-1')
+        value = headers.get(name, b'').decode('latin-1').split(',')[0].strip()
+        if value == secure_value:
+            return 'https'
+    return 'http'
+
+
+def _origin_allowed(origin, scope, headers):
+    """Mismo criterio que ``CsrfViewMiddleware``: la página es del propio sitio o de ``CSRF_TRUSTED_ORIGINS``.
+
+    Comparar solo con ``ALLOWED_HOSTS`` no alcanza: con ``*`` aceptaría cualquier página.
+    """
+    host = headers.get(b'host', b'').decode('latin-1')
+    allowed = settings.ALLOWED_HOSTS or (['.localhost', '127.0.0.1', '[::1]'] if settings.DEBUG else [])
+    if host and validate_host(split_domain_port(host)[0], allowed) and origin == f'{_scheme(scope, headers)}://{host}':
+        return True
+    if origin in settings.CSRF_TRUSTED_ORIGINS:
+        return True
+    try:
+        parsed = urlsplit(origin)
+    except ValueError:
+        return False
+    return any(
+        is_same_domain(parsed.netloc, urlsplit(trusted).netloc.lstrip('*'))
+        for trusted in settings.CSRF_TRUSTED_ORIGINS
+        if '*' in trusted and urlsplit(trusted).scheme == parsed.scheme
+    )
+
+
+def _session_user(scope):
+    """Usuario de la cookie de sesión del handshake y sus canales (``None`` si no puede usar clientes)."""
+    headers = dict(scope.get('headers') or ())
+    origin = headers.get(b'origin', b'').decode('latin-1')
+    if origin and not _origin_allowed(origin, scope, headers):
+        return None
+    try:
+        cookies = SimpleCookie(headers.get(b'cookie', b'').decode('latin-1'))
+    except CookieError:
+        return None
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    close_old_connections()
+    try:
+        request = HttpRequest()
+        request.session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+        user = get_user(request)
+        access = access_for(user)
+        if not access.can_use_clients:
+            return None
+        return channels_for(user, access)
+    finally:
+        close_old_connections()
+
+
+async def websocket_app(scope, receive, send):
+    """Conexión de una página: solo envía; lo que manda el navegador se ignora."""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    channels = await sync_to_async(_session_user)(scope)
+    if channels is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_FORBIDDEN})
+        return
+    await send({'type': 'websocket.accept'})
+    broker = get_broker()
+    subscription = broker.subscribe(channels)
+    receiving = asyncio.ensure_future(receive())
+    getting = asyncio.ensure_future(subscription.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receiving, getting}, return_when=asyncio.FIRST_COMPLETED)
+            if getting in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(getting.result(), ensure_ascii=False)})
+                getting = asyncio.ensure_future(subscription.get())
+            if receiving in done:
+                if receiving.result()['type'] == 'websocket.disconnect':
+                    break
+                receiving = asyncio.ensure_future(receive())
+    finally:
+        receiving.cancel()
+        getting.cancel()
+        broker.unsubscribe(subscription)
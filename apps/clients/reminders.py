@@ -0,0 +1,304 @@
+"""Recordatorios de eventos y entrevistas (``python manage.py run_reminders``).
+
+El worker guarda una marca de agua (``ReminderWatermark``). En cada vuelta
+lee solo lo que empieza entre la marca y ``ahora + REMINDER_LEAD_MINUTES``
+con los índices de ``starts_at`` y ``scheduled_at`` (más las repeticiones de
+las series en esa ventana) y corre la marca: nunca vuelve a recorrer la
+tabla de eventos.
+
+Cada recordatorio se reserva insertando su fila de ``EventReminder`` (única
+por tipo, objeto e inicio) con el identificador de la tanda; lo que otra
+vuelta u otro worker ya reservó se ignora. Lo reservado se agrupa por
+vendedor y sale como un resumen por vendedor y tanda por el backend de
+``REMINDER_BACKEND``. Si el envío falla, las filas quedan sin ``sent_at`` y
+se reintentan en una vuelta posterior (entrega al menos una vez). Antes de
+cada envío se vuelve a leer lo reservado: lo borrado, cancelado o movido se
+descarta y un cambio de dueño o título se aplica.
+
+Un evento agendado o movido a último momento (antes de la marca, que ya
+pasó por ahí) lo encola la señal de guardado con ``enqueue_late``.
+"""
+import datetime
+import json
+import uuid
+from dataclasses import dataclass
+from itertools import groupby
+from pathlib import Path
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import agenda
+from .models import ClientEvent, EventReminder, LeadInterview, ReminderWatermark
+
+REMINDER_LEAD_MINUTES = 30
+BATCH_SIZE = 500
+POLL_SECONDS = 30
+# Una reserva sin enviar más vieja que esto (worker caído o envío fallido) se vuelve a tomar.
+RETRY_AFTER = datetime.timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+KEEP_DAYS = 7
+WATERMARK = 'reminders'
+DEFAULT_BACKEND = 'apps.clients.reminders.EmailBackend'
+
+
+def lead_time():
+    return datetime.timedelta(minutes=getattr(settings, 'REMINDER_LEAD_MINUTES', REMINDER_LEAD_MINUTES))
+
+
+@dataclass
+class Digest:
+    """Recordatorios de un vendedor en una tanda."""
+    owner: object
+    reminders: list
+
+    def subject(self):
+        first = timezone.localtime(self.reminders[0].starts_at)
+        if len(self.reminders) == 1:
+            return f'Recordatorio: {self.reminders[0].title} a las {first:%H:%M}'
+        return f'Recordatorio: {len(self.reminders)} citas desde las {first:%H:%M}'
+
+    def lines(self):
+        return [
+            f'{timezone.localtime(reminder.starts_at):%d/%m %H:%M} - {reminder.title} ({reminder.get_kind_display()})'
+            for reminder in self.reminders
+        ]
+
+    def body(self):
+        return 'Próximas citas:\n\n' + '\n'.join(self.lines()) + '\n'
+
+
+class EmailBackend:
+    """Un correo por vendedor, todos por la misma conexión SMTP (``EMAIL_HOST``/``EMAIL_PORT``).
+
+    Los vendedores sin correo cargado no reciben nada.
+    """
+
+    def send(self, digests):
+        messages = [
+            EmailMessage(digest.subject(), digest.body(), to=[digest.owner.email])
+            for digest in digests if digest.owner.email
+        ]
+        if messages:
+            with get_connection(fail_silently=False) as connection:
+                connection.send_messages(messages)
+
+
+class FileBackend:
+    """Agrega los resúmenes a ``REMINDER_OUTBOX_DIR/reminders-AAAAMMDD.jsonl`` (una línea por vendedor)."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or getattr(settings, 'REMINDER_OUTBOX_DIR', settings.BASE_DIR / 'outbox'))
+
+    def send(self, digests):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'reminders-{timezone.localdate():%Y%m%d}.jsonl'
+        with open(path, 'a', encoding='utf-8') as outbox:
+            for digest in digests:
+                outbox.write(json.dumps({
+                    'owner': digest.owner.username,
+                    'email': digest.owner.email,
+                    'subject': digest.subject(),
+                    'lines': digest.lines(),
+                    'reminders': [
+                        {'kind': reminder.kind, 'id': reminder.object_id, 'starts_at': reminder.starts_at}
+                        for reminder in digest.reminders
+                    ],
+                }, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+
+
+def get_backend():
+    return import_string(getattr(settings, 'REMINDER_BACKEND', DEFAULT_BACKEND))()
+
+
+def due_reminders(low, high):
+    """Recordatorios (sin guardar) de lo que empieza en ``[low, high)``."""
+    events = ClientEvent.objects.filter(owner__isnull=False)
+    singles = (
+        agenda.single_events(events).filter(starts_at__gte=low, starts_at__lt=high)
+        .values_list('id', 'owner_id', 'title', 'starts_at', 'lead_id')
+    )
+    found, booked = [], set()
+    for event_id, owner_id, title, starts_at, lead_id in singles:
+        found.append(EventReminder(kind='event', object_id=event_id, owner_id=owner_id, title=title, starts_at=starts_at))
+        if lead_id:
+            booked.add((lead_id, starts_at))
+    for item in agenda.expand(agenda.active_series(events, low, high), low, high):
+        found.append(EventReminder(
+            kind='event', object_id=item.id, owner_id=item.owner_id, title=item.title, starts_at=item.starts_at,
+        ))
+    interviews = (
+        LeadInterview.objects.filter(owner__isnull=False, scheduled_at__gte=low, scheduled_at__lt=high)
+        .values_list('id', 'owner_id', 'title', 'scheduled_at', 'lead_id')
+    )
+    for interview_id, owner_id, title, scheduled_at, lead_id in interviews:
+        # Las entrevistas creadas desde la bandeja ya tienen su evento.
+        if (lead_id, scheduled_at) not in booked:
+            found.append(EventReminder(
+                kind='interview', object_id=interview_id, owner_id=owner_id, title=title, starts_at=scheduled_at,
+            ))
+    return found
+
+
+def _current(reminders):
+    """``{id: (dueño, título)}`` de los recordatorios cuyo objeto sigue empezando en ``starts_at``.
+
+    Entre la reserva y un reintento el evento pudo moverse, cancelarse o
+    borrarse; si se movió cerca, el nuevo inicio lo encola ``enqueue_late``.
+    """
+    events = ClientEvent.objects.in_bulk({reminder.object_id for reminder in reminders if reminder.kind == 'event'})
+    interviews = LeadInterview.objects.in_bulk(
+        {reminder.object_id for reminder in reminders if reminder.kind == 'interview'}
+    )
+    series = [event for event in events.values() if event.is_recurring]
+    low = min(reminder.starts_at for reminder in reminders)
+    high = max(reminder.starts_at for reminder in reminders) + datetime.timedelta(seconds=1)
+    occurrences = {(item.id, item.starts_at): item for item in agenda.expand(series, low, high)}
+    current = {}
+    for reminder in reminders:
+        if reminder.kind == 'interview':
+            item = interviews.get(reminder.object_id)
+            if item is None or item.scheduled_at != reminder.starts_at:
+                continue
+        else:
+            event = events.get(reminder.object_id)
+            if event is None:
+                continue
+            if event.is_recurring:
+                item = occurrences.get((event.id, reminder.starts_at))
+            else:
+                item = event if event.starts_at == reminder.starts_at else None
+            if item is None:
+                continue
+        if item.owner_id is not None:
+            current[reminder.id] = (item.owner_id, item.title)
+    return current
+
+
+def _claimed(token):
+    return list(
+        EventReminder.objects.filter(claim=token, sent_at__isnull=True)
+        .select_related('owner').order_by('owner_id', 'starts_at', 'id')
+    )
+
+
+def _deliver(token, backend):
+    """Manda lo reservado por la tanda ``token``. Devuelve ``(enviados, fallidos)``."""
+    claimed = _claimed(token)
+    if not claimed:
+        return 0, 0
+    current = _current(claimed)
+    stale = [reminder.id for reminder in claimed if reminder.id not in current]
+    changed = [
+        reminder for reminder in claimed
+        if reminder.id in current and current[reminder.id] != (reminder.owner_id, reminder.title)
+    ]
+    if stale or changed:
+        EventReminder.objects.filter(id__in=stale).delete()
+        for reminder in changed:
+            owner_id, title = current[reminder.id]
+            EventReminder.objects.filter(id=reminder.id).update(owner_id=owner_id, title=title)
+        claimed = _claimed(token)
+        if not claimed:
+            return 0, 0
+    digests = [Digest(owner, list(items)) for owner, items in groupby(claimed, key=lambda reminder: reminder.owner)]
+    try:
+        backend.send(digests)
+    except OSError:
+        # SMTP caído o disco lleno: queda pendiente y se reintenta después de RETRY_AFTER.
+        EventReminder.objects.filter(claim=token).update(attempts=F('attempts') + 1)
+        return 0, len(claimed)
+    EventReminder.objects.filter(claim=token).update(sent_at=timezone.now(), attempts=F('attempts') + 1)
+    return len(claimed), 0
+
+
+def _claim_pending(now, token, limit):
+    """Reserva pendientes sin tanda, con tanda vencida o encolados a último momento.
+
+    Lo que ya empezó no se reintenta.
+    """
+    stale = Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - RETRY_AFTER)
+    ids = list(
+        EventReminder.objects.filter(stale, sent_at__isnull=True, attempts__lt=MAX_ATTEMPTS, starts_at__gte=now)
+        .values_list('id', flat=True)[:limit]
+    )
+    if not ids:
+        return 0
+    return EventReminder.objects.filter(stale, id__in=ids, sent_at__isnull=True).update(claim=token, claimed_at=now)
+
+
+@dataclass
+class TickResult:
+    low: datetime.datetime = None
+    high: datetime.datetime = None
+    due: int = 0
+    sent: int = 0
+    failed: int = 0
+
+
+def run_once(backend=None, now=None, batch_size=BATCH_SIZE):
+    """Una vuelta del worker: ventana nueva, reintentos y purga."""
+    backend = backend or get_backend()
+    now = now or timezone.now()
+    result = TickResult()
+    watermark, _ = ReminderWatermark.objects.get_or_create(name=WATERMARK, defaults={'position': now})
+    # Lo que ya empezó no se recuerda: tras una caída larga se sigue desde ahora.
+    result.low, result.high = max(watermark.position, now), now + lead_time()
+    if result.high > result.low:
+        due = due_reminders(result.low, result.high)
+        result.due = len(due)
+        for start in range(0, len(due), batch_size):
+            token = uuid.uuid4().hex
+            batch = due[start:start + batch_size]
+            for reminder in batch:
+                reminder.claim, reminder.claimed_at = token, now
+            EventReminder.objects.bulk_create(batch, ignore_conflicts=True)
+            sent, failed = _deliver(token, backend)
+            result.sent += sent
+            result.failed += failed
+        ReminderWatermark.objects.filter(name=WATERMARK).update(position=result.high)
+
+    token = uuid.uuid4().hex
+    if _claim_pending(now, token, batch_size):
+        sent, failed = _deliver(token, backend)
+        result.sent += sent
+        result.failed += failed
+    # Purga: enviados viejos y los que agotaron los intentos.
+    cutoff = now - datetime.timedelta(days=KEEP_DAYS)
+    EventReminder.objects.filter(Q(sent_at__lt=cutoff) | Q(sent_at__isnull=True, claimed_at__lt=cutoff)).delete()
+    return result
+
+
+def starts_soon(starts_at):
+    """``True`` si ``starts_at`` puede haber quedado detrás de la marca de agua."""
+    now = timezone.now()
+    return starts_at is not None and now <= starts_at < now + lead_time() * 2
+
+
+def enqueue_late(kind, object_id, owner_id, title, starts_at, lead_id=None):
+    """Encola el recordatorio de algo que empieza antes de la marca de agua.
+
+    Solo consulta la marca si el inicio está cerca: lo demás lo va a
+    encontrar el worker al correr la ventana.
+    """
+    if owner_id is None or not starts_soon(starts_at):
+        return
+    position = ReminderWatermark.objects.filter(name=WATERMARK).values_list('position', flat=True).first()
+    if position is None or starts_at >= position:
+        return
+    if lead_id and kind == 'interview':
+        if ClientEvent.objects.filter(lead_id=lead_id, starts_at=starts_at).exists():
+            return
+    elif lead_id:
+        # La entrevista se guarda antes que su evento: el evento la reemplaza.
+        EventReminder.objects.filter(
+            kind='interview', starts_at=starts_at, sent_at__isnull=True, claimed_at__isnull=True,
+            object_id__in=LeadInterview.objects.filter(lead_id=lead_id).values('id'),
+        ).delete()
+    EventReminder.objects.bulk_create([EventReminder(
+        kind=kind, object_id=object_id, owner_id=owner_id, title=title, starts_at=starts_at,
+    )], ignore_conflicts=True)
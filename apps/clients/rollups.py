@@ -0,0 +1,148 @@
+"""Tablas de resumen para reportes de leads y entrevistas.
+
+Las señales suman o restan en la fila del día (``UPDATE ... SET n = n + 1``)
+y ``reconcile_rollups`` recalcula cada noche los últimos días desde las
+tablas originales. Los reportes solo leen los resúmenes, así que su costo
+depende de los días consultados y no del historial de leads.
+
+Los leads se cuentan por día de llegada: un lead archivado sigue contando
+en su día (la reconciliación también lee ``ArchivedLead``, y sus entrevistas
+``ArchivedInterview``) y uno borrado también, salvo que se reconcilie su día.
+"""
+from collections import Counter
+import datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedInterview, ArchivedLead, ClientLead, InterviewDailyStat, LeadDailyStat, LeadInterview,
+)
+
+RECONCILE_DAYS = 2
+# Las entrevistas se agendan a futuro: la reconciliación también cubre estos días.
+INTERVIEW_HORIZON_DAYS = 90
+
+
+def local_day(value):
+    return timezone.localdate(value) if value else timezone.localdate()
+
+
+def _bump(model, key, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    with transaction.atomic():
+        if not model.objects.filter(**key).update(**changes):
+            # Las restricciones únicas (también la de filas sin dueño) hacen que un
+            # alta concurrente termine en get en vez de una segunda fila.
+            model.objects.get_or_create(**key)
+            model.objects.filter(**key).update(**changes)
+
+
+def lead_key(day, source, owner_id):
+    return {'day': day, 'source': source or '', 'owner_id': owner_id}
+
+
+def count_leads(keys, field='leads', sign=1):
+    """Suma los leads agrupados por ``(día, fuente, dueño)``."""
+    for (day, source, owner_id), total in Counter(keys).items():
+        _bump(LeadDailyStat, lead_key(day, source, owner_id), **{field: sign * total})
+
+
+def lead_created(lead):
+    count_leads([(local_day(lead.created_at), lead.source, lead.owner_id)])
+
+
+def lead_moved(lead, old_source, old_owner_id):
+    """Reasignación o cambio de fuente: el lead pasa de fila dentro de su día."""
+    day = local_day(lead.created_at)
+    converted = 1 if lead.converted_at else 0
+    _bump(LeadDailyStat, lead_key(day, old_source, old_owner_id), leads=-1, converted=-converted)
+    _bump(LeadDailyStat, lead_key(day, lead.source, lead.owner_id), leads=1, converted=converted)
+
+
+def leads_converted(leads):
+    count_leads([(local_day(lead.created_at), lead.source, lead.owner_id) for lead in leads], field='converted')
+
+
+def interview_changed(day=None, owner_id=None, delta=1):
+    if day is not None:
+        _bump(InterviewDailyStat, {'day': day, 'owner_id': owner_id}, interviews=delta)
+
+
+def release_owner(owner_id):
+    """Pasa los resúmenes de un usuario que se borra a las filas sin dueño.
+
+    Si ``SET_NULL`` lo hiciera solo, chocaría con la fila sin dueño del mismo día.
+    """
+    for row in LeadDailyStat.objects.filter(owner_id=owner_id).values('day', 'source', 'leads', 'converted'):
+        _bump(LeadDailyStat, lead_key(row['day'], row['source'], None), leads=row['leads'], converted=row['converted'])
+    for row in InterviewDailyStat.objects.filter(owner_id=owner_id).values('day', 'interviews'):
+        interview_changed(row['day'], None, delta=row['interviews'])
+    LeadDailyStat.objects.filter(owner_id=owner_id).delete()
+    InterviewDailyStat.objects.filter(owner_id=owner_id).delete()
+
+
+def _day_bounds(start, end):
+    """Límites ``[desde, hasta)`` en hora local para filtrar por índice."""
+    tz = timezone.get_current_timezone()
+    low = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min), tz)
+    high = timezone.make_aware(datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min), tz)
+    return low, high
+
+
+@transaction.atomic
+def reconcile_leads(start, end):
+    """Recalcula el resumen de leads de ``start`` a ``end`` (inclusive) desde ``ClientLead`` y ``ArchivedLead``."""
+    low, high = _day_bounds(start, end)
+    tz = timezone.get_current_timezone()
+    live = (
+        ClientLead.objects.filter(created_at__gte=low, created_at__lt=high)
+        .annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values_list('day', 'source', 'owner_id')
+        .annotate(leads=Count('id'), converted=Count('id', filter=Q(converted_at__isnull=False)))
+        .order_by()
+    )
+    # Solo se archivan leads sin convertir: suman llegadas, no conversiones.
+    archived = (
+        ArchivedLead.objects.filter(created_at__gte=low, created_at__lt=high)
+        .annotate(day=TruncDate('created_at', tzinfo=tz))
+        .values_list('day', 'source', 'owner_id')
+        .annotate(leads=Count('lead_id'))
+        .order_by()
+    )
+    totals = {(day, source, owner_id): [leads, converted] for day, source, owner_id, leads, converted in live}
+    for day, source, owner_id, leads in archived:
+        totals.setdefault((day, source, owner_id), [0, 0])[0] += leads
+    LeadDailyStat.objects.filter(day__gte=start, day__lte=end).delete()
+    return len(LeadDailyStat.objects.bulk_create([
+        LeadDailyStat(day=day, source=source, owner_id=owner_id, leads=leads, converted=converted)
+        for (day, source, owner_id), (leads, converted) in totals.items()
+    ]))
+
+
+@transaction.atomic
+def reconcile_interviews(start, end):
+    """Recalcula el resumen de entrevistas de ``start`` a ``end`` desde ``LeadInterview`` y ``ArchivedInterview``."""
+    low, high = _day_bounds(start, end)
+    tz = timezone.get_current_timezone()
+    totals = Counter()
+    for model in (LeadInterview, ArchivedInterview):
+        rows = (
+            model.objects.filter(scheduled_at__gte=low, scheduled_at__lt=high)
+            .annotate(day=TruncDate('scheduled_at', tzinfo=tz))
+            .values_list('day', 'owner_id')
+            .annotate(interviews=Count('id'))
+            .order_by()
+        )
+        for day, owner_id, interviews in rows:
+            totals[day, owner_id] += interviews
+    InterviewDailyStat.objects.filter(day__gte=start, day__lte=end).delete()
+    return len(InterviewDailyStat.objects.bulk_create([
+        InterviewDailyStat(day=day, owner_id=owner_id, interviews=interviews)
+        for (day, owner_id), interviews in totals.items()
+    ]))
@@ -0,0 +1,337 @@
+"""Indice de búsqueda de clientes.
+
+El listado de clientes consulta este índice en lugar de aplicar varios
+``icontains`` sobre ``Client`` y ``CoHolder``. El documento indexado se arma
+con los nombres (sin acentos), el CUIT, el documento y los teléfonos del
+titular y del cotitular.
+
+Backends disponibles:
+
+* ``sqlite``: tabla virtual FTS5 con ranking ``bm25``.
+* ``postgres``: tabla con índice GIN ``gin_trgm_ops`` (extensión pg_trgm).
+
+El backend se elige según el motor de la base de datos o con el setting
+``CLIENT_SEARCH_BACKEND``.
+
+Los backends buscan por prefijo de palabra. Para que un fragmento del medio
+de un CUIT, documento o teléfono también encuentre al cliente, los dígitos se
+indexan además con sus sufijos de al menos ``phones.SUFFIX_DIGITS`` cifras
+(``4567`` es prefijo del sufijo ``45678901`` de ``1145678901``). Los sufijos
+más cortos no se indexan: serían decenas de palabras más por cliente, que
+agrandan el índice y cambian la normalización por largo de ``bm25`` también
+para las búsquedas por nombre. Los últimos dígitos sueltos de un teléfono los
+busca el identificador de llamadas.
+
+Los resultados se paginan por cursor sobre ``(puntaje, id)``: ``puntaje`` es
+menor cuanto más relevante (``bm25`` en SQLite, ``-word_similarity`` en
+PostgreSQL), sin tope de resultados.
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from apps.core.pagination import KeysetPaginator
+from .phones import SUFFIX_DIGITS
+
+SEARCH_TABLE = 'clients_client_search'
+DEFAULT_LIMIT = 200
+# Sufijos numéricos más cortos que esto no se indexan (ver arriba).
+MIN_FRAGMENT = SUFFIX_DIGITS
+SEARCH_ORDERING = ['score', 'id']
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(value):
+    """Pasa a minúsculas y quita acentos (Muñoz -> munoz)."""
+    normalized = unicodedata.normalize('NFKD', value or '')
+    return ''.join(ch for ch in normalized if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(value):
+    """Tokens alfanuméricos ya normalizados."""
+    return _TOKEN_RE.findall(fold(value))
+
+
+def _digits(value):
+    return ''.join(ch for ch in (value or '') if ch.isdigit())
+
+
+def digit_fragments(value):
+    """Sufijos de los dígitos de ``value`` (el número completo incluido) de al menos ``MIN_FRAGMENT`` cifras."""
+    digits = _digits(value)
+    return [digits[start:] for start in range(len(digits) - MIN_FRAGMENT + 1)]
+
+
+def build_document(client, coholder=None):
+    """Texto indexable de un cliente (y su cotitular, si tiene)."""
+    parts = [client.first_name, client.last_name, client.company_name, client.cuit, client.doc_number, client.phone]
+    numbers = [client.cuit, client.doc_number, client.phone]
+    if coholder is not None:
+        parts.extend([coholder.full_name, coholder.dni, coholder.phone])
+        numbers.extend([coholder.dni, coholder.phone])
+    document = ' '.join(fold(part) for part in parts if part)
+    # Un sufijo que ya es palabra del documento (el número cargado sin separadores) no se repite.
+    words = set(tokenize(document))
+    fragments = []
+    for number in numbers:
+        for fragment in digit_fragments(number):
+            if fragment not in words:
+                words.add(fragment)
+                fragments.append(fragment)
+    return ' '.join([document, *fragments]) if fragments else document
+
+
+class BaseSearchBackend:
+    """Interfaz común de los backends de búsqueda."""
+
+    vendor = None
+
+    def create_index(self, schema_editor):
+        raise NotImplementedError
+
+    def drop_index(self, schema_editor):
+        raise NotImplementedError
+
+    def upsert(self, rows):
+        """Reemplaza las entradas ``(client_id, owner_id, document)``."""
+        raise NotImplementedError
+
+    def delete(self, client_ids):
+        raise NotImplementedError
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+
+    def search(self, query, owner_id=None, limit=DEFAULT_LIMIT, after=None, reverse=False):
+        """``(id, puntaje)`` de los clientes, de más a menos relevante.
+
+        ``after`` es el ``(puntaje, id)`` del último visto; con ``reverse`` se
+        lee hacia atrás (los anteriores a ``after``, de menos a más relevante).
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Tabla virtual FTS5; el rowid es el id del cliente."""
+
+    vendor = 'sqlite'
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            "document, owner_id UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def upsert(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [(client_id,) for client_id, _, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, owner_id, document) VALUES (%s, %s, %s)',
+                rows,
+            )
+
+    def delete(self, client_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+                [(client_id,) for client_id in client_ids],
+            )
+
+    def search(self, query, owner_id=None, limit=DEFAULT_LIMIT, after=None, reverse=False):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Cada término como prefijo; todos deben aparecer (AND implícito).
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        sql = f'SELECT rowid, rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+        params = [match]
+        if owner_id is not None:
+            sql += ' AND owner_id = %s'
+            params.append(owner_id)
+        op, direction = ('<', 'DESC') if reverse else ('>', 'ASC')
+        if after is not None:
+            sql += f' AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+            params.extend([after[0], after[0], after[1]])
+        sql += f' ORDER BY rank {direction}, rowid {direction} LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+
+class PostgresTrigramBackend(BaseSearchBackend):
+    """Tabla auxiliar con índice trigram (requiere la extensión pg_trgm)."""
+
+    vendor = 'postgresql'
+
+    def create_index(self, schema_editor):
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ('
+            'client_id bigint PRIMARY KEY, owner_id integer NULL, document text NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm '
+            f'ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_owner ON {SEARCH_TABLE} (owner_id)'
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+    def upsert(self, rows):
+        rows = list(rows)
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (client_id, owner_id, document) VALUES (%s, %s, %s) '
+                'ON CONFLICT (client_id) DO UPDATE '
+                'SET owner_id = EXCLUDED.owner_id, document = EXCLUDED.document',
+                rows,
+            )
+
+    def delete(self, client_ids):
+        client_ids = list(client_ids)
+        if not client_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE client_id = ANY(%s)', [client_ids])
+
+    def search(self, query, owner_id=None, limit=DEFAULT_LIMIT, after=None, reverse=False):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        text = ' '.join(tokens)
+        # Todos los términos deben aparecer como palabra (o prefijo) similar.
+        where = ' AND '.join(['%s <%% document'] * len(tokens))
+        params = list(tokens)
+        if owner_id is not None:
+            where += ' AND owner_id = %s'
+            params.append(owner_id)
+        op, direction = ('<', 'DESC') if reverse else ('>', 'ASC')
+        if after is not None:
+            where += f' AND (-word_similarity(%s, document), client_id) {op} (%s, %s)'
+            params.extend([text, after[0], after[1]])
+        sql = (
+            f'SELECT client_id, -word_similarity(%s, document) AS score FROM {SEARCH_TABLE} WHERE {where} '
+            f'ORDER BY score {direction}, client_id {direction} LIMIT %s'
+        )
+        params = [text] + params + [limit]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [tuple(row) for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresTrigramBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Backend configurado (o ``None`` si el motor no tiene índice)."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'CLIENT_SEARCH_BACKEND', None)
+        if path:
+            _backend = import_string(path)()
+        else:
+            backend_class = BACKENDS.get(connection.vendor)
+            _backend = backend_class() if backend_class else False
+    return _backend or None
+
+
+def _rows_for(clients):
+    for client in clients:
+        coholder = getattr(client, 'coholder', None)
+        yield client.id, client.owner_id, build_document(client, coholder)
+
+
+def index_clients(client_ids):
+    """Reindexa los clientes indicados (una consulta con cotitular unido)."""
+    from .models import Client
+
+    backend = get_backend()
+    if backend is None:
+        return
+    client_ids = list(client_ids)
+    clients = Client.objects.filter(id__in=client_ids).select_related('coholder')
+    rows = list(_rows_for(clients))
+    found = {row[0] for row in rows}
+    backend.upsert(rows)
+    missing = [client_id for client_id in client_ids if client_id not in found]
+    if missing:
+        backend.delete(missing)
+
+
+def remove_clients(client_ids):
+    backend = get_backend()
+    if backend is not None:
+        backend.delete(list(client_ids))
+
+
+def rebuild_index(chunk_size=2000):
+    """Reconstruye el índice completo en lotes. Devuelve la cantidad indexada."""
+    from .models import Client
+
+    backend = get_backend()
+    if backend is None:
+        return 0
+    backend.clear()
+    total = 0
+    batch = []
+    for client in Client.objects.select_related('coholder').order_by('id').iterator(chunk_size=chunk_size):
+        batch.append(client)
+        if len(batch) >= chunk_size:
+            backend.upsert(_rows_for(batch))
+            total += len(batch)
+            batch = []
+    if batch:
+        backend.upsert(_rows_for(batch))
+        total += len(batch)
+    return total
+
+
+class SearchPaginator(KeysetPaginator):
+    """Pagina los resultados del índice por relevancia (cursor ``(puntaje, id)``).
+
+    ``clients`` da las columnas y el alcance (p. ej. solo los del vendedor);
+    cada cliente de la página lleva su ``score``.
+    """
+
+    def __init__(self, clients, query, owner=None, per_page=50):
+        super().__init__(clients, SEARCH_ORDERING, per_page)
+        self.query = query
+        self.owner_id = owner.pk if owner is not None else None
+
+    def _fetch(self, values, reverse=False):
+        hits = get_backend().search(
+            self.query, owner_id=self.owner_id, limit=self.per_page + 1, after=values, reverse=reverse,
+        )
+        found = self.queryset.in_bulk([client_id for client_id, _ in hits])
+        rows = []
+        for client_id, score in hits:
+            client = found.get(client_id)
+            if client is not None:
+                client.score = score
+                rows.append(client)
+        return rows
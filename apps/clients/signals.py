@@ -0,0 +1,276 @@
+"""Signals for clients app."""
+import threading
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import assignment, feeds, phones, realtime, reminders, rollups, search, sync
+from .models import (
+    ArchivedLead, Client, ClientEvent, ClientEventOverride, ClientLead, ClientLeadNote, ClientNote, CoHolder,
+    LeadInterview,
+)
+
+
+@receiver(post_save, sender=Client)
+def index_client(sender, instance, raw=False, **kwargs):
+    """Mantiene los índices de búsqueda y de teléfonos al guardar un cliente."""
+    if not raw:
+        search.index_clients([instance.pk])
+        phones.index_object('client', instance)
+        # La entrada del cotitular copia el dueño y el nombre del titular.
+        coholder = CoHolder.objects.filter(client_id=instance.pk).only('id', 'full_name', 'phone', 'client_id').first()
+        if coholder is not None:
+            coholder.client = instance
+            phones.index_object('coholder', coholder)
+
+
+@receiver(post_delete, sender=Client)
+def unindex_client(sender, instance, **kwargs):
+    search.remove_clients([instance.pk])
+    phones.unindex_object('client', instance.pk)
+
+
+@receiver(post_save, sender=CoHolder)
+def index_coholder(sender, instance, raw=False, **kwargs):
+    """El cotitular forma parte del documento del titular."""
+    if not raw:
+        search.index_clients([instance.client_id])
+        phones.index_object('coholder', instance)
+
+
+@receiver(post_delete, sender=CoHolder)
+def unindex_coholder(sender, instance, **kwargs):
+    search.index_clients([instance.client_id])
+    phones.unindex_object('coholder', instance.pk)
+
+
+@receiver(post_save, sender=ClientLead)
+def index_lead_phone(sender, instance, raw=False, **kwargs):
+    if not raw:
+        phones.index_object('lead', instance)
+
+
+@receiver(post_save, sender=ClientEvent)
+def index_event_phone(sender, instance, raw=False, **kwargs):
+    if not raw:
+        phones.index_object('event', instance)
+
+
+@receiver(pre_delete, sender=User)
+def release_owner_rollups(sender, instance, **kwargs):
+    """Los resúmenes del usuario pasan a las filas sin dueño (``SET_NULL`` chocaría con ellas)."""
+    rollups.release_owner(instance.pk)
+
+
+# Campos que se comparan al guardar o borrar con los valores con que se cargó la fila.
+TRACKED_FIELDS = {
+    ClientEvent: ('owner_id',),
+    ClientLead: ('owner_id', 'source', 'name', 'phone'),
+    LeadInterview: ('scheduled_at', 'owner_id'),
+}
+
+
+def _remember(instance, values):
+    """Guarda ``values`` (en el orden de ``TRACKED_FIELDS``) como los valores cargados."""
+    if isinstance(instance, LeadInterview):
+        instance._loaded_slot = _interview_slot(*values)
+        return
+    instance._loaded_owner_id = values[0]
+    if isinstance(instance, ClientLead):
+        instance._loaded_source = values[1]
+        instance._loaded_contact = tuple(values[2:])
+
+
+@receiver(post_init, sender=ClientEvent)
+@receiver(post_init, sender=ClientLead)
+@receiver(post_init, sender=LeadInterview)
+def remember_loaded_values(sender, instance, **kwargs):
+    """Dueño (y fuente o fecha) con los que se cargó la fila, para detectar cambios.
+
+    Con ``.only()``/``.defer()`` leer un campo diferido consultaría la base por
+    cada fila: en ese caso los valores se leen recién antes de guardar o borrar.
+    """
+    fields = TRACKED_FIELDS[sender]
+    instance._loaded_deferred = not instance.get_deferred_fields().isdisjoint(fields)
+    if not instance._loaded_deferred:
+        _remember(instance, [getattr(instance, field) for field in fields])
+
+
+@receiver(pre_save, sender=ClientEvent)
+@receiver(pre_save, sender=ClientLead)
+@receiver(pre_save, sender=LeadInterview)
+@receiver(pre_delete, sender=ClientEvent)
+@receiver(pre_delete, sender=ClientLead)
+@receiver(pre_delete, sender=LeadInterview)
+def load_deferred_values(sender, instance, **kwargs):
+    if not instance._loaded_deferred:
+        return
+    fields = TRACKED_FIELDS[sender]
+    values = sender._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+    _remember(instance, values or [getattr(instance, field) for field in fields])
+    instance._loaded_deferred = False
+
+
+@receiver(post_save, sender=ClientEvent)
+def touch_event_feed(sender, instance, created, raw=False, **kwargs):
+    """El feed del dueño (y del anterior, si se reasignó) cambia de versión."""
+    if not raw:
+        feeds.touch({instance.owner_id, instance._loaded_owner_id})
+        # Para quien sincroniza el calendario del dueño anterior, el evento se borró.
+        if not created and instance._loaded_owner_id not in (None, instance.owner_id):
+            sync.record_deleted(instance.pk, instance._loaded_owner_id)
+        realtime.event_saved(instance, instance._loaded_owner_id)
+    instance._loaded_owner_id = instance.owner_id
+
+
+@receiver(post_delete, sender=ClientEvent)
+def untouch_event_feed(sender, instance, **kwargs):
+    feeds.touch({instance._loaded_owner_id})
+    sync.record_deleted(instance.pk, instance._loaded_owner_id)
+    realtime.event_removed(instance.pk, instance._loaded_owner_id)
+
+
+@receiver(post_save, sender=ClientEvent)
+def remind_late_event(sender, instance, raw=False, **kwargs):
+    """Eventos agendados (o movidos) a último momento: la ventana del worker ya pasó."""
+    if raw:
+        return
+    now = timezone.now()
+    for starts_at in instance.occurrence_starts(now, now + reminders.lead_time() * 2):
+        reminders.enqueue_late('event', instance.pk, instance.owner_id, instance.title, starts_at, instance.lead_id)
+
+
+@receiver(post_save, sender=ClientEventOverride)
+def remind_late_override(sender, instance, raw=False, **kwargs):
+    if not raw and not instance.cancelled and reminders.starts_soon(instance.starts_at):
+        reminders.enqueue_late('event', instance.event_id, instance.event.owner_id, instance.title, instance.starts_at)
+
+
+_changed_series = threading.local()
+
+
+def _flush_changed_series():
+    event_ids = _changed_series.__dict__.pop('ids', None)
+    if not event_ids:
+        return
+    # Si se borró la serie ya no está: su propia señal avisó.
+    events = list(ClientEvent.objects.filter(pk__in=event_ids))
+    feeds.touch({event.owner_id for event in events})
+    sync.touch_series([event.pk for event in events])
+    for event in events:
+        realtime.event_saved(event)
+
+
+@receiver(post_save, sender=ClientEventOverride)
+@receiver(post_delete, sender=ClientEventOverride)
+def touch_override_feed(sender, instance, raw=False, **kwargs):
+    """Un cambio puntual de una repetición también cambia el feed del dueño de la serie.
+
+    Las series se juntan hasta que se confirma la transacción: al borrar una
+    serie sus cambios se borran en cascada y así son una consulta, no una por cambio.
+    """
+    if raw:
+        return
+    _changed_series.__dict__.setdefault('ids', set()).add(instance.event_id)
+    transaction.on_commit(_flush_changed_series)
+
+
+@receiver(post_delete, sender=ClientLead)
+@receiver(post_delete, sender=ClientEvent)
+def unindex_phone(sender, instance, **kwargs):
+    kind = 'lead' if sender is ClientLead else 'event'
+    phones.unindex_object(kind, instance.pk)
+
+
+@receiver(post_delete, sender=ArchivedLead)
+def unindex_archived_lead(sender, instance, **kwargs):
+    phones.unindex_object('archived', instance.pk)
+
+
+@receiver(post_save, sender=ClientLead)
+def track_lead_changes(sender, instance, created, raw=False, **kwargs):
+    """Mantiene los contadores de carga y el resumen diario al crear o reasignar un lead (y avisa en vivo)."""
+    if raw:
+        return
+    old_owner_id, old_source = instance._loaded_owner_id, instance._loaded_source
+    if created:
+        rollups.lead_created(instance)
+        if not getattr(instance, '_load_counted', False):
+            assignment.adjust(instance.owner_id, 1, assigned=1)
+        realtime.leads_created([instance])
+    elif (old_owner_id, old_source) != (instance.owner_id, instance.source):
+        rollups.lead_moved(instance, old_source, old_owner_id)
+        # Un lead convertido ya no cuenta como abierto.
+        if old_owner_id != instance.owner_id and not instance.converted_at:
+            assignment.adjust(old_owner_id, -1)
+            assignment.adjust(instance.owner_id, 1, assigned=1)
+            realtime.lead_assigned(instance, old_owner_id)
+    if not created and instance._loaded_contact != (instance.name, instance.phone):
+        # Las entrevistas del feed muestran el nombre y teléfono del lead.
+        feeds.touch_lead(instance.pk)
+    instance._loaded_owner_id = instance.owner_id
+    instance._loaded_source = instance.source
+    instance._loaded_contact = (instance.name, instance.phone)
+    instance._load_counted = False
+
+
+@receiver(pre_delete, sender=ClientLead)
+def touch_unlinked_events(sender, instance, **kwargs):
+    # Antes del borrado: después el ``SET_NULL`` ya dejó los eventos sin lead.
+    sync.touch_lead_events(instance.pk)
+
+
+@receiver(post_delete, sender=ClientLead)
+def release_lead_load(sender, instance, **kwargs):
+    # Un lead convertido ya se descontó al convertirlo. El resumen diario no
+    # se toca: cuenta llegadas.
+    if not instance.converted_at:
+        assignment.adjust(instance._loaded_owner_id, -1)
+        realtime.leads_removed([instance])
+
+
+@receiver(post_save, sender=ClientLeadNote)
+def push_lead_note(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        lead = instance.lead
+        realtime.note_added(instance, 'lead', lead.owner_id, lead.name or f'Lead {lead.pk}')
+
+
+@receiver(post_save, sender=ClientNote)
+def push_client_note(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.note_added(instance, 'client', instance.client.owner_id, str(instance.client))
+
+
+def _interview_slot(scheduled_at, owner_id):
+    if scheduled_at is None:
+        return None
+    return rollups.local_day(scheduled_at), owner_id
+
+
+@receiver(post_save, sender=LeadInterview)
+def count_interview(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    slot = _interview_slot(instance.scheduled_at, instance.owner_id)
+    previous = None if created else instance._loaded_slot
+    if slot != previous:
+        if previous:
+            rollups.interview_changed(*previous, delta=-1)
+        if slot:
+            rollups.interview_changed(*slot, delta=1)
+    feeds.touch({instance.owner_id, previous[1] if previous else None})
+    reminders.enqueue_late(
+        'interview', instance.pk, instance.owner_id, instance.title, instance.scheduled_at, instance.lead_id,
+    )
+    instance._loaded_slot = slot
+
+
+@receiver(post_delete, sender=LeadInterview)
+def uncount_interview(sender, instance, **kwargs):
+    if instance._loaded_slot:
+        rollups.interview_changed(*instance._loaded_slot, delta=-1)
+        feeds.touch({instance._loaded_slot[1]})
@@ -0,0 +1,178 @@
+"""Sincronización incremental del calendario por API (``GET /api/clientes/calendario/``).
+
+El primer pedido trae los eventos de una ventana de fechas y un token firmado
+(usuario, alcance, ventana y momento del pedido). Con ese token, los pedidos
+siguientes traen solo lo que cambió desde entonces: eventos con
+``updated_at`` posterior (índices ``(owner, updated_at)`` y ``updated_at``)
+y los ids de ``ClientEventTombstone`` (borrados o reasignados a otro dueño).
+Para un vendedor sin cambios son dos consultas por índice que no devuelven
+filas, así que la app puede sondear cada pocos segundos.
+
+Una serie viaja como una sola fila con su regla y sus repeticiones dentro de
+la ventana; cambiar o cancelar una repetición actualiza ``updated_at`` de la
+serie, y borrar un lead el de sus eventos (``SET_NULL`` no pasa por ``save``).
+Lo que se movió fuera de la ventana va en ``deleted``.
+
+``updated_at`` se fija al guardar, antes del commit: cada pedido vuelve a
+mirar ``SYNC_OVERLAP`` hacia atrás para no perder una escritura que confirmó
+tarde. La app puede recibir un evento repetido; siempre reemplaza por id.
+"""
+import datetime
+from dataclasses import dataclass, field
+
+from django.core import signing
+from django.utils import timezone
+
+from . import agenda
+from .models import ClientEvent, ClientEventTombstone
+
+SYNC_PAST_DAYS = 30
+SYNC_FUTURE_DAYS = 180
+MAX_WINDOW_DAYS = 400
+SYNC_OVERLAP = datetime.timedelta(seconds=5)
+# Un token más viejo que esto puede haber perdido borrados: hay que sincronizar de cero.
+TOMBSTONE_DAYS = 30
+TOKEN_SALT = 'clients.calendar-sync'
+
+
+class InvalidToken(Exception):
+    """Token adulterado, de otro usuario o vencido."""
+
+
+@dataclass
+class SyncState:
+    user_id: int
+    # ``None``: todos los eventos (administradores), como en el calendario.
+    owner_id: int
+    low: datetime.datetime
+    high: datetime.datetime
+    position: datetime.datetime = None
+
+    def dumps(self):
+        return signing.dumps(
+            {
+                'u': self.user_id,
+                'o': self.owner_id,
+                'l': int(self.low.timestamp()),
+                'h': int(self.high.timestamp()),
+                'p': self.position.timestamp(),
+            },
+            salt=TOKEN_SALT,
+            compress=True,
+        )
+
+    @classmethod
+    def loads(cls, token, user, owner_id):
+        try:
+            data = signing.loads(token, salt=TOKEN_SALT)
+            state = cls(
+                user_id=data['u'],
+                owner_id=data['o'],
+                low=_from_timestamp(data['l']),
+                high=_from_timestamp(data['h']),
+                position=_from_timestamp(data['p']),
+            )
+        except (signing.BadSignature, KeyError, TypeError, ValueError, OverflowError):
+            raise InvalidToken
+        # Un vendedor que dejó de ser administrador no sigue recibiendo todo.
+        if state.user_id != user.pk or state.owner_id != owner_id:
+            raise InvalidToken
+        if state.position < timezone.now() - datetime.timedelta(days=TOMBSTONE_DAYS):
+            raise InvalidToken
+        return state
+
+
+def _from_timestamp(value):
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+
+def default_window(today=None):
+    today = today or timezone.localdate()
+    return agenda.day_bounds(
+        today - datetime.timedelta(days=SYNC_PAST_DAYS), today + datetime.timedelta(days=SYNC_FUTURE_DAYS),
+    )
+
+
+@dataclass
+class SyncResult:
+    state: SyncState
+    full: bool
+    events: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    occurrences: dict = field(default_factory=dict)
+
+
+def _scoped(queryset, owner_id):
+    return queryset if owner_id is None else queryset.filter(owner_id=owner_id)
+
+
+def _in_window(events, state):
+    """Eventos sueltos que empiezan en la ventana y series con repeticiones en ella."""
+    singles = agenda.single_events(events).filter(starts_at__gte=state.low, starts_at__lt=state.high)
+    series = agenda.active_series(events, state.low, state.high)
+    return list(singles.order_by('starts_at', 'id')), list(series.order_by('starts_at', 'id'))
+
+
+def _series_active(event, state):
+    return event.starts_at < state.high and (event.series_ends_at is None or event.series_ends_at > state.low)
+
+
+def synchronize(user, owner_id, low=None, high=None, token=None):
+    """Eventos de la ventana (sin token) o cambios desde el token.
+
+    ``InvalidToken`` si el token no sirve: la app debe pedir de nuevo sin token.
+    """
+    now = timezone.now()
+    if token:
+        state = SyncState.loads(token, user, owner_id)
+    else:
+        state = SyncState(user.pk, owner_id, low, high)
+    events = _scoped(ClientEvent.objects.all(), owner_id)
+    result = SyncResult(state=state, full=not token)
+    if token:
+        since = state.position - SYNC_OVERLAP
+        # Sin ORDER BY (ni el del modelo): el motor usaría el índice de ``starts_at`` y recorrería la tabla.
+        changed = sorted(
+            events.filter(updated_at__gt=since).order_by(), key=lambda event: (event.starts_at, event.id),
+        )
+        singles, series = [], []
+        for event in changed:
+            if event.is_recurring and _series_active(event, state):
+                series.append(event)
+            elif not event.is_recurring and state.low <= event.starts_at < state.high:
+                singles.append(event)
+            else:
+                result.deleted.append(event.pk)
+        tombstones = _scoped(ClientEventTombstone.objects.filter(deleted_at__gt=since), owner_id)
+        # Reasignado a otro y devuelto: si volvió a cambiar, gana el evento.
+        kept = {event.pk for event in changed}
+        result.deleted += [
+            event_id for event_id in tombstones.values_list('event_id', flat=True).distinct() if event_id not in kept
+        ]
+        result.deleted = sorted(set(result.deleted))
+    else:
+        singles, series = _in_window(events, state)
+        ClientEventTombstone.objects.filter(deleted_at__lt=now - datetime.timedelta(days=TOMBSTONE_DAYS)).delete()
+    if series:
+        overrides = agenda.overrides_for(series, state.low, state.high)
+        for item in agenda.expand(series, state.low, state.high, overrides):
+            result.occurrences.setdefault(item.id, []).append(item)
+    result.events = singles + series
+    state.position = now
+    return result
+
+
+def record_deleted(event_id, owner_id):
+    """Lápida para los que sincronizan el calendario de ``owner_id``."""
+    ClientEventTombstone.objects.create(event_id=event_id, owner_id=owner_id)
+
+
+def touch_lead_events(lead_id):
+    """El lead se va a borrar: sus eventos pierden el vínculo y entran en el próximo delta."""
+    ClientEvent.objects.filter(lead_id=lead_id).update(updated_at=timezone.now())
+
+
+def touch_series(event_ids):
+    """Una repetición cambió: la serie entra en el próximo delta."""
+    ClientEvent.objects.filter(pk__in=event_ids).update(updated_at=timezone.now())
+
@@ -0,0 +1,722 @@
+import datetime
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.users.models import UserProfile
+from . import (
+    agenda, archive, assignment, conversion, feeds, importer, ingest, phones, realtime, reminders, rollups, search,
+    sync,
+)
+from .api import LeadIngestThrottle
+from .forms import ClientEventForm, ClientLeadForm
+from .models import (
+    EVENT_MAX_MINUTES, RECURRENCE_MONTHLY, RECURRENCE_WEEKLY, ArchivedLead, CalendarFeed, Client, ClientEvent,
+    ClientEventOverride, ClientLead, ClientLeadNote, ClientNote, CoHolder, DuplicateCandidate, EventReminder,
+    InterviewDailyStat, LeadDailyStat, LeadInterview, LeadLoad, PhoneIndexEntry,
+)
+
+
+def make_client(**fields):
+    """Cliente con lo mínimo que pide la base (sin pasar por el formulario)."""
+    return Client.objects.create(**{'doc_type': 'DNI', 'sex': 'M', 'nationality': 'Argentina', **fields})
+
+
+class ClientSearchTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_ADMIN)
+        self.vendor = User.objects.create_user('vendedor', password='x')
+
+    def found(self, query, user=None):
+        self.client.force_login(user or self.admin)
+        response = self.client.get(reverse('client_list'), {'q': query})
+        return {client.pk for client in response.context['clients']}
+
+    def test_accents_and_case_are_folded(self):
+        munoz = make_client(first_name='José', last_name='Muñoz')
+        self.assertEqual(self.found('munoz jose'), {munoz.pk})
+        self.assertEqual(self.found('MUÑOZ'), {munoz.pk})
+
+    def test_every_term_matches_as_a_prefix(self):
+        both = make_client(first_name='Martín', last_name='González')
+        make_client(first_name='Martina', last_name='Pérez')
+        self.assertEqual(self.found('gonz mart'), {both.pk})
+        self.assertEqual(len(self.found('mart')), 2)
+
+    def test_fragments_inside_numbers(self):
+        client = make_client(last_name='Díaz', cuit='20123456789', doc_number='12345678', phone='1145678901')
+        self.assertEqual(self.found('4567'), {client.pk})
+        self.assertEqual(self.found('23456789'), {client.pk})
+        # Solo sufijos de al menos ``SUFFIX_DIGITS`` cifras, sin repetir los números ya cargados así.
+        self.assertEqual(search.build_document(client).split(), [
+            'diaz', '20123456789', '12345678', '1145678901', '0123456789', '123456789', '23456789', '145678901',
+            '45678901',
+        ])
+
+    def test_vendors_only_find_their_own_clients(self):
+        own = make_client(last_name='Pérez', owner=self.vendor)
+        other = make_client(last_name='Pérez', owner=self.admin)
+        self.assertEqual(self.found('perez', user=self.vendor), {own.pk})
+        self.assertEqual(self.found('perez'), {own.pk, other.pk})
+
+
+class ClientImportTests(TestCase):
+    HEADER = ';'.join(['full_name', *importer.IMPORT_FIELDS])
+
+    def row(self, name, cuit, phone='11 4444-1111', email='ana@example.com', city='Rosario'):
+        return ';'.join([
+            name, 'DNI', '12345678', '01/02/1980', 'F', 'Soltero', 'Argentina', 'cf', cuit, 'San Martín',
+            '100', '', '', '2000', city, 'Santa Fe', phone, email, '',
+        ])
+
+    def run_import(self, *rows, **kwargs):
+        data = '\n'.join([self.HEADER, *rows]).encode('utf-8')
+        return importer.import_clients(io.BytesIO(data), 'clientes.csv', **kwargs)
+
+    def test_upserts_by_normalized_cuit(self):
+        vendor = User.objects.create_user('vendedor', password='x')
+        existing = make_client(last_name='Vieja', cuit='20123456786', phone='11 1111-1111', owner=vendor)
+        result = self.run_import(
+            self.row('Ana Gómez', '20-12345678-6', phone='11 4444-1111'),
+            self.row('Luis Díaz', '27-33333333-9', phone='11 5555-2222'),
+        )
+        self.assertEqual((result.valid, result.created, result.updated, result.errors), (2, 1, 1, []))
+        existing.refresh_from_db()
+        self.assertEqual((existing.first_name, existing.phone, existing.owner_id), ('Ana', '11 4444-1111', vendor.pk))
+        self.assertEqual(Client.objects.get(cuit='27333333339').last_name, 'Díaz')
+        # Los índices se actualizan aunque ``bulk_*`` no dispare señales.
+        self.assertEqual([entry.client_id for entry in phones.lookup('4444-1111')], [existing.pk])
+
+    def test_invalid_rows_are_reported_by_line_and_skipped(self):
+        result = self.run_import(
+            self.row('Ana Gómez', '20-12345678-6'),
+            self.row('Mal Cuit', '20-12345678-0'),
+            self.row('Mal Correo', '20-44444444-5', email='no-es-un-correo'),
+            self.row('Ciudad Larga', '27-33333333-9', city='x' * 101),
+        )
+        self.assertEqual((result.valid, result.created), (1, 1))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5])
+        self.assertIn('cuit: CUIT/CUIL inválido (dígito verificador).', result.errors[0][1])
+        self.assertTrue(result.errors[1][1][0].startswith('email:'))
+        self.assertEqual(result.errors[2][1], ['city: máximo 100 caracteres (tiene 101).'])
+        self.assertEqual(list(Client.objects.values_list('cuit', flat=True)), ['20123456786'])
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import(self.row('Ana Gómez', '20-12345678-6'), dry_run=True)
+        self.assertEqual((result.valid, result.created), (1, 0))
+        self.assertFalse(Client.objects.exists())
+
+
+class DuplicateCheckTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.existing = make_client(
+            first_name='Ana', last_name='Gómez', cuit='20123456786', doc_number='12345678', phone='11 4444-1111',
+            owner=self.vendor,
+        )
+        self.client.force_login(self.vendor)
+
+    def form_data(self, **fields):
+        return {
+            'full_name': 'Luis Díaz', 'doc_type': 'DNI', 'doc_number': '33333333', 'birth_date': '1980-02-01',
+            'sex': 'M', 'marital_status': 'soltero', 'nationality': 'Argentina', 'tax_condition': 'cf',
+            'cuit': '27333333339', 'street': 'San Martín', 'street_number': '100', 'postal_code': '2000',
+            'city': 'Rosario', 'province': 'Santa Fe', 'phone': '11 5555-2222', 'email': 'luis@example.com',
+            **fields,
+        }
+
+    def edit(self, client, **fields):
+        """Avisos de guardar la edición (se sigue la redirección: los mensajes quedan leídos)."""
+        response = self.client.post(reverse('client_edit', args=[client.pk]), self.form_data(**fields), follow=True)
+        self.assertEqual(response.redirect_chain, [(reverse('client_detail', args=[client.pk]), 302)])
+        return [str(message) for message in response.context['messages'] if message.level_tag == 'warning']
+
+    def pairs(self):
+        return list(DuplicateCandidate.objects.values_list('client_a_id', 'client_b_id', 'dismissed'))
+
+    def test_create_is_blocked_until_confirmed(self):
+        data = self.form_data(phone='+54 9 11 4444-1111')
+        response = self.client.post(reverse('client_create'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Posible duplicado: 1 cliente(s) existente(s)', str(response.context['client_form'].errors))
+        self.assertEqual(Client.objects.count(), 1)
+
+        response = self.client.post(reverse('client_create'), {**data, 'confirm_duplicate': 'on'})
+        created = Client.objects.exclude(pk=self.existing.pk).get()
+        self.assertRedirects(response, reverse('client_detail', args=[created.pk]), fetch_redirect_response=False)
+        self.assertEqual(self.pairs(), [(self.existing.pk, created.pk, True)])
+
+    def test_edit_saves_warns_and_records_the_pair_once(self):
+        other = make_client(first_name='Luis', last_name='Díaz', cuit='27333333339', owner=self.vendor)
+        self.assertEqual(len(self.edit(other, doc_number='12345678')), 1)
+        self.assertEqual(self.pairs(), [(self.existing.pk, other.pk, False)])
+        # Ya registrado: no se vuelve a avisar.
+        self.assertEqual(self.edit(other, doc_number='12345678'), [])
+
+    def test_confirmed_pairs_are_dismissed_and_stay_quiet(self):
+        other = make_client(first_name='Luis', last_name='Díaz', cuit='27333333339', owner=self.vendor)
+        self.edit(other, doc_number='12345678')
+        self.assertEqual(self.edit(other, doc_number='12345678', confirm_duplicate='on'), [])
+        # El par pendiente pasa a descartado.
+        self.assertEqual(self.pairs(), [(self.existing.pk, other.pk, True)])
+        self.assertEqual(self.edit(other, doc_number='12345678', phone='11 4444-1111'), [])
+        self.assertEqual(self.pairs(), [(self.existing.pk, other.pk, True)])
+
+
+class PhoneLookupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_ADMIN)
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.customer = make_client(first_name='Ana', last_name='Gómez', phone='011 15 4444-1111', owner=self.admin)
+        self.lead = ClientLead.objects.create(name='Luis', phone='+54 9 11 4444-1111', owner=self.vendor)
+        ClientEvent.objects.create(
+            owner=self.admin, title='Visita', starts_at=timezone.now(), lead_name='Luis', lead_phone='4444-1111',
+        )
+        # Comparte solo los últimos 7 dígitos.
+        ClientLead.objects.create(name='Otro', phone='11 5444-1111', owner=self.vendor)
+
+    def lookup(self, number, user=None):
+        self.client.force_login(user or self.admin)
+        response = self.client.get(reverse('client_phone_lookup'), {'numero': number})
+        return sorted((item['kind'], item['label']) for item in response.json()['results'])
+
+    def test_any_prefix_matches_the_last_eight_digits(self):
+        expected = [('client', 'Gómez, Ana'), ('event', 'Luis'), ('lead', 'Luis')]
+        for number in ('+54 9 11 4444-1111', '011 4444-1111', '15 4444-1111', '1144441111', '4444-1111'):
+            self.assertEqual(self.lookup(number), expected, number)
+        self.assertEqual(self.lookup('11 4444-1112'), [])
+        self.assertEqual(self.lookup('111'), [])
+
+    def test_vendors_only_see_their_own_entries(self):
+        self.assertEqual(self.lookup('4444-1111', user=self.vendor), [('lead', 'Luis')])
+
+    def test_coholder_entry_follows_the_client(self):
+        CoHolder.objects.create(
+            client=self.customer, full_name='María López', sex='F', dni='22222222',
+            birth_date=datetime.date(1980, 1, 1), nationality='Argentina', phone='11 5555-2222',
+            email='maria@example.com',
+        )
+        self.assertEqual(self.lookup('5555-2222', user=self.vendor), [])
+        self.customer.owner = self.vendor
+        self.customer.last_name = 'Gómez Paz'
+        self.customer.save()
+        self.assertEqual(
+            self.lookup('5555-2222', user=self.vendor), [('coholder', 'María López (cotitular de Gómez Paz, Ana)')],
+        )
+
+
+class LeadIngestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.api = APIClient()
+        self.api.force_authenticate(self.vendor)
+        self.url = reverse('api_lead_ingest')
+
+    def post(self, leads):
+        return self.api.post(self.url, leads, format='json')
+
+    def statuses(self, response):
+        return [item['status'] for item in response.json()['results']]
+
+    def test_creates_leads_for_the_sender(self):
+        response = self.post([
+            {'name': 'Ana', 'phone': '11 4444-1111', 'source': 'Facebook'},
+            {'name': 'Luis', 'phone': '11 4444-2222', 'source': 'Google'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.statuses(response), [ingest.STATUS_CREATED, ingest.STATUS_CREATED])
+        self.assertEqual(ClientLead.objects.filter(owner=self.vendor).count(), 2)
+
+    def test_duplicate_phone_in_base_and_in_batch(self):
+        self.post([{'name': 'Ana', 'phone': '+54 9 11 4444-1111'}])
+        response = self.post([
+            {'name': 'Ana otra vez', 'phone': '011 4444-1111'},
+            {'name': 'Luis', 'phone': '11 5555-2222'},
+            {'name': 'Luis repetido', 'phone': '5555-2222'},
+        ])
+        self.assertEqual(
+            self.statuses(response),
+            [ingest.STATUS_DUPLICATE, ingest.STATUS_CREATED, ingest.STATUS_DUPLICATE],
+        )
+        results = response.json()['results']
+        self.assertEqual(results[2]['id'], results[1]['id'])
+        self.assertEqual(ClientLead.objects.count(), 2)
+
+    def test_invalid_items_keep_their_position(self):
+        response = self.post([{'source': 'Facebook'}, 'no es un objeto', {'name': 'Ana'}])
+        self.assertEqual(
+            self.statuses(response),
+            [ingest.STATUS_INVALID, ingest.STATUS_INVALID, ingest.STATUS_CREATED],
+        )
+        self.assertEqual(response.json()['summary'], {'created': 1, 'duplicate': 0, 'invalid': 2})
+        self.assertEqual(self.post({'leads': 'x'}).status_code, 400)
+
+    def test_idempotency_key_makes_resends_duplicates(self):
+        first = self.post([{'name': 'Ana', 'idempotency_key': 'fb-1'}])
+        again = self.post([{'name': 'Ana (reenvío)', 'idempotency_key': 'fb-1'}])
+        self.assertEqual(self.statuses(again), [ingest.STATUS_DUPLICATE])
+        self.assertEqual(again.json()['results'][0]['id'], first.json()['results'][0]['id'])
+        self.assertEqual(ClientLead.objects.count(), 1)
+
+    def test_batches_are_throttled_per_user(self):
+        with mock.patch.object(LeadIngestThrottle, 'THROTTLE_RATES', {'lead_ingest': '2/min'}):
+            codes = [self.post([{'name': f'Lead {n}'}]).status_code for n in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+
+    def test_requires_authentication(self):
+        self.assertIn(APIClient().post(self.url, [], format='json').status_code, (401, 403))
+
+
+class ReplayLeadsTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w', encoding='utf-8') as fileobj:
+            for n in range(5):
+                fileobj.write(json.dumps({'name': f'Lead {n}', 'phone': f'11 4000-000{n}', 'idempotency_key': f'k{n}'}))
+                fileobj.write('\n')
+            fileobj.write('{roto\n')
+            fileobj.write(json.dumps({'source': 'sin datos'}) + '\n')
+        self.addCleanup(os.remove, self.path)
+
+    def replay(self):
+        out, err = StringIO(), StringIO()
+        call_command('replay_leads', self.path, user='vendedor', batch_size=2, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_replay_inserts_in_process_and_is_idempotent(self):
+        out, err = self.replay()
+        self.assertIn('Creados: 5', out)
+        self.assertIn('Inválidos: 1', out)
+        self.assertIn('Línea 6', err)
+        self.assertEqual(ClientLead.objects.filter(owner=self.vendor).count(), 5)
+
+        out, _ = self.replay()
+        self.assertIn('Creados: 0', out)
+        self.assertIn('Duplicados: 5', out)
+        self.assertEqual(ClientLead.objects.count(), 5)
+
+
+class LeadAssignmentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('supervisor', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_SUPERVISOR)
+        self.vendor = User.objects.create_user('vendedor', password='x')
+
+    def open_leads(self, user):
+        return LeadLoad.objects.get(owner=user).open_leads
+
+    def test_form_without_sellers_falls_back_to_the_requester(self):
+        UserProfile.objects.filter(user=self.vendor).update(role=UserProfile.ROLE_MARKETING)
+        form = ClientLeadForm({'name': 'Ana', 'phone': '', 'source': ''}, user=User.objects.get(pk=self.admin.pk))
+        self.assertTrue(form.is_valid(), form.errors)
+        lead = form.save()
+        self.assertEqual(lead.owner_id, self.admin.pk)
+        self.assertEqual(self.open_leads(self.admin), 1)
+
+    def test_deferred_querysets_do_not_load_each_owner(self):
+        for n in range(5):
+            ClientLead.objects.create(name=f'Lead {n}', owner=self.vendor)
+        with self.assertNumQueries(1):
+            names = [lead.name for lead in ClientLead.objects.only('id', 'name')]
+        self.assertEqual(len(names), 5)
+
+    def test_reassigning_a_deferred_lead_moves_its_load(self):
+        ClientLead.objects.create(name='Ana', owner=self.vendor)
+        lead = ClientLead.objects.only('id', 'name').get()
+        lead.owner = self.admin
+        lead.save()
+        self.assertEqual(self.open_leads(self.vendor), 0)
+        self.assertEqual(self.open_leads(self.admin), 1)
+        self.assertEqual(assignment.candidates(), {self.vendor.pk: UserProfile.ROLE_VENDOR})
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def test_unowned_leads_share_one_row_per_day_and_source(self):
+        rollups.count_leads([(self.today, 'Facebook', None)] * 2)
+        rollups.count_leads([(self.today, 'Facebook', None)])
+        rollups.interview_changed(self.today, None)
+        rollups.interview_changed(self.today, None)
+        self.assertEqual(list(LeadDailyStat.objects.values_list('leads', flat=True)), [3])
+        self.assertEqual(list(InterviewDailyStat.objects.values_list('interviews', flat=True)), [2])
+
+    def test_deleting_a_user_folds_its_rows_into_the_unowned_bucket(self):
+        vendor = User.objects.create_user('vendedor', password='x')
+        rollups.count_leads([(self.today, 'Facebook', None), (self.today, 'Facebook', vendor.pk)])
+        rollups.interview_changed(self.today, vendor.pk)
+        rollups.interview_changed(self.today, None)
+        vendor.delete()
+        self.assertEqual(list(LeadDailyStat.objects.values_list('owner_id', 'leads')), [(None, 2)])
+        self.assertEqual(list(InterviewDailyStat.objects.values_list('owner_id', 'interviews')), [(None, 2)])
+
+    def test_reconcile_counts_archived_leads(self):
+        ClientLead.objects.create(name='Ana', source='Facebook')
+        ArchivedLead.objects.create(
+            lead_id=999, name='Luis', source='Facebook', created_at=timezone.now(), segment='s', line=1,
+        )
+        LeadDailyStat.objects.all().delete()
+        rollups.reconcile_leads(self.today - datetime.timedelta(days=1), self.today)
+        self.assertEqual(list(LeadDailyStat.objects.values_list('source', 'owner_id', 'leads')), [('Facebook', None, 2)])
+
+    def test_reconcile_counts_interviews_of_archived_leads(self):
+        vendor = User.objects.create_user('vendedor', password='x')
+        when = timezone.now() - datetime.timedelta(days=200)
+        lead = ClientLead.objects.create(name='Luis', source='Facebook', owner=vendor)
+        ClientLead.objects.filter(pk=lead.pk).update(created_at=when - datetime.timedelta(days=1))
+        LeadInterview.objects.create(lead=lead, owner=vendor, title='Entrevista', scheduled_at=when)
+        with tempfile.TemporaryDirectory() as directory, self.settings(LEAD_ARCHIVE_DIR=directory):
+            self.assertEqual(archive.archive_leads(archive.cutoff_for(180))[0], 1)
+        self.assertFalse(LeadInterview.objects.exists())
+        day = timezone.localdate(when)
+        InterviewDailyStat.objects.all().delete()
+        rollups.reconcile_interviews(day, day)
+        self.assertEqual(
+            list(InterviewDailyStat.objects.values_list('day', 'owner_id', 'interviews')), [(day, vendor.pk, 1)],
+        )
+
+
+class LeadConversionTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.other = User.objects.create_user('otro', password='x')
+        self.written = timezone.now() - datetime.timedelta(days=3)
+        self.leads = []
+        for name, phone in (('Ana Gómez', '11 4444-1111'), ('Luis Díaz', '11 5555-2222')):
+            lead = ClientLead.objects.create(name=name, phone=phone, owner=self.vendor)
+            for content in ('Primera llamada', 'Pide financiación'):
+                ClientLeadNote.objects.create(lead=lead, author=self.vendor, content=f'{content} ({name})')
+            ClientEvent.objects.create(
+                lead=lead, owner=self.vendor, title='Visita', starts_at=timezone.now() + datetime.timedelta(days=1),
+                lead_name=name, lead_phone=phone,
+            )
+            self.leads.append(lead)
+        ClientLeadNote.objects.update(created_at=self.written)
+        self.foreign = ClientLead.objects.create(name='Otro', phone='11 6666-3333', owner=self.other)
+
+    def test_selected_leads_become_clients_with_their_history(self):
+        self.client.force_login(self.vendor)
+        selected = [lead.pk for lead in self.leads] + [self.foreign.pk]
+        self.client.post(reverse('client_leads_convert'), {'lead_ids': selected})
+        for lead in self.leads:
+            lead.refresh_from_db()
+            self.assertIsNotNone(lead.converted_at)
+            client = lead.client
+            self.assertEqual((client.owner_id, client.phone), (self.vendor.pk, lead.phone))
+            self.assertEqual(
+                sorted(client.notes.values_list('author_id', 'content', 'created_at')),
+                [(self.vendor.pk, f'{content} ({lead.name})', self.written)
+                 for content in ('Pide financiación', 'Primera llamada')],
+            )
+            self.assertEqual(
+                list(ClientEvent.objects.filter(lead=lead).values_list('client_id', 'lead_name', 'lead_phone')),
+                [(client.pk, '', '')],
+            )
+            self.assertEqual(PhoneIndexEntry.objects.get(kind='lead', object_id=lead.pk).client_id, client.pk)
+            self.assertFalse(PhoneIndexEntry.objects.filter(kind='event', lead_id=lead.pk).exists())
+        self.assertFalse(ClientLeadNote.objects.filter(lead__in=self.leads).exists())
+        # El lead de otro vendedor no se toca.
+        self.foreign.refresh_from_db()
+        self.assertIsNone(self.foreign.converted_at)
+        self.assertEqual(
+            dict(LeadLoad.objects.values_list('owner_id', 'open_leads')), {self.vendor.pk: 0, self.other.pk: 1},
+        )
+        inbox = self.client.get(reverse('client_lead_inbox'))
+        self.assertEqual(list(inbox.context['leads']), [])
+
+    def test_converting_twice_does_nothing(self):
+        self.assertEqual(len(conversion.convert_leads(ClientLead.objects.filter(owner=self.vendor))), 2)
+        self.assertEqual(conversion.convert_leads(ClientLead.objects.filter(owner=self.vendor)), {})
+        self.assertEqual(Client.objects.count(), 2)
+        self.assertEqual(ClientNote.objects.count(), 4)
+
+
+class LeadArchiveTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive_dir = self.settings(LEAD_ARCHIVE_DIR=directory.name)
+        archive_dir.enable()
+        self.addCleanup(archive_dir.disable)
+        self.admin = User.objects.create_user('admin', password='x')
+        UserProfile.objects.filter(user=self.admin).update(role=UserProfile.ROLE_ADMIN)
+        old = timezone.now() - datetime.timedelta(days=200)
+        self.lead = ClientLead.objects.create(
+            name='Luis', phone='11 4444-1111', source='Facebook', owner=self.admin, idempotency_key='fb-1',
+        )
+        ClientLeadNote.objects.create(lead=self.lead, author=self.admin, content='Llamar de nuevo')
+        LeadInterview.objects.create(lead=self.lead, owner=self.admin, title='Primera visita', scheduled_at=old)
+        ClientLead.objects.update(created_at=old)
+        ClientLeadNote.objects.update(created_at=old)
+        # Un lead reciente no se archiva.
+        ClientLead.objects.create(name='Ana', phone='11 5555-2222')
+        self.assertEqual(archive.archive_leads(archive.cutoff_for(180))[0], 1)
+
+    def test_archived_lead_moves_to_segment_and_phone_index(self):
+        self.assertEqual(list(ClientLead.objects.values_list('name', flat=True)), ['Ana'])
+        self.assertFalse(ClientLeadNote.objects.exists())
+        self.assertFalse(LeadInterview.objects.exists())
+        archived = ArchivedLead.objects.get()
+        self.assertEqual(
+            (archived.lead_id, archived.owner_id, archived.idempotency_key), (self.lead.pk, self.admin.pk, 'fb-1'),
+        )
+        self.assertEqual(
+            list(PhoneIndexEntry.objects.filter(object_id=self.lead.pk).values_list('kind', flat=True)), ['archived'],
+        )
+        record = archive.read_record(archived)
+        self.assertEqual([note['content'] for note in record['notes']], ['Llamar de nuevo'])
+        self.assertEqual([interview['title'] for interview in record['interviews']], ['Primera visita'])
+
+    def test_lookup_links_to_the_archived_page(self):
+        self.client.force_login(self.admin)
+        results = self.client.get(reverse('client_phone_lookup'), {'numero': '+54 9 11 4444-1111'}).json()['results']
+        url = reverse('archived_lead_detail', args=[self.lead.pk])
+        self.assertEqual([(item['kind'], item['url']) for item in results], [('archived', url)])
+        response = self.client.get(url)
+        self.assertContains(response, 'Llamar de nuevo')
+        self.assertContains(response, 'Primera visita')
+        self.assertContains(response, 'admin')
+
+    def test_other_vendors_cannot_open_it(self):
+        self.client.force_login(User.objects.create_user('vendedor', password='x'))
+        response = self.client.get(reverse('archived_lead_detail', args=[self.lead.pk]))
+        self.assertRedirects(response, reverse('client_list'), fetch_redirect_response=False)
+
+    def test_resend_is_a_duplicate_but_a_new_inquiry_is_a_new_lead(self):
+        results = ingest.ingest_leads([
+            {'name': 'Luis (reenvío)', 'idempotency_key': 'fb-1'},
+            {'name': 'Luis otra vez', 'phone': '011 4444-1111'},
+        ], owner=self.admin).items
+        self.assertEqual(
+            [(item['status'], item['id'] == self.lead.pk) for item in results],
+            [(ingest.STATUS_DUPLICATE, True), (ingest.STATUS_CREATED, False)],
+        )
+
+
+def local(*args):
+    return timezone.make_aware(datetime.datetime(*args))
+
+
+class EventOverlapTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.other = User.objects.create_user('otro', password='x')
+        # Lunes 1/3/2027: el evento más largo posible, de 8 a 16.
+        self.long = ClientEvent.objects.create(
+            owner=self.vendor, title='Entrega', starts_at=local(2027, 3, 1, 8), duration_minutes=EVENT_MAX_MINUTES,
+        )
+
+    def form(self, time, **extra):
+        data = {'title': 'Visita', 'start_date': '01/03/2027', 'start_time': time, 'duration_minutes': 60, **extra}
+        return ClientEventForm(data, user=self.vendor)
+
+    def test_an_event_that_started_hours_earlier_still_overlaps(self):
+        form = self.form('15:30')
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.conflicts, [self.long])
+        self.assertIn('Se superpone con: Entrega (01/03 08:00-16:00).', form.non_field_errors()[0])
+        self.assertTrue(self.form('16:00').is_valid())
+        self.assertTrue(self.form('07:00').is_valid())
+
+    def test_agendar_igual_saves_the_overlapping_event(self):
+        form = self.form('12:00', confirm_overlap='on')
+        self.assertTrue(form.is_valid(), form.errors)
+        event = form.save()
+        self.assertEqual((event.owner, event.starts_at), (self.vendor, local(2027, 3, 1, 12)))
+        self.assertEqual(ClientEvent.objects.count(), 2)
+
+    def test_free_slots_skip_busy_time_and_days_off(self):
+        ClientEvent.objects.create(
+            owner=self.vendor, title='Tasación', starts_at=local(2027, 3, 6, 9), duration_minutes=180,
+        )
+        ClientEvent.objects.create(owner=self.other, title='Llamada', starts_at=local(2027, 3, 6, 9))
+        ClientEvent.objects.create(
+            owner=self.other, title='Reunión', starts_at=local(2027, 3, 1, 9), recurrence=RECURRENCE_WEEKLY,
+        )
+        owners = [self.other.pk, self.vendor.pk]
+
+        def slots(start, limit):
+            found = agenda.free_slots(owners, start, 60, limit=limit)
+            return [(slot.starts_at, slot.owner_id) for slot in found]
+
+        vendor, other = self.vendor.pk, self.other.pk
+        self.assertEqual(slots(local(2027, 3, 6, 8), 6), [
+            (local(2027, 3, 6, 10), other), (local(2027, 3, 6, 10, 30), other), (local(2027, 3, 6, 11), other),
+            (local(2027, 3, 6, 11, 30), other), (local(2027, 3, 6, 12), vendor), (local(2027, 3, 6, 12), other),
+        ])
+        # El sábado a las 18:30 ya no entra una hora; el domingo no se trabaja y el lunes la serie ocupa las 9.
+        self.assertEqual(slots(local(2027, 3, 6, 18), 6), [
+            (local(2027, 3, 6, 18), vendor), (local(2027, 3, 6, 18), other), (local(2027, 3, 8, 9), vendor),
+            (local(2027, 3, 8, 9, 30), vendor), (local(2027, 3, 8, 10), vendor), (local(2027, 3, 8, 10), other),
+        ])
+
+
+class CalendarFeedTests(TestCase):
+    def test_renaming_a_lead_changes_the_feed_of_its_interviews(self):
+        vendor = User.objects.create_user('vendedor', password='x')
+        feed = feeds.feed_for(vendor)
+        lead = ClientLead.objects.create(name='Ana', phone='1144441111', owner=vendor)
+        LeadInterview.objects.create(lead=lead, owner=vendor, title='Entrevista', scheduled_at=timezone.now())
+        before = CalendarFeed.objects.get(pk=feed.pk).version
+        self.assertIn('Ana - 1144441111', feeds.render(feed))
+
+        lead.source = 'Facebook'
+        lead.save()
+        self.assertEqual(CalendarFeed.objects.get(pk=feed.pk).version, before)
+        lead.name = 'Ana María'
+        lead.save()
+        feed.refresh_from_db()
+        self.assertEqual(feed.version, before + 1)
+        self.assertIn('Ana María - 1144441111', feeds.render(feed))
+
+
+@override_settings(TIME_ZONE='America/New_York')
+class RecurringFeedTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.feed = feeds.feed_for(self.vendor)
+
+    def series(self, starts_at, recurrence, **kwargs):
+        return ClientEvent.objects.create(
+            owner=self.vendor, title='Serie', starts_at=timezone.make_aware(starts_at), recurrence=recurrence, **kwargs,
+        )
+
+    def test_series_use_local_time_with_a_vtimezone(self):
+        # 21:30 del 31 en Nueva York ya es el día 1 en UTC.
+        self.series(datetime.datetime(2026, 1, 31, 21, 30), RECURRENCE_MONTHLY, recurrence_count=6)
+        body = feeds.render(self.feed, day=datetime.date(2026, 2, 1))
+        self.assertIn('DTSTART;TZID=America/New_York:20260131T213000', body)
+        self.assertIn('BYMONTHDAY=28,29,30,31;BYSETPOS=-1', body)
+        self.assertIn('BEGIN:VTIMEZONE\r\nTZID:America/New_York', body)
+        self.assertIn('BEGIN:DAYLIGHT\r\nDTSTART:20260308T020000\r\nTZOFFSETFROM:-0500\r\nTZOFFSETTO:-0400', body)
+        self.assertIn('BEGIN:STANDARD\r\nDTSTART:20261101T020000\r\nTZOFFSETFROM:-0400\r\nTZOFFSETTO:-0500', body)
+
+    def test_exceptions_match_the_local_start(self):
+        event = self.series(datetime.datetime(2026, 3, 2, 9, 0), RECURRENCE_WEEKLY, recurrence_count=4)
+        original = timezone.make_aware(datetime.datetime(2026, 3, 9, 9, 0))
+        ClientEventOverride.objects.create(
+            event=event, original_start=original, cancelled=True, title=event.title, starts_at=original,
+        )
+        body = feeds.render(self.feed, day=datetime.date(2026, 3, 1))
+        self.assertIn('EXDATE;TZID=America/New_York:20260309T090000', body)
+
+    def test_deleting_a_series_touches_once_for_all_its_overrides(self):
+        event = self.series(datetime.datetime(2026, 3, 2, 9, 0), RECURRENCE_WEEKLY, recurrence_count=10)
+        for week in range(1, 6):
+            original = event.starts_at + datetime.timedelta(weeks=week)
+            ClientEventOverride.objects.create(
+                event=event, original_start=original, cancelled=True, title=event.title, starts_at=original,
+            )
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            event.delete()
+        lookups = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "clients_clientevent"' in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+
+
+class RecordingBackend:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    def send(self, digests):
+        if self.fail:
+            raise OSError('SMTP caído')
+        self.sent += [(digest.owner.username, reminder.title, reminder.starts_at) for digest in digests
+                      for reminder in digest.reminders]
+
+
+class ReminderRetryTests(TestCase):
+    def setUp(self):
+        self.vendor = User.objects.create_user('vendedor', password='x')
+        self.other = User.objects.create_user('otro', password='x')
+        self.now = timezone.now().replace(microsecond=0)
+        self.event = ClientEvent.objects.create(
+            owner=self.vendor, title='Prueba de manejo', starts_at=self.now + datetime.timedelta(minutes=20),
+        )
+        reminders.run_once(backend=RecordingBackend(fail=True), now=self.now)
+        self.assertEqual(EventReminder.objects.get().attempts, 1)
+
+    def retry(self):
+        backend = RecordingBackend()
+        reminders.run_once(backend=backend, now=self.now + reminders.RETRY_AFTER + datetime.timedelta(seconds=1))
+        return backend.sent
+
+    def test_deleted_event_is_not_sent(self):
+        self.event.delete()
+        self.assertEqual(self.retry(), [])
+        self.assertFalse(EventReminder.objects.exists())
+
+    def test_rescheduled_event_is_not_sent_for_the_old_start(self):
+        old_start = self.event.starts_at
+        self.event.starts_at += datetime.timedelta(days=1)
+        self.event.save()
+        self.assertNotIn(old_start, [starts_at for _, _, starts_at in self.retry()])
+        self.assertFalse(EventReminder.objects.filter(starts_at=old_start).exists())
+
+    def test_reassigned_event_goes_to_the_new_owner(self):
+        self.event.owner = self.other
+        self.event.title = 'Entrega'
+        self.event.save()
+        self.assertEqual(self.retry(), [('otro', 'Entrega', self.event.starts_at)])
+
+
+class CalendarSyncTests(TestCase):
+    def test_deleting_a_lead_sends_its_events_in_the_next_delta(self):
+        vendor = User.objects.create_user('vendedor', password='x')
+        lead = ClientLead.objects.create(name='Ana', owner=vendor)
+        event = ClientEvent.objects.create(
+            owner=vendor, lead=lead, title='Entrevista', starts_at=timezone.now() + datetime.timedelta(days=1),
+        )
+        ClientEvent.objects.filter(pk=event.pk).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        low, high = sync.default_window()
+        token = sync.synchronize(vendor, vendor.pk, low, high).state.dumps()
+        self.assertEqual(sync.synchronize(vendor, vendor.pk, token=token).events, [])
+
+        lead.delete()
+        changed = sync.synchronize(vendor, vendor.pk, token=token).events
+        self.assertEqual([(item.pk, item.lead_id) for item in changed], [(event.pk, None)])
+
+
+@override_settings(ALLOWED_HOSTS=['*'], CSRF_TRUSTED_ORIGINS=['https://*.concesionario.com.ar'])
+class WebSocketOriginTests(TestCase):
+    def allowed(self, origin, host='agenda.local:8000', scheme='ws', **extra):
+        headers = {b'host': host.encode(), **{name.encode(): value.encode() for name, value in extra.items()}}
+        return realtime._origin_allowed(origin, {'scheme': scheme}, headers)
+
+    def test_same_site_origin_is_accepted(self):
+        self.assertTrue(self.allowed('http://agenda.local:8000'))
+        self.assertTrue(self.allowed('https://agenda.local', host='agenda.local', scheme='wss'))
+
+    def test_other_sites_are_rejected_even_with_wildcard_hosts(self):
+        self.assertFalse(self.allowed('http://evil.com'))
+        self.assertFalse(self.allowed('https://agenda.local:8000'))
+
+    def test_trusted_origins_are_accepted(self):
+        self.assertTrue(self.allowed('https://ventas.concesionario.com.ar'))
+        self.assertFalse(self.allowed('http://ventas.concesionario.com.ar'))
+
+    @override_settings(SECURE_PROXY_SSL_HEADER=('HTTP_X_FORWARDED_PROTO', 'https'))
+    def test_tls_terminated_at_the_proxy(self):
+        self.assertTrue(self.allowed('https://agenda.local', host='agenda.local', **{'x-forwarded-proto': 'https'}))
@@ -5,13 +5,22 @@ from . import views
 urlpatterns = [
     path('', views.client_list, name='client_list'),
     path('crear/', views.client_create, name='client_create'),
+    path('exportar/', views.client_export, name='client_export'),
+    path('reportes/', views.lead_report, name='lead_report'),
     path('<int:client_id>/', views.client_detail, name='client_detail'),
     path('<int:client_id>/editar/', views.client_edit, name='client_edit'),
     path('<int:client_id>/imprimir/', views.client_contract, name='client_contract'),
     path('<int:client_id>/pdf/', views.client_pdf, name='client_pdf'),
+    path('telefono/', views.client_phone_lookup, name='client_phone_lookup'),
     path('calendario/', views.client_calendar, name='client_calendar'),
+    path('calendario/feed/', views.client_calendar_feed_token, name='client_calendar_feed_token'),
+    path('calendario/feed/<str:token>.ics', views.client_calendar_feed, name='client_calendar_feed'),
     path('calendario/<int:event_id>/editar/', views.client_event_edit, name='client_event_edit'),
     path('calendario/<int:event_id>/eliminar/', views.client_event_delete, name='client_event_delete'),
+    path('leads/', views.client_lead_inbox, name='client_lead_inbox'),
+    path('leads/convertir/', views.client_leads_convert, name='client_leads_convert'),
+    path('leads/archivados/<int:lead_id>/', views.archived_lead_detail, name='archived_lead_detail'),
+    path('leads/<int:lead_id>/convertir/', views.client_lead_convert, name='client_lead_convert'),
     path('leads/<int:lead_id>/nota/', views.client_lead_note_add, name='client_lead_note_add'),
     path('leads/<int:lead_id>/entrevista/', views.lead_interview_create, name='lead_interview_create'),
     path('leads/<int:lead_id>/eliminar/', views.client_lead_delete, name='client_lead_delete'),
@@ -1,44 +1,78 @@
 """Views for clients app."""
+import csv
+import datetime
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.models import User
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, url_has_allowed_host_and_scheme
 from django.db import transaction
-from django.db.models import Q
-from .forms import ClientForm, CoHolderForm, ClientEventForm, ClientLeadForm, ClientLeadNoteForm, LeadInterviewForm
-from .models import Client, ClientNote, ClientEvent, ClientLead, ClientLeadNote, LeadInterview
-from apps.users.models import UserProfile
-from apps.audit.models import AuditLog
+from django.db.models import (
+    Count, IntegerField, OuterRef, Prefetch, Q, Subquery, Sum, Value, prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
+from apps.core.pagination import KeysetPaginator
+from . import agenda, archive, assignment, conversion, duplicates, export, feeds, phones, search
+from .forms import (
+    ClientForm, CoHolderForm, ClientEventForm, ClientEventOccurrenceForm, ClientLeadForm, ClientLeadNoteForm,
+    LeadInterviewForm,
+)
+from .models import (
+    ArchivedLead, CalendarFeed, Client, ClientNote, ClientEvent, ClientEventOverride, ClientLead, ClientLeadNote,
+    InterviewDailyStat, LeadDailyStat, LeadInterview,
+)
+from apps.users import directory
+from apps.users.permissions import access_for
+from apps.audit import writer as audit
 
 
 def is_admin(user):
     """Control de acceso al módulo de clientes."""
-    profile = getattr(user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    return user.is_superuser or role in (
-        UserProfile.ROLE_ADMIN,
-        UserProfile.ROLE_SUPERVISOR,
-        UserProfile.ROLE_VENDOR,
-        UserProfile.ROLE_NEGOTIATOR,
-    )
+    return access_for(user).can_use_clients
 
 
 def is_full_admin(user):
     """Admin/supervisor (no restringido a sus propios clientes)."""
-    profile = getattr(user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    return user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+    return access_for(user).is_full_admin
 
 
-@login_required(login_url='login')
-@user_passes_test(is_admin, login_url='landing')
-def client_list(request):
-    """Listado simple de clientes con filtro basico."""
-    full_admin = is_full_admin(request.user)
-    query = request.GET.get('q', '').strip()
-    clients = Client.objects.all()
-    if not full_admin:
-        clients = clients.filter(owner=request.user)
-    if query:
+def can_view_reports(user):
+    """Reportes de leads (admin, supervisor y marqueting)."""
+    return access_for(user).can_view_reports
+
+
+CLIENT_LIST_PAGE_SIZE = 50
+CLIENT_LIST_ORDERING = ['last_name', 'company_name', 'id']
+# Columnas que usa el listado; evita traer domicilio y datos fiscales.
+CLIENT_LIST_FIELDS = ('id', 'first_name', 'last_name', 'company_name', 'doc_type', 'doc_number', 'cuit', 'phone')
+LEAD_INBOX_PAGE_SIZE = 50
+LEAD_INBOX_ORDERING = ['-created_at', '-id']
+LEAD_REPORT_DAYS = 30
+CALENDAR_ORDERING = ['starts_at', 'id']
+CALENDAR_HISTORY_ORDERING = ['-starts_at', '-id']
+CALENDAR_PAGE_SIZE = 50
+# Tope por página dentro de una ventana (un mes muy cargado se pagina igual).
+CALENDAR_WINDOW_SIZE = 200
+
+
+def redirect_back(request, default):
+    """Vuelve a ``next`` (si es una URL local) o a ``default``."""
+    target = request.POST.get('next') or request.GET.get('next')
+    if target and url_has_allowed_host_and_scheme(target, allowed_hosts={request.get_host()}):
+        return redirect(target)
+    return redirect(default)
+
+
+def search_clients(clients, query, owner=None):
+    """Paginador de la búsqueda: por relevancia con el índice, por el orden del listado sin él."""
+    if search.get_backend() is None:
+        # Motor sin índice: búsqueda lineal como respaldo.
         clients = clients.filter(
             Q(company_name__icontains=query)
             | Q(last_name__icontains=query)
@@ -47,9 +81,29 @@ def client_list(request):
             | Q(phone__icontains=query)
             | Q(coholder__phone__icontains=query)
         )
+        return KeysetPaginator(clients, CLIENT_LIST_ORDERING, per_page=CLIENT_LIST_PAGE_SIZE)
+    return search.SearchPaginator(clients, query, owner=owner, per_page=CLIENT_LIST_PAGE_SIZE)
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_list(request):
+    """Listado simple de clientes con filtro basico."""
+    full_admin = request.access.is_full_admin
+    query = request.GET.get('q', '').strip()
+    clients = Client.objects.only(*CLIENT_LIST_FIELDS)
+    if not full_admin:
+        clients = clients.filter(owner=request.user)
+    if query:
+        # Por relevancia y por cursor, como el listado: sin tope de resultados.
+        paginator = search_clients(clients, query, owner=None if full_admin else request.user)
+    else:
+        paginator = KeysetPaginator(clients, CLIENT_LIST_ORDERING, per_page=CLIENT_LIST_PAGE_SIZE)
+    page = paginator.page_from_request(request)
+    clients = page.object_list
     # Leads
     lead_form = ClientLeadForm(request.POST or None, user=request.user)
-    leads_qs = ClientLead.objects.select_related('owner').all()
+    leads_qs = ClientLead.objects.select_related('owner').filter(converted_at__isnull=True)
     if not full_admin:
         leads_qs = leads_qs.filter(owner=request.user)
     if request.method == 'POST' and 'lead_submit' in request.POST:
@@ -64,6 +118,7 @@ def client_list(request):
 
     return render(request, 'clients/client_list.html', {
         'clients': clients,
+        'page': page,
         'query': query,
         'lead_form': lead_form,
         'leads': leads,
@@ -71,6 +126,158 @@ def client_list(request):
     })
 
 
+def _count_subquery(model):
+    """Cantidad de filas relacionadas con el lead, como subconsulta correlacionada."""
+    rows = (
+        model.objects.filter(lead=OuterRef('pk'))
+        .order_by()
+        .values('lead')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), Value(0))
+
+
+def annotate_lead_inbox(leads):
+    """Agrega contadores y la última nota sin multiplicar filas con JOINs."""
+    last_note = ClientLeadNote.objects.filter(lead=OuterRef('pk')).order_by('-created_at', '-id')
+    return leads.annotate(
+        notes_count=_count_subquery(ClientLeadNote),
+        interviews_count=_count_subquery(LeadInterview),
+        events_count=_count_subquery(ClientEvent),
+        last_note=Subquery(last_note.values('content')[:1]),
+        last_note_at=Subquery(last_note.values('created_at')[:1]),
+    )
+
+
+def lead_timeline(lead):
+    """Notas, entrevistas y eventos del lead (ya precargados), del más reciente al más antiguo."""
+    items = [
+        {'kind': 'Nota', 'at': note.created_at, 'title': note.content, 'by': note.author}
+        for note in lead.notes.all()
+    ]
+    items += [
+        {'kind': 'Entrevista', 'at': interview.scheduled_at, 'title': interview.title, 'by': interview.owner}
+        for interview in lead.interviews.all()
+    ]
+    items += [
+        {'kind': 'Evento', 'at': event.starts_at, 'title': event.title, 'by': event.owner}
+        for event in lead.events.all()
+    ]
+    return sorted(items, key=lambda item: item['at'], reverse=True)
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_lead_inbox(request):
+    """Bandeja de clientes rápidos con historial, paginada por cursor."""
+    full_admin = request.access.is_full_admin
+    lead_form = ClientLeadForm(request.POST or None, user=request.user)
+    if request.method == 'POST' and 'lead_submit' in request.POST:
+        if lead_form.is_valid():
+            lead_form.save()
+            messages.success(request, 'Lead rápido creado.')
+            return redirect('client_lead_inbox')
+        messages.error(request, 'Revisa los datos del lead.')
+
+    leads = ClientLead.objects.select_related('owner').filter(converted_at__isnull=True)
+    if not full_admin:
+        leads = leads.filter(owner=request.user)
+    page = KeysetPaginator(
+        annotate_lead_inbox(leads), LEAD_INBOX_ORDERING, per_page=LEAD_INBOX_PAGE_SIZE,
+    ).page_from_request(request)
+    # Una consulta por relación para toda la página, no por lead.
+    prefetch_related_objects(
+        page.object_list,
+        Prefetch('notes', queryset=ClientLeadNote.objects.select_related('author')),
+        Prefetch('interviews', queryset=LeadInterview.objects.select_related('owner')),
+        Prefetch('events', queryset=ClientEvent.objects.select_related('owner')),
+    )
+    for lead in page.object_list:
+        lead.timeline = lead_timeline(lead)
+
+    return render(request, 'clients/client_leads_list.html', {
+        'leads': page.object_list,
+        'page': page,
+        'lead_form': lead_form,
+        'full_admin': full_admin,
+    })
+
+
+def _parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def _report_range(request):
+    """Rango ``desde``/``hasta`` del querystring (por defecto, los últimos 30 días)."""
+    today = timezone.localdate()
+    start = _parse_day(request.GET.get('desde')) or today - datetime.timedelta(days=LEAD_REPORT_DAYS - 1)
+    end = _parse_day(request.GET.get('hasta')) or today
+    if start > end:
+        start, end = end, start
+    return start, end
+
+
+@login_required(login_url='login')
+@user_passes_test(can_view_reports, login_url='landing')
+def lead_report(request):
+    """Leads por fuente, día y vendedor y entrevistas por vendedor (solo tablas de resumen)."""
+    start, end = _report_range(request)
+    lead_stats = LeadDailyStat.objects.filter(day__gte=start, day__lte=end)
+    interview_stats = InterviewDailyStat.objects.filter(day__gte=start, day__lte=end)
+    daily = (
+        lead_stats.values('day', 'source', 'owner__username')
+        .annotate(leads=Sum('leads'), converted=Sum('converted'))
+        .order_by('-day', 'source', 'owner__username')
+    )
+    if request.GET.get('formato') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="leads_{start:%Y%m%d}_{end:%Y%m%d}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['dia', 'fuente', 'vendedor', 'leads', 'convertidos'])
+        for row in daily:
+            writer.writerow([row['day'].isoformat(), row['source'], row['owner__username'] or '', row['leads'], row['converted']])
+        return response
+
+    by_source = (
+        lead_stats.values('source')
+        .annotate(leads=Sum('leads'), converted=Sum('converted'))
+        .order_by('-leads')
+    )
+    by_seller = (
+        interview_stats.values('owner__username')
+        .annotate(interviews=Sum('interviews'))
+        .order_by('-interviews')
+    )
+    return render(request, 'clients/lead_report.html', {
+        'start': start,
+        'end': end,
+        'daily': daily,
+        'by_source': by_source,
+        'by_seller': by_seller,
+    })
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_export(request):
+    """Exportación completa (streaming) de los clientes visibles para el usuario."""
+    fmt = request.GET.get('formato', 'csv')
+    if fmt not in export.FORMATS:
+        fmt = 'csv'
+    content_type, extension = export.FORMATS[fmt]
+    owner = None if request.access.is_full_admin else request.user
+    response = StreamingHttpResponse(
+        export.iter_export(export.export_queryset(owner=owner), fmt),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="clientes.{extension}"'
+    return response
+
+
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 @transaction.atomic
@@ -97,22 +304,22 @@ def client_create(request):
                 coholder = coholder_form.save(commit=False)
                 coholder.client = client
                 coholder.save()
+            if client_form.duplicates:
+                # Marcó "guardar igual": son clientes distintos y no se vuelve a avisar.
+                duplicates.record_pairs(client, client_form.duplicates, dismissed=True)
             
             # Registrar en auditoría
             client_name = client.company_name if client.company_name else f"{client.first_name} {client.last_name}"
-            AuditLog.objects.create(
-                actor=request.user,
-                action='create_client',
-                details=f'Cliente creado: {client_name} (CUIT: {client.cuit})',
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
+            audit.record(
+                'create_client', actor=request.user, details=f'Cliente creado: {client_name} (CUIT: {client.cuit})',
+                request=request,
             )
             
             messages.success(request, 'Cliente guardado correctamente.')
             return redirect('client_detail', client_id=client.id)
         messages.error(request, 'Revisa los datos obligatorios.')
     else:
-        client_form = ClientForm()
+        client_form = ClientForm(user=request.user)
         coholder_form = CoHolderForm(prefix='co')
 
     return render(request, 'clients/client_form.html', {
@@ -129,7 +336,7 @@ def client_edit(request, client_id):
     """Editar cliente y cotitular existente."""
     client = get_object_or_404(Client, id=client_id)
     coholder_instance = getattr(client, 'coholder', None)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and client.owner != request.user:
         messages.error(request, 'No tienes permiso para editar este cliente.')
         return redirect('client_list')
@@ -171,15 +378,21 @@ def client_edit(request, client_id):
                 coholder = coholder_form.save(commit=False)
                 coholder.client = client
                 coholder.save()
+            if client_form.duplicates:
+                confirmed = client_form.cleaned_data.get('confirm_duplicate')
+                duplicates.record_pairs(client, client_form.duplicates, dismissed=confirmed)
+                if not confirmed:
+                    messages.warning(
+                        request,
+                        f'Posible duplicado: {client_form.duplicates_text()} con el mismo CUIT, documento o teléfono. '
+                        'Quedó registrado para revisión.',
+                    )
             
             # Registrar en auditoría
             client_name = client.company_name if client.company_name else f"{client.first_name} {client.last_name}"
-            AuditLog.objects.create(
-                actor=request.user,
-                action='update_client',
-                details=f'Cliente actualizado: {client_name} (CUIT: {client.cuit})',
-                ip_address=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
+            audit.record(
+                'update_client', actor=request.user, details=f'Cliente actualizado: {client_name} (CUIT: {client.cuit})',
+                request=request,
             )
             
             messages.success(request, 'Cliente actualizado.')
@@ -202,7 +415,7 @@ def client_edit(request, client_id):
 def client_detail(request, client_id):
     """Detalle de cliente y cotitular."""
     client = get_object_or_404(Client, id=client_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and client.owner != request.user:
         messages.error(request, 'No tienes permiso para ver este cliente.')
         return redirect('client_list')
@@ -232,7 +445,7 @@ def client_detail(request, client_id):
 def client_contract(request, client_id):
     """Vista imprimible del contrato del cliente."""
     client = get_object_or_404(Client, id=client_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and client.owner != request.user:
         messages.error(request, 'No tienes permiso para ver este contrato.')
         return redirect('client_list')
@@ -248,7 +461,7 @@ def client_contract(request, client_id):
 def client_pdf(request, client_id):
     """Vista exportable (para imprimir/guardar como PDF) con datos completos del cliente."""
     client = get_object_or_404(Client, id=client_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and client.owner != request.user:
         messages.error(request, 'No tienes permiso para ver este PDF.')
         return redirect('client_list')
@@ -266,12 +479,10 @@ def client_pdf(request, client_id):
 def client_calendar(request):
     """Calendario simple para agendar reuniones con clientes."""
     # Admin ve todos; otros roles permitidos solo ven sus propios eventos.
-    profile = getattr(request.user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    is_admin_user = request.user.is_superuser or role == UserProfile.ROLE_ADMIN
+    is_admin_user = request.access.is_admin
 
-    qs = ClientEvent.objects.select_related('client', 'owner', 'owner__profile', 'lead').order_by('starts_at')
-    show_owner = is_admin_user or role == UserProfile.ROLE_SUPERVISOR
+    qs = ClientEvent.objects.select_related('client', 'owner', 'owner__profile', 'lead')
+    show_owner = request.access.is_full_admin
     events = qs if is_admin_user else qs.filter(owner=request.user)
     form = ClientEventForm(request.POST or None, user=request.user)
 
@@ -286,24 +497,91 @@ def client_calendar(request):
         else:
             messages.error(request, 'Revisa los datos del evento.')
 
+    # Por defecto solo lo que viene; el historial se pide aparte, por páginas.
+    view = request.GET.get('vista')
+    if view not in agenda.VIEWS:
+        view = agenda.VIEW_UPCOMING
+    today = timezone.localdate()
+    anchor = _parse_day(request.GET.get('fecha')) or today
+    window = None
+    # Las series se expanden solo dentro de lo que muestra la página.
+    if view in agenda.WINDOW_VIEWS:
+        window = agenda.window_for(view, anchor)
+        low, high = window.bounds()
+        paginator = agenda.CalendarPaginator(events, CALENDAR_ORDERING, CALENDAR_WINDOW_SIZE, low=low, high=high)
+    elif view == agenda.VIEW_HISTORY:
+        paginator = agenda.CalendarPaginator(events, CALENDAR_HISTORY_ORDERING, CALENDAR_PAGE_SIZE, high=timezone.now())
+    else:
+        paginator = agenda.CalendarPaginator(events, CALENDAR_ORDERING, CALENDAR_PAGE_SIZE, low=timezone.now())
+    page = paginator.page_from_request(request)
+
     return render(request, 'clients/client_calendar.html', {
-        'events': events,
+        'events': page.object_list,
+        'page': page,
         'form': form,
         'show_owner': show_owner,
+        'view': view,
+        'views': [(name, agenda.VIEW_LABELS[name]) for name in agenda.VIEWS],
+        'window': window,
+        'previous_window': window.shifted(-1) if window else None,
+        'next_window': window.shifted(1) if window else None,
+        'today': today,
+        'anchor': anchor,
+        'feed': CalendarFeed.objects.filter(owner=request.user).first(),
     })
 
 
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_calendar_feed_token(request):
+    """Crea (o renueva) la URL privada del feed iCal del usuario."""
+    if request.method == 'POST':
+        if 'renovar' in request.POST:
+            feeds.rotate_token(request.user)
+            messages.success(request, 'URL del calendario renovada. La anterior dejó de funcionar.')
+        else:
+            feeds.feed_for(request.user)
+            messages.success(request, 'URL del calendario creada.')
+    return redirect('client_calendar')
+
+
+def client_calendar_feed(request, token):
+    """Feed iCal del vendedor (sin sesión: el token identifica al dueño).
+
+    Los sondeos sin cambios se responden con 304 leyendo solo la fila del feed.
+    """
+    feed = CalendarFeed.objects.filter(token=token, owner__is_active=True).first()
+    if feed is None:
+        raise Http404
+    etag, last_modified = feeds.validators(feed)
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = HttpResponse(feeds.cached_render(feed), content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _occurrence_from_request(request, event):
+    """Inicio original de la repetición pedida en ``ocurrencia`` (404 si no es de la serie)."""
+    original = agenda.parse_occurrence_key(request.POST.get('ocurrencia') or request.GET.get('ocurrencia'))
+    if original is None or not event.recurrence or not event.is_occurrence(original):
+        raise Http404
+    return original
+
+
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 def client_event_edit(request, event_id):
-    """Editar un evento existente."""
+    """Editar un evento existente (o una serie entera)."""
     event = get_object_or_404(ClientEvent.objects.select_related('owner'), id=event_id)
-    profile = getattr(request.user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    is_admin_user = request.user.is_superuser or role == UserProfile.ROLE_ADMIN
+    is_admin_user = request.access.is_admin
     if not is_admin_user and event.owner != request.user:
         messages.error(request, 'No tienes permiso para editar este evento.')
         return redirect('client_calendar')
+    if request.GET.get('ocurrencia'):
+        return _client_occurrence_edit(request, event)
 
     form = ClientEventForm(request.POST or None, instance=event, user=request.user)
     if request.method == 'POST' and form.is_valid():
@@ -322,20 +600,60 @@ def client_event_edit(request, event_id):
     })
 
 
+def _client_occurrence_edit(request, event):
+    """Editar una sola repetición: guarda un cambio puntual, la serie no se toca."""
+    original = _occurrence_from_request(request, event)
+    override = event.overrides.filter(original_start=original).first() or ClientEventOverride(
+        event=event,
+        original_start=original,
+        title=event.title,
+        description=event.description,
+        starts_at=original,
+        duration_minutes=event.duration_minutes,
+    )
+    form = ClientEventOccurrenceForm(
+        request.POST or None, instance=override, event=event, original_start=original, user=request.user,
+    )
+    if request.method == 'POST' and form.is_valid():
+        form.save()
+        messages.success(request, 'Repetición actualizada.')
+        return redirect('client_calendar')
+    elif request.method == 'POST':
+        messages.error(request, 'Revisa los datos del evento.')
+
+    return render(request, 'clients/client_event_form.html', {
+        'form': form,
+        'event': event,
+        'occurrence': agenda.occurrence_key(original),
+        'original_start': original,
+    })
+
+
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 def client_event_delete(request, event_id):
     """Eliminar un evento."""
     event = get_object_or_404(ClientEvent, id=event_id)
-    profile = getattr(request.user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    is_admin_user = request.user.is_superuser or role == UserProfile.ROLE_ADMIN
+    is_admin_user = request.access.is_admin
     if not is_admin_user and event.owner != request.user:
         messages.error(request, 'No tienes permiso para eliminar este evento.')
         return redirect('client_calendar')
-    if request.method == 'POST':
+    if request.method == 'POST' and request.POST.get('ocurrencia'):
+        # Borrar una repetición solo la marca como cancelada.
+        original = _occurrence_from_request(request, event)
+        ClientEventOverride.objects.update_or_create(
+            event=event, original_start=original,
+            defaults={
+                'cancelled': True,
+                'title': event.title,
+                'starts_at': original,
+                'duration_minutes': event.duration_minutes,
+            },
+        )
+        messages.success(request, 'Repetición eliminada.')
+    elif request.method == 'POST':
         event.delete()
-        messages.success(request, 'Evento eliminado.')
+        messages.success(request, 'Serie eliminada.' if event.recurrence else 'Evento eliminado.')
     return redirect('client_calendar')
 
 
@@ -344,7 +662,7 @@ def client_event_delete(request, event_id):
 def client_lead_note_add(request, lead_id):
     """Agregar nota a un cliente rápido (append-only)."""
     lead = get_object_or_404(ClientLead.objects.select_related('owner'), id=lead_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and lead.owner != request.user:
         messages.error(request, 'No tienes permiso para agregar notas a este cliente rápido.')
         return redirect('client_list')
@@ -359,7 +677,7 @@ def client_lead_note_add(request, lead_id):
             messages.success(request, 'Nota agregada.')
         else:
             messages.error(request, 'Revisa la nota.')
-    return redirect('client_list')
+    return redirect_back(request, 'client_list')
 
 
 @login_required(login_url='login')
@@ -367,7 +685,7 @@ def client_lead_note_add(request, lead_id):
 def lead_interview_create(request, lead_id):
     """Crear entrevista para un cliente rápido sin requerir cliente."""
     lead = get_object_or_404(ClientLead.objects.select_related('owner'), id=lead_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and lead.owner != request.user:
         messages.error(request, 'No tienes permiso para este cliente rápido.')
         return redirect('client_list')
@@ -387,6 +705,7 @@ def lead_interview_create(request, lead_id):
                 owner=interview.owner or request.user,
                 title=interview.title,
                 starts_at=interview.scheduled_at,
+                duration_minutes=form.cleaned_data['duration_minutes'],
                 description=(interview.notes or '').strip(),
                 lead_name=lead.name or '',
                 lead_phone=lead.phone or '',
@@ -396,22 +715,122 @@ def lead_interview_create(request, lead_id):
         else:
             messages.error(request, 'Revisa los datos de la entrevista.')
 
+    # Quien asigna ve los primeros horarios libres de todos los vendedores.
+    free_slots = []
+    if 'owner' in form.fields:
+        names = {entry.id: entry.username for entry in directory.entries()}
+        for slot in agenda.free_slots(assignment.candidates()):
+            free_slots.append({'slot': slot, 'username': names.get(slot.owner_id, slot.owner_id)})
+
     return render(request, 'clients/lead_interview_form.html', {
         'form': form,
         'lead': lead,
+        'free_slots': free_slots,
     })
 
 
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_lead_convert(request, lead_id):
+    """Convierte un cliente rápido en cliente y abre la ficha para completarla."""
+    lead = get_object_or_404(ClientLead.objects.select_related('owner'), id=lead_id)
+    if not request.access.is_full_admin and lead.owner != request.user:
+        messages.error(request, 'No tienes permiso para este cliente rápido.')
+        return redirect('client_list')
+    if request.method != 'POST':
+        return redirect('client_lead_inbox')
+    if lead.client_id:
+        return redirect('client_edit', client_id=lead.client_id)
+    converted = conversion.convert_leads(ClientLead.objects.filter(id=lead.id), actor=request.user)
+    if not converted:
+        return redirect('client_lead_inbox')
+    messages.success(request, 'Cliente creado desde el lead. Completa sus datos.')
+    return redirect('client_edit', client_id=converted[lead.id].pk)
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_leads_convert(request):
+    """Conversión en lote de los clientes rápidos seleccionados."""
+    if request.method != 'POST':
+        return redirect('client_lead_inbox')
+    ids = [value for value in request.POST.getlist('lead_ids') if value.isdigit()]
+    leads = ClientLead.objects.filter(id__in=ids[:conversion.MAX_CONVERT])
+    if not request.access.is_full_admin:
+        leads = leads.filter(owner=request.user)
+    converted = conversion.convert_leads(leads, actor=request.user)
+    if converted:
+        messages.success(request, f'{len(converted)} clientes rápidos convertidos en clientes.')
+    else:
+        messages.error(request, 'No se seleccionaron clientes rápidos para convertir.')
+    return redirect_back(request, 'client_lead_inbox')
+
+
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url='landing')
 def client_lead_delete(request, lead_id):
     """Eliminar cliente rápido."""
     lead = get_object_or_404(ClientLead.objects.select_related('owner'), id=lead_id)
-    full_admin = is_full_admin(request.user)
+    full_admin = request.access.is_full_admin
     if not full_admin and lead.owner != request.user:
         messages.error(request, 'No tienes permiso para eliminar este cliente rápido.')
         return redirect('client_list')
     if request.method == 'POST':
         lead.delete()
         messages.success(request, 'Cliente rápido eliminado.')
-    return redirect('client_list')
+    return redirect_back(request, 'client_list')
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def archived_lead_detail(request, lead_id):
+    """Ficha de solo lectura de un cliente rápido archivado (se lee del segmento)."""
+    archived = get_object_or_404(ArchivedLead.objects.select_related('owner'), lead_id=lead_id)
+    if not request.access.is_full_admin and archived.owner_id != request.user.id:
+        messages.error(request, 'No tienes permiso para este cliente rápido.')
+        return redirect('client_list')
+    record = archive.read_record(archived)
+    if record is None:
+        messages.error(request, 'No se encontró el segmento del archivo de leads.')
+        return redirect('client_lead_inbox')
+    user_ids = {item['author_id'] for item in record['notes']} | {item['owner_id'] for item in record['interviews']}
+    usernames = dict(User.objects.filter(id__in=user_ids - {None}).values_list('id', 'username'))
+    for item in record['notes']:
+        item['author'] = usernames.get(item['author_id'], 'Sistema')
+        item['created_at'] = parse_datetime(item['created_at'])
+    for item in record['interviews']:
+        item['owner'] = usernames.get(item['owner_id'], '')
+        item['scheduled_at'] = parse_datetime(item['scheduled_at'])
+    return render(request, 'clients/archived_lead_detail.html', {
+        'archived': archived,
+        'notes': record['notes'],
+        'interviews': record['interviews'],
+    })
+
+
+@login_required(login_url='login')
+@user_passes_test(is_admin, login_url='landing')
+def client_phone_lookup(request):
+    """Identificador de llamadas: busca un número en clientes, cotitulares, leads y eventos."""
+    number = request.GET.get('numero', '')
+    owner = None if request.access.is_full_admin else request.user
+    results = []
+    for entry in phones.lookup(number, owner=owner):
+        url = ''
+        if entry.client_id:
+            url = reverse('client_detail', args=[entry.client_id])
+        elif entry.kind == 'archived':
+            url = reverse('archived_lead_detail', args=[entry.object_id])
+        results.append({
+            'kind': entry.kind,
+            'kind_display': entry.get_kind_display(),
+            'id': entry.object_id,
+            'label': entry.label,
+            'phone': entry.digits,
+            'client_id': entry.client_id,
+            'lead_id': entry.lead_id,
+            'owner_id': entry.owner_id,
+            'starts_at': entry.starts_at.isoformat() if entry.starts_at else None,
+            'url': url,
+        })
+    return JsonResponse({'number': phones.normalize_phone(number), 'results': results})
@@ -0,0 +1,142 @@
+"""Keyset (cursor) pagination helpers.
+
+A diferencia de ``Paginator`` (LIMIT/OFFSET), cada página se pide con un
+cursor que guarda los valores de orden de la última fila vista, así que la
+página 10.000 cuesta lo mismo que la primera si existe un índice que cubra el
+orden. Los campos de orden no deben admitir NULL y el último debe ser único
+(normalmente ``id``).
+"""
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidCursor(ValueError):
+    """Cursor mal formado o de otro listado."""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        parsed = parse_datetime(value['dt'])
+        if parsed is None:
+            raise InvalidCursor('Fecha inválida en el cursor.')
+        return parsed
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor('Cursor inválido.') from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Cursor inválido.')
+    return [_decode_value(v) for v in values]
+
+
+def _split(ordering):
+    return [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+
+
+def keyset_filter(ordering, values, reverse=False):
+    """Condición "fila posterior al cursor" para el orden dado.
+
+    Se expande como ``a > x OR (a = x AND b > y) OR ...`` y se antepone
+    ``a >= x`` para que el motor pueda resolverlo con un rango sobre el
+    índice compuesto.
+    """
+    fields = _split(ordering)
+    condition = Q()
+    for position, (name, descending) in enumerate(fields):
+        if reverse:
+            descending = not descending
+        step = Q(**{f'{name}__{"lt" if descending else "gt"}': values[position]})
+        for prev_position, (prev_name, _) in enumerate(fields[:position]):
+            step &= Q(**{prev_name: values[prev_position]})
+        condition |= step
+    first_name, first_desc = fields[0]
+    if reverse:
+        first_desc = not first_desc
+    return Q(**{f'{first_name}__{"lte" if first_desc else "gte"}': values[0]}) & condition
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: str = ''
+    previous_cursor: str = ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Pagina un queryset por cursor sobre ``ordering``."""
+
+    def __init__(self, queryset, ordering, per_page=50):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+
+    def _cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name) for name, _ in _split(self.ordering)])
+
+    def _reversed_ordering(self):
+        return [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+
+    def _fetch(self, values, reverse=False):
+        """Hasta ``per_page + 1`` filas a partir del cursor, en el sentido de lectura."""
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(keyset_filter(self.ordering, values, reverse=reverse))
+        ordering = self._reversed_ordering() if reverse else self.ordering
+        return list(qs.order_by(*ordering)[:self.per_page + 1])
+
+    def page(self, after=None, before=None):
+        """Página siguiente a ``after`` o anterior a ``before`` (cursores)."""
+        size = len(self.ordering)
+        if before:
+            rows = self._fetch(decode_cursor(before, size), reverse=True)
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            rows = self._fetch(decode_cursor(after, size) if after else None)
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+        return KeysetPage(
+            object_list=rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._cursor_for(rows[-1]) if rows else '',
+            previous_cursor=self._cursor_for(rows[0]) if rows else '',
+        )
+
+    def page_from_request(self, request):
+        """Lee ``after``/``before`` del querystring; un cursor inválido vuelve al inicio."""
+        try:
+            return self.page(after=request.GET.get('after'), before=request.GET.get('before'))
+        except InvalidCursor:
+            return self.page()
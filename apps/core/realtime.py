@@ -0,0 +1,196 @@
+"""Pub/sub para empujar cambios a los navegadores por WebSocket.
+
+Cada conexión WebSocket se suscribe a unos canales (``user:<id>``,
+``supervisors``...) y recibe los mensajes en una cola acotada de su event
+loop. Las vistas y señales publican desde cualquier hilo con ``publish``; la
+entrega a las colas pasa por ``call_soon_threadsafe`` y nunca bloquea la
+request. Se publica recién al confirmar la transacción.
+
+``REALTIME_BROKER`` elige el broker:
+
+* ``LocalBroker`` (por defecto): todo en el mismo proceso. Alcanza con un solo
+  proceso ``daphne``.
+* ``UnixSocketBroker``: cada proceso ASGI con conexiones abiertas escucha un
+  socket de datagramas en ``REALTIME_SOCKET_DIR``; ``publish`` entrega en el
+  proceso y manda un datagrama a cada socket del directorio. Sirve para varios
+  workers ``daphne`` en la misma máquina y para que publiquen los workers
+  ``gunicorn``, la API de ingesta o los comandos de ``manage.py``.
+
+Un mensaje que no llega (cola llena, worker caído) no se reintenta: el
+navegador recibe ``{"type": "resync"}`` o, al reconectar, recarga la página.
+"""
+import asyncio
+import atexit
+import json
+import os
+import socket
+import threading
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_BROKER = 'apps.core.realtime.LocalBroker'
+# Mensajes pendientes por conexión; si se llena, la conexión se marca para recargar.
+MAX_PENDING = 100
+# Un datagrama más grande no se reparte a otros procesos (los mensajes son diferencias chicas).
+MAX_DATAGRAM = 60 * 1024
+RESYNC = {'type': 'resync'}
+
+
+class Subscription:
+    """Cola de una conexión, atada al event loop que la creó."""
+
+    def __init__(self, channels, loop, max_pending=MAX_PENDING):
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(max_pending)
+
+    def deliver(self, message):
+        """Entrega desde cualquier hilo."""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # El loop ya cerró: la conexión se fue.
+            pass
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Navegador lento: se descarta lo pendiente y se le pide recargar.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """Reparte los mensajes entre las conexiones del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, channels):
+        """Suscribe la conexión actual (se llama desde su event loop)."""
+        subscription = Subscription(channels, asyncio.get_running_loop())
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def dispatch(self, channels, message):
+        """Entrega en este proceso; una conexión en varios canales lo recibe una vez."""
+        with self._lock:
+            targets = set()
+            for channel in channels:
+                targets.update(self._channels.get(channel, ()))
+        for subscription in targets:
+            subscription.deliver(message)
+        return len(targets)
+
+    def publish(self, channels, message):
+        return self.dispatch(channels, message)
+
+
+class UnixSocketBroker(LocalBroker):
+    """``LocalBroker`` más un socket de datagramas por proceso en ``REALTIME_SOCKET_DIR``."""
+
+    def __init__(self, directory=None):
+        super().__init__()
+        self.directory = Path(directory or getattr(settings, 'REALTIME_SOCKET_DIR', settings.BASE_DIR / 'run'))
+        self.path = None
+        self._listener = None
+        self._sender = None
+
+    def subscribe(self, channels):
+        subscription = super().subscribe(channels)
+        with self._lock:
+            if self._listener is None:
+                self._listen(subscription.loop)
+        return subscription
+
+    def _listen(self, loop):
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        self.path = self.directory / f'{os.getpid()}.sock'
+        if self.path.exists():
+            self.path.unlink()
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        listener.bind(str(self.path))
+        listener.setblocking(False)
+        loop.add_reader(listener.fileno(), self._receive)
+        self._listener = listener
+        atexit.register(self._remove_socket)
+
+    def _remove_socket(self):
+        if self.path is not None and self.path.exists():
+            self.path.unlink()
+
+    def _receive(self):
+        while True:
+            try:
+                data = self._listener.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return
+            try:
+                packet = json.loads(data)
+                self.dispatch(packet['channels'], packet['message'])
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def publish(self, channels, message):
+        delivered = self.dispatch(channels, message)
+        data = json.dumps({'channels': list(channels), 'message': message}, cls=DjangoJSONEncoder).encode('utf-8')
+        if len(data) > MAX_DATAGRAM:
+            return delivered
+        with self._lock:
+            if self._sender is None:
+                self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._sender.setblocking(False)
+            sender = self._sender
+        for path in self.directory.glob('*.sock'):
+            if path == self.path:
+                continue
+            try:
+                sender.sendto(data, str(path))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Socket de un proceso que ya terminó.
+                path.unlink(missing_ok=True)
+            except OSError:
+                # Cola del otro proceso llena: ese mensaje se pierde.
+                continue
+        return delivered
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'REALTIME_BROKER', DEFAULT_BROKER))()
+        return _broker
+
+
+def publish(channels, message):
+    """Publica ``message`` (dict serializable a JSON) en ``channels`` al confirmar la transacción."""
+    channels = [channel for channel in dict.fromkeys(channels) if channel]
+    if channels:
+        transaction.on_commit(partial(get_broker().publish, channels, message))
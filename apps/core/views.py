@@ -6,10 +6,8 @@ from django.contrib.auth.decorators import login_required
 @login_required(login_url='login')
 def landing(request):
     """Landing page - homepage despu\u0301s del login."""
-    profile = getattr(request.user, 'profile', None)
-    role_value = getattr(profile, 'role', 'vendedor') if profile else 'vendedor'
     context = {
         'user': request.user,
-        'role': role_value,
+        'role': request.access.role,
     }
     return render(request, 'core/landing.html', context)
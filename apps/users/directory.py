@@ -0,0 +1,92 @@
+"""Directorio de usuarios asignables (desplegables "Asignar a").
+
+Se arma una vez por proceso y se reconstruye cuando cambia la versión
+guardada en la caché (las señales de ``User`` y ``UserProfile`` la
+incrementan). Con una caché no compartida entre workers, la copia local
+además vence a los ``MAX_AGE`` segundos.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+from apps.users.models import UserProfile
+
+ASSIGNABLE_ROLES = (
+    UserProfile.ROLE_VENDOR,
+    UserProfile.ROLE_NEGOTIATOR,
+    UserProfile.ROLE_MANAGER,
+    UserProfile.ROLE_ACCOUNTANT,
+    UserProfile.ROLE_MARKETING,
+    UserProfile.ROLE_SUPERVISOR,
+    UserProfile.ROLE_ADMIN,
+)
+VERSION_KEY = 'users:directory:version'
+MAX_AGE = 60
+
+
+@dataclass(frozen=True)
+class DirectoryEntry:
+    id: int
+    username: str
+    role: str
+    is_active: bool
+
+
+_lock = threading.Lock()
+_state = {'version': None, 'built_at': 0.0, 'entries': (), 'ids': frozenset(), 'choices': ()}
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def invalidate():
+    """Marca el directorio como desactualizado en todos los procesos."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, timeout=None)
+    _state['version'] = None
+
+
+def _build():
+    rows = (
+        User.objects.filter(profile__role__in=ASSIGNABLE_ROLES)
+        .order_by('username')
+        .values_list('id', 'username', 'profile__role', 'is_active')
+    )
+    entries = tuple(DirectoryEntry(*row) for row in rows)
+    _state['entries'] = entries
+    _state['ids'] = frozenset(entry.id for entry in entries)
+    _state['choices'] = tuple((str(entry.id), entry.username) for entry in entries)
+
+
+def _refresh():
+    version = _current_version()
+    if _state['version'] != version or time.monotonic() - _state['built_at'] > MAX_AGE:
+        with _lock:
+            if _state['version'] != version or time.monotonic() - _state['built_at'] > MAX_AGE:
+                _build()
+                _state['version'] = version
+                _state['built_at'] = time.monotonic()
+    return _state
+
+
+def entries():
+    return _refresh()['entries']
+
+
+def assignable_ids():
+    return _refresh()['ids']
+
+
+def assignable_choices():
+    """Opciones ``(id, username)`` listas para un ``ChoiceField``."""
+    return [('', '---------'), *_refresh()['choices']]
@@ -0,0 +1,27 @@
+"""Form fields for users app."""
+from django import forms
+from django.contrib.auth.models import User
+
+from apps.users import directory
+
+
+class AssignableUserField(forms.ChoiceField):
+    """Desplegable "Asignar a" servido desde el directorio en memoria.
+
+    Solo consulta la base al validar un POST (un ``get`` por clave primaria).
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('required', False)
+        kwargs.setdefault('label', 'Asignar a')
+        kwargs.setdefault('widget', forms.Select(attrs={'class': 'form-select'}))
+        super().__init__(choices=directory.assignable_choices, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value in self.empty_values:
+            return None
+        try:
+            return User.objects.get(pk=int(value))
+        except (ValueError, User.DoesNotExist):
+            raise forms.ValidationError(self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value})
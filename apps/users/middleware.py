@@ -0,0 +1,13 @@
+"""Middleware for users app."""
+from apps.users.permissions import access_for
+
+
+class UserAccessMiddleware:
+    """Resuelve una vez por request el rol del usuario en ``request.access``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access = access_for(request.user)
+        return self.get_response(request)
@@ -0,0 +1,67 @@
+"""Resolución de rol y permisos por request."""
+from dataclasses import dataclass
+
+from apps.users.models import UserProfile
+
+CLIENT_ROLES = (
+    UserProfile.ROLE_ADMIN,
+    UserProfile.ROLE_SUPERVISOR,
+    UserProfile.ROLE_VENDOR,
+    UserProfile.ROLE_NEGOTIATOR,
+)
+FULL_ADMIN_ROLES = (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+REPORT_ROLES = (*FULL_ADMIN_ROLES, UserProfile.ROLE_MARKETING)
+
+
+@dataclass(frozen=True)
+class UserAccess:
+    """Permisos precalculados del usuario (inmutable)."""
+    role: str
+    is_authenticated: bool = False
+    is_superuser: bool = False
+    # Módulo de clientes (admin, supervisor, vendedor, negociador).
+    can_use_clients: bool = False
+    # Admin/supervisor: ve todo, gestiona usuarios y auditoría.
+    is_full_admin: bool = False
+    # Solo administrador (o superusuario): gestiona eventos de otros.
+    is_admin: bool = False
+    # Reportes de leads y entrevistas (admin, supervisor, marqueting).
+    can_view_reports: bool = False
+
+
+ANONYMOUS_ACCESS = UserAccess(role=UserProfile.ROLE_VENDOR)
+
+
+def _profile_for(user):
+    """Perfil ya cargado (select_related) o creado si falta."""
+    profile = getattr(user, 'profile', None)
+    if profile is None:
+        profile, _ = UserProfile.objects.get_or_create(user=user, defaults={'role': UserProfile.ROLE_VENDOR})
+        user.profile = profile
+    return profile
+
+
+def build_access(user):
+    if not getattr(user, 'is_authenticated', False):
+        return ANONYMOUS_ACCESS
+    role = _profile_for(user).role or UserProfile.ROLE_VENDOR
+    superuser = user.is_superuser
+    return UserAccess(
+        role=role,
+        is_authenticated=True,
+        is_superuser=superuser,
+        can_use_clients=superuser or role in CLIENT_ROLES,
+        is_full_admin=superuser or role in FULL_ADMIN_ROLES,
+        is_admin=superuser or role == UserProfile.ROLE_ADMIN,
+        can_view_reports=superuser or role in REPORT_ROLES,
+    )
+
+
+def access_for(user):
+    """Permisos del usuario, calculados una sola vez por instancia."""
+    access = getattr(user, '_access', None)
+    if access is None:
+        access = build_access(user)
+        if getattr(user, 'is_authenticated', False):
+            user._access = access
+    return access
@@ -1,7 +1,8 @@
 """Signals for users app."""
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from apps.users import directory
 from apps.users.models import UserProfile
 
 
@@ -13,3 +14,14 @@ def create_profile_on_user_creation(sender, instance, created, **kwargs):
             user=instance,
             defaults={'role': UserProfile.ROLE_VENDOR},
         )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_directory(sender, instance, update_fields=None, **kwargs):
+    """Cualquier alta, baja o cambio de rol invalida el directorio de asignables."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    directory.invalidate()
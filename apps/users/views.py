@@ -5,13 +5,12 @@ from django.contrib.auth.models import User
 from django.contrib import messages
 from django.db.models import Q
 from apps.users.models import UserProfile
+from apps.users.permissions import access_for
 
 
 def is_admin(user):
     """Verifica si el usuario tiene rol administrador o supervisor."""
-    profile = getattr(user, 'profile', None)
-    role = getattr(profile, 'role', UserProfile.ROLE_VENDOR) if profile else UserProfile.ROLE_VENDOR
-    return user.is_superuser or role in (UserProfile.ROLE_ADMIN, UserProfile.ROLE_SUPERVISOR)
+    return access_for(user).is_full_admin
 
 
 def ensure_user_related(user):
@@ -168,7 +167,6 @@ def delete_user(request, user_id):
 @login_required(login_url='login')
 def profile_view(request):
     """Perfil del usuario actual."""
-    ensure_user_related(request.user)
     profile = request.user.profile
     
     context = {'profile': profile}
@@ -178,7 +176,6 @@ def profile_view(request):
 @login_required(login_url='login')
 def profile_edit(request):
     """Editar perfil del usuario actual."""
-    ensure_user_related(request.user)
     profile = request.user.profile
     
     if request.method == 'POST':
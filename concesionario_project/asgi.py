@@ -1,6 +1,22 @@
-"""ASGI config for concesionario_project."""
+"""ASGI config for concesionario_project.
+
+HTTP va a Django; el WebSocket de avisos del módulo de clientes
+(``/ws/clientes/``) va a ``apps.clients.realtime``.
+"""
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'concesionario_project.settings')
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from apps.clients import realtime  # noqa: E402  (necesita Django configurado)
+
+
+async def application(scope, receive, send):
+    if scope['type'] != 'websocket':
+        return await django_application(scope, receive, send)
+    if scope['path'] == realtime.WEBSOCKET_PATH:
+        return await realtime.websocket_app(scope, receive, send)
+    # Otra ruta: se rechaza el handshake.
+    await receive()
+    await send({'type': 'websocket.close'})
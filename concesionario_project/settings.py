@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'crispy_forms',
     'crispy_bootstrap5',
     'rest_framework',
+    'rest_framework.authtoken',
     'apps.core',
     'apps.auth_app',
     'apps.users',
@@ -38,6 +39,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.users.middleware.UserAccessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'apps.core.middleware.NoIndexMiddleware',
@@ -71,6 +73,21 @@ DATABASES = {
     }
 }
 
+# El perfil se carga junto con el usuario; ModelBackend queda para sesiones previas.
+# Con varios workers conviene una caché compartida (p. ej. Redis o memcached):
+# el directorio de usuarios asignables se invalida por versión en esta caché.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='concesionario'),
+    }
+}
+
+AUTHENTICATION_BACKENDS = [
+    'apps.users.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -97,6 +114,57 @@ CRISPY_TEMPLATE_PACK = "bootstrap5"
 
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:3000', cast=lambda v: [s.strip() for s in v.split(',')])
 
+# API de ingesta de leads: token por integración (se crea en el admin).
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_THROTTLE_RATES': {
+        'lead_ingest': config('LEAD_INGEST_RATE', default='600/min'),
+    },
+}
+
+# Asignación automática de leads: round_robin, least_open o weighted (por rol).
+LEAD_ASSIGNMENT_STRATEGY = config('LEAD_ASSIGNMENT_STRATEGY', default='least_open')
+
+# Archivo de leads viejos sin convertir (``python manage.py archive_leads``).
+LEAD_ARCHIVE_DIR = config('LEAD_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'leads'))
+LEAD_ARCHIVE_AFTER_DAYS = config('LEAD_ARCHIVE_AFTER_DAYS', default=180, cast=int)
+
+# Recordatorios de eventos (``python manage.py run_reminders``): correo por SMTP
+# (``apps.clients.reminders.EmailBackend``) o archivos JSONL (``...FileBackend``).
+REMINDER_BACKEND = config('REMINDER_BACKEND', default='apps.clients.reminders.EmailBackend')
+REMINDER_LEAD_MINUTES = config('REMINDER_LEAD_MINUTES', default=30, cast=int)
+REMINDER_OUTBOX_DIR = config('REMINDER_OUTBOX_DIR', default=str(BASE_DIR / 'outbox'))
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=1025, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='agenda@localhost')
+
+# Auditoría en tandas (``apps/audit/writer.py``): se vuelca al terminar la request,
+# al juntar AUDIT_FLUSH_SIZE entradas o pasados AUDIT_FLUSH_SECONDS; si la base está
+# ocupada queda en archivos JSONL en AUDIT_FALLBACK_DIR hasta el próximo volcado; un archivo
+# que la base rechaza AUDIT_FALLBACK_MAX_ATTEMPTS veces pasa a AUDIT_FALLBACK_DIR/dead.
+AUDIT_FLUSH_SIZE = config('AUDIT_FLUSH_SIZE', default=100, cast=int)
+AUDIT_FLUSH_SECONDS = config('AUDIT_FLUSH_SECONDS', default=2.0, cast=float)
+AUDIT_FALLBACK_DIR = config('AUDIT_FALLBACK_DIR', default=str(BASE_DIR / 'audit_fallback'))
+AUDIT_FALLBACK_MAX_ATTEMPTS = config('AUDIT_FALLBACK_MAX_ATTEMPTS', default=5, cast=int)
+
+# Auditoría particionada por mes (``python manage.py rotate_audit``): la tabla activa
+# guarda AUDIT_HOT_MONTHS meses; los anteriores pasan a un archivo SQLite por mes en
+# AUDIT_ARCHIVE_DIR y pasados AUDIT_SEAL_AFTER_MONTHS meses se comprimen (solo lectura).
+AUDIT_ARCHIVE_DIR = config('AUDIT_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'audit'))
+AUDIT_HOT_MONTHS = config('AUDIT_HOT_MONTHS', default=3, cast=int)
+AUDIT_SEAL_AFTER_MONTHS = config('AUDIT_SEAL_AFTER_MONTHS', default=12, cast=int)
+AUDIT_ARCHIVE_CACHE_FILES = config('AUDIT_ARCHIVE_CACHE_FILES', default=4, cast=int)
+
+# Avisos en vivo por WebSocket (``/ws/clientes/``, servido por ``daphne``). Con un
+# solo proceso alcanza ``apps.core.realtime.LocalBroker``; con varios workers (o si
+# publican ``gunicorn`` y los comandos) usa ``apps.core.realtime.UnixSocketBroker``.
+REALTIME_BROKER = config('REALTIME_BROKER', default='apps.core.realtime.LocalBroker')
+REALTIME_SOCKET_DIR = config('REALTIME_SOCKET_DIR', default=str(BASE_DIR / 'run' / 'realtime'))
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'landing'
 LOGOUT_REDIRECT_URL = 'login'
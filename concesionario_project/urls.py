@@ -11,6 +11,7 @@ urlpatterns = [
     path('users/', include('apps.users.urls')),
     path('audit/', include('apps.audit.urls')),
     path('clientes/', include('apps.clients.urls')),
+    path('api/clientes/', include('apps.clients.api_urls')),
 ]
 
 if settings.DEBUG: